@@ -0,0 +1,439 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# StressPredictor.build_features arguments
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ARTIFACT_DIR = os.path.join(BASE_DIR, 'models')
+DEFAULT_PACKAGE_PATH = os.path.join(BASE_DIR, 'stress_prediction_models.pkl')
+
+FORM_FIELDS = ['mark10th', 'mark12th', 'collegemark', 'gender', 'height', 'weight', 'financial', 'course', 'salexpect']
+
+# Form options, mirroring the widgets in streamlit_app.py
+COURSES = ['Engineering', 'Medical', 'Law', 'Commerce', 'Arts/Humanities', 'Science', 'MBA', 'Computer Science']
+GENDERS = ['Male', 'Female']
+FINANCIAL_STATUSES = ['Awful', 'Bad', 'Good', 'Fabulous']
+EMOTIONS = [
+    'Very Happy', 'Happy', 'Content', 'Neutral', 'Slightly Stressed',
+    'Stressed', 'Very Stressed', 'Anxious', 'Depressed', 'Overwhelmed',
+    'Panicked', 'Hopeless'
+]
+TRIGGERS = [
+    'Academic pressure', 'Parent scolding/disappointment', 'Relationship issues/breakup',
+    'Financial problems', 'Family conflicts', 'Health issues', 'Career uncertainty',
+    'Social isolation', 'Exam failure', 'Peer pressure', 'Loss of loved one',
+    'Trauma/abuse'
+]
+NO_TRIGGER = 'None/No specific trigger'
+
+# Context text vocabulary: lexicon words from EmotionalAnalyzer plus everyday filler
+CONTEXT_WORDS = [
+    'sad', 'angry', 'frustrated', 'terrible', 'awful', 'hate', 'depressed', 'hopeless',
+    'worthless', 'failure', 'disappointed', 'stressed', 'overwhelmed', 'exhausted', 'tired',
+    'worried', 'scared', 'happy', 'good', 'great', 'excellent', 'wonderful', 'amazing', 'love',
+    'excited', 'confident', 'optimistic', 'hopeful', 'peaceful', 'abuse', 'bullying', 'divorce',
+    'death', 'accident', 'harassment', 'rejection', 'neglect', 'betrayal'
+]
+FILLER_WORDS = [
+    'i', 'my', 'the', 'a', 'and', 'to', 'of', 'in', 'at', 'with', 'about', 'have', 'been',
+    'feel', 'feeling', 'really', 'very', 'lately', 'week', 'exams', 'college', 'parents',
+    'friends', 'hostel', 'semester', 'marks', 'placement', 'assignment', 'sleep', 'cannot',
+    'focus', 'home', 'class', 'teacher', 'project', 'deadline', 'job', 'money', 'fees'
+]
+# (share of profiles, min words, max words); empty text is the app's default
+CONTEXT_LENGTHS = [(0.4, 0, 0), (0.3, 5, 25), (0.2, 50, 150), (0.1, 300, 1000)]
+
+DEFAULT_OUTPUT = 'benchmark_results.json'
+
+def _load_locations(path: str = os.path.join(BASE_DIR, 'state_city_data.json')) -> List[tuple]:
+    with open(path, 'r') as f:
+        data = json.load(f)
+    return [(state, city) for state, cities in data.items() for city in dict.fromkeys(cities)]
+
+def _context_pool(rng: np.random.Generator, size: int) -> np.ndarray:
+    """Distinct context texts of mixed lengths; profiles draw from this pool"""
+    shares = np.array([share for share, _, _ in CONTEXT_LENGTHS])
+    buckets = rng.choice(len(CONTEXT_LENGTHS), size=size, p=shares / shares.sum())
+    low = np.array([low for _, low, _ in CONTEXT_LENGTHS])[buckets]
+    high = np.array([high for _, _, high in CONTEXT_LENGTHS])[buckets]
+    lengths = rng.integers(low, high + 1)
+
+    # About one word in five carries sentiment or trauma signal
+    words = np.array(FILLER_WORDS + CONTEXT_WORDS, dtype=object)
+    weights = np.concatenate([
+        np.full(len(FILLER_WORDS), 0.8 / len(FILLER_WORDS)),
+        np.full(len(CONTEXT_WORDS), 0.2 / len(CONTEXT_WORDS))
+    ])
+    tokens = rng.choice(words, size=int(lengths.sum()), p=weights)
+    bounds = np.concatenate([[0], np.cumsum(lengths)])
+    return np.array([' '.join(tokens[start:end]) for start, end in zip(bounds[:-1], bounds[1:])], dtype=object)
+
+def _misspell(name: str, position: int) -> str:
+    """Drop one character, the most common typo in free-text place names"""
+    if len(name) < 5:
+        return name
+    position = 1 + position % (len(name) - 2)
+    return name[:position] + name[position + 1:]
+
+def generate_profiles(
+    n: int,
+    seed: int = 0,
+    context_pool_size: int = 4096,
+    typo_rate: float = 0.05,
+    locations: Optional[List[tuple]] = None
+) -> pd.DataFrame:
+    """Synthetic assessments covering every input of the Streamlit form
+
+    Columns use the app's argument names (mark10th, ..., salexpect for
+    StressPredictor.build_features; emotion, trigger_events, context_text, state
+    and city for the recommendation engine). Everything is drawn in vectorized
+    NumPy, so millions of profiles take seconds. Context texts and trigger lists
+    are drawn from shared pools rather than built per row to keep memory flat.
+    """
+    rng = np.random.default_rng(seed)
+    locations = locations if locations is not None else _load_locations()
+
+    # Marks are correlated through an underlying ability score
+    ability = rng.normal(72, 10, n)
+    marks = [np.clip(np.rint(ability + rng.normal(0, 7, n)), 30, 100) for _ in range(3)]
+
+    gender_codes = rng.integers(0, len(GENDERS), n)
+    height = np.where(gender_codes == 0, rng.normal(171, 7, n), rng.normal(158, 6, n))
+    height = np.clip(np.rint(height), 140, 200)
+    bmi = rng.normal(22, 3.5, n)
+    weight = np.clip(np.rint(bmi * (height / 100) ** 2), 30, 120)
+
+    salary = np.clip(np.rint(rng.lognormal(np.log(40000), 0.6, n) / 1000) * 1000, 10000, 2000000)
+
+    # Trigger events as bitmasks; about a fifth of students report no specific trigger
+    trigger_bits = rng.random((n, len(TRIGGERS))) < 0.12
+    masks = trigger_bits.astype(np.int64) @ (1 << np.arange(len(TRIGGERS), dtype=np.int64))
+    unique_masks, mask_codes = np.unique(masks, return_inverse=True)
+    trigger_lists = np.empty(len(unique_masks), dtype=object)
+    for index, mask in enumerate(unique_masks):
+        events = [event for bit, event in enumerate(TRIGGERS) if mask >> bit & 1]
+        trigger_lists[index] = events or [NO_TRIGGER]
+
+    # Locations weighted uniformly over the cities in state_city_data.json
+    location_codes = rng.integers(0, len(locations), n)
+    states = np.array([state for state, _ in locations], dtype=object)[location_codes]
+    cities = np.array([city for _, city in locations], dtype=object)[location_codes]
+    misspelt = rng.random(n) < typo_rate
+    if misspelt.any():
+        typo_cities = np.array([_misspell(city, index) for index, (_, city) in enumerate(locations)], dtype=object)
+        cities[misspelt] = typo_cities[location_codes[misspelt]]
+
+    contexts = _context_pool(rng, context_pool_size)
+
+    return pd.DataFrame({
+        'mark10th': marks[0],
+        'mark12th': marks[1],
+        'collegemark': marks[2],
+        'gender': np.array(GENDERS, dtype=object)[gender_codes],
+        'height': height,
+        'weight': weight,
+        'financial': rng.choice(np.array(FINANCIAL_STATUSES, dtype=object), n, p=[0.1, 0.25, 0.45, 0.2]),
+        'course': rng.choice(np.array(COURSES, dtype=object), n),
+        'salexpect': salary,
+        'emotion': rng.choice(np.array(EMOTIONS, dtype=object), n),
+        'trigger_events': trigger_lists[mask_codes.reshape(-1)],
+        'context_text': contexts[rng.integers(0, len(contexts), n)],
+        'state': states,
+        'city': cities
+    })
+
+def summarize(durations_ns: Sequence[int], rows_per_call: int = 1) -> Dict:
+    """Latency percentiles (microseconds) and throughput for a list of call durations"""
+    durations = np.asarray(durations_ns, dtype=float) / 1000
+    total_seconds = durations.sum() / 1e6
+    return {
+        'calls': int(len(durations)),
+        'rows_per_call': rows_per_call,
+        'mean_us': float(durations.mean()),
+        'p50_us': float(np.percentile(durations, 50)),
+        'p95_us': float(np.percentile(durations, 95)),
+        'p99_us': float(np.percentile(durations, 99)),
+        'min_us': float(durations.min()),
+        'max_us': float(durations.max()),
+        'rows_per_second': float(len(durations) * rows_per_call / total_seconds) if total_seconds else 0.0
+    }
+
+def time_calls(function: Callable, arguments: Sequence, warmup: int = 10) -> List[int]:
+    """Per-call wall time in nanoseconds, after a few untimed warmup calls"""
+    for args in arguments[:warmup]:
+        function(*args)
+    durations = []
+    clock = time.perf_counter_ns
+    for args in arguments:
+        started = clock()
+        function(*args)
+        durations.append(clock() - started)
+    return durations
+
+def run_benchmarks(
+    profiles: int = 1000000,
+    samples: int = 2000,
+    batch_size: int = 1000,
+    load_repeats: int = 5,
+    seed: int = 0,
+    artifact_dir: str = DEFAULT_ARTIFACT_DIR,
+    package_path: str = DEFAULT_PACKAGE_PATH,
+    only: Optional[List[str]] = None
+) -> Dict:
+    """Run every benchmark (or those named in ``only``) and return the results document"""
+    import joblib
+    from inference import StressPredictor
+    from model_artifacts import MANIFEST_NAME, ModelArtifacts
+    from recommendation_engine import PersonalizedRecommendationEngine
+
+    results = {}
+    selected = lambda name: only is None or name in only
+
+    started = time.perf_counter_ns()
+    frame = generate_profiles(profiles, seed=seed)
+    generation_ns = time.perf_counter_ns() - started
+    if selected('generate_profiles'):
+        results['generate_profiles'] = summarize([generation_ns], rows_per_call=profiles)
+
+    sample = frame.sample(n=min(samples, len(frame)), random_state=seed)
+    records = sample.to_dict('records')
+
+    # The uncached engine, so every call does the full work
+    engine = PersonalizedRecommendationEngine()
+    analyzer = engine.emotional_analyzer
+    locations = engine.location_recommendations
+
+    if selected('analyze_emotional_state'):
+        durations = time_calls(
+            analyzer.analyze_emotional_state,
+            [(r['emotion'], r['trigger_events'], r['context_text']) for r in records]
+        )
+        results['analyze_emotional_state'] = summarize(durations)
+
+    if selected('get_nearby_facilities'):
+        durations = time_calls(locations.get_nearby_facilities, [(r['state'], r['city']) for r in records])
+        results['get_nearby_facilities'] = summarize(durations)
+
+    if os.path.exists(os.path.join(artifact_dir, MANIFEST_NAME)):
+        predictor = StressPredictor.from_artifacts(ModelArtifacts(artifact_dir))
+    else:
+        predictor = StressPredictor.from_package(joblib.load(package_path))
+
+    if selected('predict_single'):
+        durations = time_calls(
+            lambda form: predictor.predict(**form),
+            [({field: r[field] for field in FORM_FIELDS},) for r in records]
+        )
+        results['predict_single'] = summarize(durations)
+
+    if selected('predict_batch'):
+        batches = []
+        for start in range(0, len(frame), batch_size):
+            if len(batches) * batch_size >= samples * 10:
+                break
+            rows = frame.iloc[start:start + batch_size]
+            batches.append((np.array([predictor.build_features(**r) for r in rows[FORM_FIELDS].to_dict('records')]),))
+        results['predict_batch'] = summarize(time_calls(predictor.predict_proba_batch, batches, warmup=1), batch_size)
+
+    if selected('explain_single') and predictor.explainer is not None:
+        explainer = predictor.explainer
+        # Unbudgeted, so the full cost of an explanation is measured
+        class_count = len(predictor.class_names)
+        durations = time_calls(
+            lambda features, class_index: explainer.explain_one(features, class_index, budget_ms=None),
+            [(predictor.build_features(**{field: r[field] for field in FORM_FIELDS}), i % class_count) for i, r in enumerate(records[:200])]
+        )
+        results['explain_single'] = summarize(durations)
+
+    if (selected('predict_ensemble_single') or selected('predict_ensemble_batch')) and os.path.exists(os.path.join(artifact_dir, MANIFEST_NAME)):
+        from ensemble import EnsemblePredictor
+
+        ensemble = EnsemblePredictor.from_artifacts(ModelArtifacts(artifact_dir))
+        ensemble.warm()
+        feature_rows = [ensemble.build_features(**{field: r[field] for field in FORM_FIELDS}) for r in records]
+        if selected('predict_ensemble_single'):
+            results['predict_ensemble_single'] = summarize(time_calls(ensemble.predict_proba_one, [(row,) for row in feature_rows]))
+        if selected('predict_ensemble_batch'):
+            matrix = np.array(feature_rows)
+            batches = [(matrix[start:start + batch_size],) for start in range(0, len(matrix), batch_size)]
+            results['predict_ensemble_batch'] = summarize(time_calls(ensemble.predict_proba_batch, batches, warmup=1), batch_size)
+        ensemble.close()
+
+    if selected('generate_comprehensive_recommendations'):
+        arguments = []
+        for r in records:
+            level, probabilities = predictor.predict(**{field: r[field] for field in FORM_FIELDS})
+            arguments.append((
+                level, probabilities, r['course'], r['emotion'], r['trigger_events'],
+                r['context_text'], r['state'], r['city'], {}
+            ))
+        durations = time_calls(engine.generate_comprehensive_recommendations, arguments)
+        results['generate_comprehensive_recommendations'] = summarize(durations)
+
+    if selected('load_artifacts') and os.path.exists(os.path.join(artifact_dir, MANIFEST_NAME)):
+        # A fresh ModelArtifacts each time, so the best model is read from disk again
+        durations = time_calls(
+            lambda: ModelArtifacts(artifact_dir).load_model(),
+            [()] * load_repeats,
+            warmup=1
+        )
+        results['load_artifacts'] = summarize(durations)
+
+    if selected('load_compiled') and os.path.exists(os.path.join(artifact_dir, MANIFEST_NAME)):
+        durations = time_calls(
+            lambda: ModelArtifacts(artifact_dir).load_compiled(),
+            [()] * load_repeats,
+            warmup=1
+        )
+        results['load_compiled'] = summarize(durations)
+
+    if selected('load_data_snapshot') or selected('load_data_json'):
+        from data_registry import DATA_REGISTRY, DataRegistry
+
+        # A fresh registry each time: the compiled snapshot versus parsing and validating the JSON
+        DATA_REGISTRY.get()
+        if selected('load_data_snapshot'):
+            results['load_data_snapshot'] = summarize(
+                time_calls(lambda: DataRegistry().get(), [()] * load_repeats, warmup=1)
+            )
+        if selected('load_data_json'):
+            results['load_data_json'] = summarize(
+                time_calls(lambda: DataRegistry(snapshot_dir=None).get(), [()] * load_repeats, warmup=1)
+            )
+
+    if selected('cohort_aggregate') or selected('cohort_histogram'):
+        import tempfile
+        from cohort_analytics import CohortStore
+
+        # Every generated profile as one scored assessment, spread over an academic year
+        rng = np.random.default_rng(seed)
+        year_start = int(np.datetime64('2025-06-01', 's').astype(np.int64))
+        cohort = frame[['course', 'state', 'city', 'emotion']].copy()
+        cohort['assessed_at'] = np.sort(year_start + rng.integers(0, 365 * 86400, len(frame)))
+        cohort['enhanced_stress_score'] = rng.beta(2, 2, len(frame))
+        with tempfile.TemporaryDirectory() as directory:
+            store = CohortStore(directory)
+            store.append(cohort)
+            if selected('cohort_aggregate'):
+                queries = [(('course', 'month'), None), (('state',), {'course': ['Engineering', 'Medical']})] * load_repeats
+                results['cohort_aggregate'] = summarize(time_calls(store.aggregate, queries, warmup=1), len(frame))
+            if selected('cohort_histogram'):
+                results['cohort_histogram'] = summarize(
+                    time_calls(lambda: store.histogram(20, group_by=('course',)), [()] * load_repeats, warmup=1),
+                    len(frame)
+                )
+
+    if selected('load_package'):
+        results['load_package'] = summarize(time_calls(joblib.load, [(package_path,)] * load_repeats, warmup=1))
+
+    return {
+        'metadata': _run_metadata(profiles=profiles, samples=samples, batch_size=batch_size, seed=seed),
+        'results': results
+    }
+
+def _run_metadata(**settings) -> Dict:
+    import sklearn
+
+    try:
+        revision = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'git_revision': revision,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'scikit_learn': sklearn.__version__,
+        'settings': settings
+    }
+
+def compare_results(current: Dict, baseline: Dict, threshold: float = 0.10) -> List[Dict]:
+    """Per-benchmark change in p50 and mean latency; a p50 slowdown above ``threshold`` is a regression
+
+    The mean is reported but not flagged, since a single slow call moves it a lot.
+    """
+    comparison = []
+    for name, stats in current['results'].items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            continue
+        row = {'benchmark': name, 'regression': False}
+        for metric in ('p50_us', 'mean_us'):
+            change = stats[metric] / previous[metric] - 1 if previous[metric] else 0.0
+            row[metric.replace('_us', '_change')] = change
+        row['regression'] = row['p50_change'] > threshold
+        comparison.append(row)
+    return comparison
+
+def _print_results(document: Dict):
+    print(f"{'benchmark':<40} {'p50 us':>10} {'p95 us':>10} {'p99 us':>10} {'rows/s':>12}")
+    for name, stats in document['results'].items():
+        print(f"{name:<40} {stats['p50_us']:>10.1f} {stats['p95_us']:>10.1f} {stats['p99_us']:>10.1f} {stats['rows_per_second']:>12.0f}")
+
+def _print_comparison(comparison: List[Dict], threshold: float):
+    print(f"\n{'benchmark':<40} {'p50':>9} {'mean':>9}")
+    for row in comparison:
+        flag = '  REGRESSION' if row['regression'] else ''
+        print(f"{row['benchmark']:<40} {row['p50_change']:>+9.1%} {row['mean_change']:>+9.1%}{flag}")
+    regressions = sum(row['regression'] for row in comparison)
+    print(f'{regressions} regression(s) above {threshold:.0%}')
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the prediction and recommendation hot paths')
+    parser.add_argument('--profiles', type=int, default=1000000, help='synthetic profiles to generate')
+    parser.add_argument('--samples', type=int, default=2000, help='timed calls per single-row benchmark')
+    parser.add_argument('--batch-size', type=int, default=1000, help='rows per predict_proba_batch call')
+    parser.add_argument('--load-repeats', type=int, default=5, help='timed loads per artifact benchmark')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='+', help='run only these benchmarks')
+    parser.add_argument('--artifacts', default=DEFAULT_ARTIFACT_DIR, help='split model artifact directory')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='where to write the results JSON')
+    parser.add_argument('--compare', help='baseline results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='relative slowdown flagged as a regression')
+    parser.add_argument('--fail-on-regression', action='store_true', help='exit with status 1 when a regression is flagged')
+    args = parser.parse_args()
+
+    document = run_benchmarks(
+        profiles=args.profiles,
+        samples=args.samples,
+        batch_size=args.batch_size,
+        load_repeats=args.load_repeats,
+        seed=args.seed,
+        artifact_dir=args.artifacts,
+        only=args.only
+    )
+    _print_results(document)
+
+    regressions = 0
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        comparison = compare_results(document, baseline, args.threshold)
+        document['comparison'] = {'baseline': args.compare, 'threshold': args.threshold, 'benchmarks': comparison}
+        _print_comparison(comparison, args.threshold)
+        regressions = sum(row['regression'] for row in comparison)
+
+    with open(args.output, 'w') as f:
+        json.dump(document, f, indent=2)
+    print(f'Results written to {args.output}')
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
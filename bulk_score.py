@@ -0,0 +1,152 @@
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from survey_data import read_survey_chunks
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ARTIFACT_DIR = os.path.join(BASE_DIR, 'models')
+
+# Survey departments -> the app's professional courses (for course factors and advice)
+DEPARTMENT_COURSES = {
+    'bca': 'Computer Science',
+    'commerce': 'Commerce',
+    'b.com accounting and finance': 'Commerce',
+    'b.com ism': 'Commerce'
+}
+
+# Set in each worker process by _init_worker
+_predictor = None
+_engine = None
+_explain = False
+
+def _init_worker(artifact_dir: str, explain: bool = False):
+    """Load the predictor and recommendation engine once per worker process"""
+    global _predictor, _engine, _explain
+    from recommendation_engine import PersonalizedRecommendationEngine
+    from scoring_service import load_predictor
+
+    _predictor = load_predictor(artifact_dir)
+    # Chunks up to COMPILED_BATCH_MAX_ROWS use the compiled trees; the sklearn model
+    # loads lazily for larger chunks
+    _predictor.compiled
+    _engine = PersonalizedRecommendationEngine()
+    _explain = explain and _predictor.explainer is not None
+
+def _column(chunk: pd.DataFrame, name: str, default):
+    if name in chunk.columns:
+        return chunk[name].where(chunk[name].notna(), default)
+    return pd.Series(default, index=chunk.index)
+
+def score_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Feature engineering, model inference and recommendation scoring for one chunk"""
+    features = _predictor.build_feature_matrix(chunk)
+    probabilities = _predictor.predict_proba_batch(features)
+
+    if 'course' in chunk.columns:
+        courses = chunk['course']
+    else:
+        courses = _column(chunk, 'dept', '').astype(str).str.strip().str.lower().map(DEPARTMENT_COURSES).fillna('')
+
+    # Optional assessment columns; triggers are ';'-separated in CSV input
+    triggers = _column(chunk, 'trigger_events', '').astype(str)
+    students = pd.DataFrame({
+        'course': courses,
+        'emotion': _column(chunk, 'emotion', 'Neutral'),
+        'trigger_events': [[event.strip() for event in value.split(';') if event.strip()] for value in triggers],
+        'context_text': _column(chunk, 'context_text', '')
+    }, index=chunk.index)
+    students['ml_probabilities'] = list(probabilities)
+
+    scores = _engine.score_batch(students, include_facilities=False)
+
+    result = pd.DataFrame(index=chunk.index)
+    result['row'] = chunk.index
+    if 'student_id' in chunk.columns:
+        result['student_id'] = chunk['student_id']
+    result['ml_prediction'] = np.asarray(_predictor.class_names, dtype=object)[probabilities.argmax(axis=1)]
+    for class_index, class_name in enumerate(_predictor.class_names):
+        result[f'probability_{class_name.lower()}'] = probabilities[:, class_index]
+    for column in scores.columns:
+        result[column] = scores[column]
+    if _explain:
+        # Each row's attributions towards its predicted class
+        attributions = _predictor.explainer.explain_batch(features, probabilities.argmax(axis=1))
+        for feature_index, feature in enumerate(_predictor.feature_columns):
+            result[f'attribution_{feature}'] = attributions[:, feature_index]
+    return result
+
+def _write(result: pd.DataFrame, output, output_format: str, header: bool):
+    if output_format == 'ndjson':
+        if len(result):
+            # Some pandas versions end lines=True output with a newline and some do not
+            text = result.to_json(orient='records', lines=True, double_precision=15)
+            output.write(text if text.endswith('\n') else text + '\n')
+    else:
+        result.to_csv(output, header=header, index=False)
+
+def bulk_score(
+    input_path: str,
+    output_path: str,
+    chunk_size: int = 10000,
+    workers: int = 0,
+    artifact_dir: str = DEFAULT_ARTIFACT_DIR,
+    output_format: str = None,
+    explain: bool = False
+) -> int:
+    """Stream a survey CSV through the scoring pipeline; returns the number of rows scored
+
+    At most two chunks per worker are in flight, so memory is bounded by the chunk
+    size rather than the file size. Results are written in input order. With
+    ``explain``, each row also gets its feature attributions towards the predicted
+    class, when the served model has an explainer.
+    """
+    output_format = output_format or ('ndjson' if output_path.endswith(('.ndjson', '.jsonl')) else 'csv')
+    chunks = read_survey_chunks(input_path, chunk_size)
+    rows = 0
+
+    with open(output_path, 'w', newline='') as output:
+        if workers <= 0:
+            _init_worker(artifact_dir, explain)
+            for chunk in chunks:
+                _write(score_chunk(chunk), output, output_format, header=rows == 0)
+                rows += len(chunk)
+            return rows
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(artifact_dir, explain)) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(score_chunk, chunk))
+                if len(pending) >= 2 * workers:
+                    result = pending.popleft().result()
+                    _write(result, output, output_format, header=rows == 0)
+                    rows += len(result)
+            while pending:
+                result = pending.popleft().result()
+                _write(result, output, output_format, header=rows == 0)
+                rows += len(result)
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description='Score a student survey CSV in parallel chunks')
+    parser.add_argument('input', help='CSV in the Student Attitude and Behavior survey format')
+    parser.add_argument('output', help='output file (.csv, or .ndjson/.jsonl for newline-delimited JSON)')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='rows per chunk')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='worker processes (0 scores in-process)')
+    parser.add_argument('--artifacts', default=DEFAULT_ARTIFACT_DIR, help='split model artifact directory')
+    parser.add_argument('--format', choices=['csv', 'ndjson'], help='output format (default: from the output extension)')
+    parser.add_argument('--explain', action='store_true', help='add per-feature attribution columns (tree and logistic regression models)')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    rows = bulk_score(args.input, args.output, args.chunk_size, args.workers, args.artifacts, args.format, args.explain)
+    elapsed = time.perf_counter() - started
+    print(f'Scored {rows} rows in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):.0f} rows/s) -> {args.output}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,448 @@
+import argparse
+import contextlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends then assume a single writing process
+    fcntl = None
+
+from survey_data import STRESS_LEVELS
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_STORE_DIR = os.path.join(BASE_DIR, '.cache', 'cohorts')
+VOCABULARY_NAME = 'vocabularies.json'
+LOCK_NAME = 'append.lock'
+SEGMENT_META_NAME = 'meta.json'
+SEGMENT_FORMAT_VERSION = 1
+
+# Integer-coded columns; the two stress levels use the fixed class order, the rest
+# grow their vocabulary on append and never renumber existing codes
+CATEGORICAL_COLUMNS = ('course', 'state', 'city', 'emotion', 'ml_prediction', 'enhanced_stress_level')
+FIXED_VOCABULARIES = {'ml_prediction': STRESS_LEVELS, 'enhanced_stress_level': STRESS_LEVELS}
+CODE_DTYPE = np.uint16
+NUMERIC_COLUMNS = {'assessed_at': np.int64, 'enhanced_stress_score': np.float32}
+COLUMNS = CATEGORICAL_COLUMNS + tuple(NUMERIC_COLUMNS)
+# Stored for missing categorical values (absent column, None, NaN) instead of 'None' / 'nan'
+MISSING_VALUE = ''
+
+# Calendar buckets derived from assessed_at (Unix seconds, UTC)
+TIME_BUCKETS = ('day', 'week', 'month')
+
+# Largest dense group-by key space; above it, groups are found with np.unique
+DENSE_GROUP_LIMIT = 1 << 22
+
+def _seed_vocabularies() -> Dict[str, List[str]]:
+    """Initial codes from the app's course, location and emotion vocabularies"""
+    with open(os.path.join(BASE_DIR, 'course_stress_patterns.json'), 'r') as f:
+        courses = list(json.load(f))
+    with open(os.path.join(BASE_DIR, 'state_city_data.json'), 'r') as f:
+        state_cities = json.load(f)
+    cities = sorted({city for city_list in state_cities.values() for city in city_list})
+    emotions = [
+        'Very Happy', 'Happy', 'Content', 'Neutral', 'Slightly Stressed',
+        'Stressed', 'Very Stressed', 'Anxious', 'Depressed', 'Overwhelmed',
+        'Panicked', 'Hopeless'
+    ]
+    vocabularies = {'course': courses, 'state': list(state_cities), 'city': cities, 'emotion': emotions}
+    vocabularies.update({name: list(values) for name, values in FIXED_VOCABULARIES.items()})
+    return vocabularies
+
+def _is_missing(value) -> bool:
+    return value is None or (isinstance(value, (float, np.floating)) and np.isnan(value))
+
+def _time_bucket(timestamps: np.ndarray, unit: str) -> np.ndarray:
+    """Days, weeks (starting Monday) or months since the Unix epoch"""
+    if unit == 'day':
+        return timestamps // 86400
+    if unit == 'week':
+        # 1970-01-01 was a Thursday
+        return (timestamps // 86400 + 3) // 7
+    return timestamps.astype('datetime64[s]').astype('datetime64[M]').astype(np.int64)
+
+def _time_label(bucket: int, unit: str) -> str:
+    if unit == 'day':
+        return str(np.datetime64(int(bucket), 'D'))
+    if unit == 'week':
+        return str(np.datetime64(int(bucket) * 7 - 3, 'D'))
+    return str(np.datetime64(int(bucket), 'M'))
+
+class _Segment:
+    """One immutable block of rows: a .npy file per column plus zone maps in meta.json"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, SEGMENT_META_NAME), 'r') as f:
+            self.meta = json.load(f)
+        self.rows = self.meta['rows']
+        self._columns = {}
+
+    def column(self, name: str) -> np.ndarray:
+        array = self._columns.get(name)
+        if array is None:
+            array = self._columns[name] = np.load(os.path.join(self.path, f'{name}.npy'), mmap_mode='r')
+        return array
+
+    def may_match(self, filters: Dict) -> bool:
+        """False when the zone maps prove no row passes the filters"""
+        zones = self.meta['zones']
+        for name, condition in filters.items():
+            if name in NUMERIC_COLUMNS:
+                low, high = condition
+                if (low is not None and zones[name]['max'] < low) or (high is not None and zones[name]['min'] >= high):
+                    return False
+            elif not set(zones[name]['codes']).intersection(condition):
+                return False
+        return True
+
+class CohortStore:
+    """Append-only columnar store of scored assessments for cohort dashboards
+
+    Rows are written in immutable segments: one memory-mapped .npy file per column,
+    categoricals as uint16 codes. Each segment records zone maps (min/max of the
+    numeric columns and the codes present in each categorical), so queries skip
+    segments that cannot match and read only the columns they use. Group-bys and
+    histograms are np.bincount over a combined integer key, with no per-row Python.
+    """
+
+    def __init__(self, directory: str = DEFAULT_STORE_DIR, max_segment_rows: int = 1 << 20):
+        self.directory = directory
+        self.max_segment_rows = max_segment_rows
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.vocabularies = self._read_vocabularies()
+        self._codes = {name: {value: code for code, value in enumerate(values)} for name, values in self.vocabularies.items()}
+        self.segments = []
+        self.refresh()
+
+    def _read_vocabularies(self) -> Dict[str, List[str]]:
+        path = os.path.join(self.directory, VOCABULARY_NAME)
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                return json.load(f)
+        return _seed_vocabularies()
+
+    def _write_vocabularies(self):
+        path = os.path.join(self.directory, VOCABULARY_NAME)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(self.vocabularies, f)
+        os.replace(temp_path, path)
+
+    @contextlib.contextmanager
+    def _append_lock(self):
+        """Exclusive lock on the store directory, held by one appending process at a time"""
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, LOCK_NAME), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def refresh(self):
+        """Pick up segments appended by another process"""
+        with self._lock:
+            self._load()
+
+    def _load(self):
+        known = {segment.path for segment in self.segments}
+        names = sorted(name for name in os.listdir(self.directory) if re.fullmatch(r'segment-\d{6}', name))
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if path not in known:
+                self.segments.append(_Segment(path))
+        self.vocabularies = self._read_vocabularies()
+        self._codes = {name: {value: code for code, value in enumerate(values)} for name, values in self.vocabularies.items()}
+
+    @property
+    def rows(self) -> int:
+        return sum(segment.rows for segment in self.segments)
+
+    def encode(self, name: str, values, grow: bool = False) -> np.ndarray:
+        """Codes of a categorical column; new values get new codes when ``grow`` is set"""
+        values = np.asarray(values, dtype=object).reshape(-1)
+        codes = self._codes[name]
+        # One dict lookup per row; sorting millions of strings for np.unique is far slower
+        encoded = np.fromiter((codes.get(value, -1) for value in values), dtype=np.int64, count=len(values))
+        missing = np.flatnonzero(encoded < 0)
+        if len(missing):
+            unseen_values = values[missing]
+            blank = np.fromiter((_is_missing(value) for value in unseen_values), dtype=bool, count=len(missing))
+            unseen_values[blank] = MISSING_VALUE
+            unseen, inverse = np.unique(unseen_values.astype(str), return_inverse=True)
+            unseen_codes = np.empty(len(unseen), dtype=np.int64)
+            for index, value in enumerate(unseen):
+                code = codes.get(value)
+                if code is None:
+                    # Stress levels only ever gain MISSING_VALUE
+                    if not grow or (name in FIXED_VOCABULARIES and value != MISSING_VALUE):
+                        raise ValueError(f'Unknown {name}: {value!r}')
+                    code = codes[value] = len(self.vocabularies[name])
+                    self.vocabularies[name].append(value)
+                    if code > np.iinfo(CODE_DTYPE).max:
+                        raise ValueError(f'Too many distinct values for {name}')
+                unseen_codes[index] = code
+            encoded[missing] = unseen_codes[inverse.reshape(-1)]
+        return encoded.astype(CODE_DTYPE)
+
+    def append(self, columns: Mapping, assessed_at: Optional[float] = None) -> int:
+        """Append rows from a DataFrame or mapping of columns; returns the number of rows written
+
+        ``assessed_at`` (Unix seconds) may be a column or is filled with ``assessed_at``
+        or the current time. Missing categorical columns and values (None, NaN) are
+        stored as MISSING_VALUE. Appends from several processes are serialized by a
+        lock file in the store directory (where fcntl is available).
+        """
+        lengths = {len(columns[name]) for name in COLUMNS if name in columns}
+        if len(lengths) != 1:
+            raise ValueError('Columns must be non-empty and of equal length')
+        n_rows = lengths.pop()
+
+        with self._lock, self._append_lock():
+            # Another process may have grown the vocabularies or added segments since we last looked
+            self._load()
+            encoded = {}
+            for name in CATEGORICAL_COLUMNS:
+                values = columns[name] if name in columns else [MISSING_VALUE] * n_rows
+                encoded[name] = self.encode(name, values, grow=True)
+            if 'assessed_at' in columns:
+                encoded['assessed_at'] = np.asarray(columns['assessed_at'], dtype=np.int64)
+            else:
+                encoded['assessed_at'] = np.full(n_rows, int(time.time() if assessed_at is None else assessed_at), dtype=np.int64)
+            encoded['enhanced_stress_score'] = np.asarray(columns['enhanced_stress_score'], dtype=np.float32)
+
+            # Codes must be on disk before a segment using them becomes visible
+            self._write_vocabularies()
+            for start in range(0, n_rows, self.max_segment_rows):
+                self._write_segment({name: array[start:start + self.max_segment_rows] for name, array in encoded.items()})
+        return n_rows
+
+    def _write_segment(self, arrays: Dict[str, np.ndarray]):
+        # Numbering from self.segments is only safe under _append_lock, after _load()
+        existing = [os.path.basename(segment.path) for segment in self.segments]
+        number = int(existing[-1].split('-')[1]) + 1 if existing else 1
+        path = os.path.join(self.directory, f'segment-{number:06d}')
+        temp_path = os.path.join(self.directory, f'.segment-{number:06d}.tmp')
+        shutil.rmtree(temp_path, ignore_errors=True)
+        os.makedirs(temp_path)
+
+        zones = {}
+        for name, array in arrays.items():
+            np.save(os.path.join(temp_path, f'{name}.npy'), array)
+            if name in NUMERIC_COLUMNS:
+                zones[name] = {'min': array.min().item(), 'max': array.max().item()}
+            else:
+                zones[name] = {'codes': np.unique(array).tolist()}
+        with open(os.path.join(temp_path, SEGMENT_META_NAME), 'w') as f:
+            json.dump({'format_version': SEGMENT_FORMAT_VERSION, 'rows': len(arrays['enhanced_stress_score']), 'zones': zones}, f)
+        os.rename(temp_path, path)
+        self.segments.append(_Segment(path))
+
+    def _normalize_filters(self, where: Optional[Mapping]) -> Optional[Dict]:
+        """Filters as code sets and [low, high) ranges; None when a filter can match nothing"""
+        filters = {}
+        for name, condition in (where or {}).items():
+            if name in NUMERIC_COLUMNS:
+                low, high = condition
+                filters[name] = (low, high)
+            elif name in CATEGORICAL_COLUMNS:
+                values = [condition] if isinstance(condition, str) else list(condition)
+                codes = {self._codes[name][value] for value in values if value in self._codes[name]}
+                if not codes:
+                    return None
+                filters[name] = codes
+            else:
+                raise ValueError(f'Cannot filter on {name}')
+        return filters
+
+    def _segment_mask(self, segment: _Segment, filters: Dict) -> Optional[np.ndarray]:
+        mask = None
+        for name, condition in filters.items():
+            column = segment.column(name)
+            if name in NUMERIC_COLUMNS:
+                low, high = condition
+                passes = np.ones(len(column), dtype=bool) if low is None else column >= low
+                if high is not None:
+                    passes &= column < high
+            elif len(condition) == 1:
+                passes = column == next(iter(condition))
+            else:
+                lookup = np.zeros(len(self.vocabularies[name]), dtype=bool)
+                lookup[list(condition)] = True
+                passes = lookup[column]
+            mask = passes if mask is None else mask & passes
+        return mask
+
+    def _scan(self, where: Optional[Mapping], group_by: Sequence[str]):
+        """Yield (group key columns, scores, row count) for the matching rows of each segment"""
+        for name in group_by:
+            if name not in CATEGORICAL_COLUMNS and name not in TIME_BUCKETS:
+                raise ValueError(f'Cannot group by {name}')
+        filters = self._normalize_filters(where)
+        if filters is None:
+            return
+        for segment in list(self.segments):
+            if not segment.may_match(filters):
+                continue
+            mask = self._segment_mask(segment, filters)
+            if mask is not None and not mask.any():
+                continue
+            keys = []
+            for name in group_by:
+                if name in TIME_BUCKETS:
+                    column = _time_bucket(np.asarray(segment.column('assessed_at')), name)
+                else:
+                    column = segment.column(name)
+                keys.append(column if mask is None else column[mask])
+            scores = segment.column('enhanced_stress_score')
+            if mask is not None:
+                scores = scores[mask]
+            yield keys, scores, (segment.rows if mask is None else int(mask.sum()))
+
+    def _group_labels(self, name: str, code: int) -> str:
+        if name in TIME_BUCKETS:
+            return _time_label(code, name)
+        return self.vocabularies[name][code]
+
+    def _accumulate(self, where, group_by: Sequence[str], bins: Optional[np.ndarray] = None) -> Dict[Tuple, List]:
+        """Per group: count, score sum, sum of squares (and bin counts when ``bins`` is given)"""
+        totals = {}
+        for keys, scores, rows in self._scan(where, group_by):
+            scores = np.asarray(scores, dtype=np.float64)
+            if keys:
+                # Mixed-radix key over the group columns' observed ranges in this segment
+                offsets = [int(key.min()) for key in keys]
+                sizes = [int(key.max()) - offset + 1 for key, offset in zip(keys, offsets)]
+                combined = np.zeros(rows, dtype=np.int64)
+                for key, offset, size in zip(keys, offsets, sizes):
+                    combined = combined * size + (key.astype(np.int64) - offset)
+                key_space = int(np.prod(sizes))
+                if key_space <= DENSE_GROUP_LIMIT:
+                    group_ids = combined
+                    present = None
+                else:
+                    present, group_ids = np.unique(combined, return_inverse=True)
+                    key_space = len(present)
+            else:
+                offsets, sizes, present = [], [], None
+                group_ids = np.zeros(rows, dtype=np.int64)
+                key_space = 1
+
+            counts = np.bincount(group_ids, minlength=key_space)
+            sums = np.bincount(group_ids, weights=scores, minlength=key_space)
+            squares = np.bincount(group_ids, weights=scores * scores, minlength=key_space)
+            histogram = None
+            if bins is not None:
+                bin_ids = np.clip(np.searchsorted(bins, scores, side='right') - 1, 0, len(bins) - 2)
+                histogram = np.bincount(group_ids * (len(bins) - 1) + bin_ids, minlength=key_space * (len(bins) - 1))
+                histogram = histogram.reshape(key_space, len(bins) - 1)
+
+            for group in np.flatnonzero(counts):
+                flat = int(present[group]) if present is not None else int(group)
+                key = []
+                for offset, size in zip(reversed(offsets), reversed(sizes)):
+                    key.append(flat % size + offset)
+                    flat //= size
+                key = tuple(reversed(key))
+                entry = totals.get(key)
+                if entry is None:
+                    entry = totals[key] = [0, 0.0, 0.0, None if bins is None else np.zeros(len(bins) - 1, dtype=np.int64)]
+                entry[0] += int(counts[group])
+                entry[1] += float(sums[group])
+                entry[2] += float(squares[group])
+                if histogram is not None:
+                    entry[3] += histogram[group]
+        return totals
+
+    def aggregate(self, group_by: Sequence[str] = (), where: Optional[Mapping] = None) -> List[Dict]:
+        """count, mean and standard deviation of enhanced_stress_score per group
+
+        ``group_by`` takes categorical columns and 'day', 'week' or 'month'. ``where``
+        maps categorical columns to a value or list of values and numeric columns
+        (assessed_at, enhanced_stress_score) to a [low, high) range, either end None.
+        """
+        rows = []
+        for key, (count, total, squares, _) in sorted(self._accumulate(where, group_by).items()):
+            mean = total / count
+            row = {name: self._group_labels(name, code) for name, code in zip(group_by, key)}
+            row.update({
+                'count': count,
+                'mean_score': mean,
+                'std_score': max(squares / count - mean * mean, 0.0) ** 0.5
+            })
+            rows.append(row)
+        return rows
+
+    def histogram(
+        self,
+        bins: int = 10,
+        value_range: Tuple[float, float] = (0.0, 1.0),
+        group_by: Sequence[str] = (),
+        where: Optional[Mapping] = None
+    ) -> Dict:
+        """Histogram of enhanced_stress_score per group; scores outside the range go to the end bins"""
+        edges = np.linspace(value_range[0], value_range[1], bins + 1)
+        groups = []
+        for key, (count, _, _, counts) in sorted(self._accumulate(where, group_by, edges).items()):
+            row = {name: self._group_labels(name, code) for name, code in zip(group_by, key)}
+            row.update({'count': count, 'counts': counts.tolist()})
+            groups.append(row)
+        return {'bin_edges': edges.tolist(), 'groups': groups}
+
+def _parse_where(items: Sequence[str]) -> Dict:
+    """name=value[,value...] for categoricals, name=low:high for numeric columns"""
+    where = {}
+    for item in items or []:
+        name, _, value = item.partition('=')
+        if name in NUMERIC_COLUMNS:
+            low, _, high = value.partition(':')
+            if name == 'assessed_at':
+                parse = lambda text: int(np.datetime64(text, 's').astype(np.int64)) if text else None
+            else:
+                parse = lambda text: float(text) if text else None
+            where[name] = (parse(low), parse(high))
+        else:
+            where[name] = value.split(',')
+    return where
+
+def main():
+    parser = argparse.ArgumentParser(description='Cohort stress analytics over stored assessment results')
+    parser.add_argument('--store', default=DEFAULT_STORE_DIR, help='columnar store directory')
+    parser.add_argument('--ingest', help='CSV or NDJSON of scored assessments to append first')
+    parser.add_argument('--group-by', nargs='*', default=[], help=f"columns among {', '.join(CATEGORICAL_COLUMNS + TIME_BUCKETS)}")
+    parser.add_argument('--where', nargs='*', help='filters: course=BCA,Law or assessed_at=2025-06-01:2026-06-01')
+    parser.add_argument('--histogram', type=int, default=0, help='bins of an enhanced_stress_score histogram instead of summary stats')
+    args = parser.parse_args()
+
+    store = CohortStore(args.store)
+    if args.ingest:
+        import pandas as pd
+        frame = pd.read_json(args.ingest, lines=True) if args.ingest.endswith(('.ndjson', '.jsonl')) else pd.read_csv(args.ingest)
+        print(f'Appended {store.append(frame)} rows')
+
+    started = time.perf_counter()
+    where = _parse_where(args.where)
+    if args.histogram:
+        result = store.histogram(bins=args.histogram, group_by=args.group_by, where=where)
+        rows = result['groups']
+    else:
+        rows = store.aggregate(group_by=args.group_by, where=where)
+    elapsed = time.perf_counter() - started
+
+    for row in rows:
+        print(json.dumps(row))
+    print(f'{len(rows)} groups over {store.rows} stored rows in {elapsed * 1000:.1f} ms')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,320 @@
+import argparse
+import hashlib
+import json
+import logging
+import marshal
+import os
+import sys
+import threading
+import time
+from types import MappingProxyType
+from typing import Callable, Dict, Mapping, Optional, Tuple
+
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SNAPSHOT_DIR = os.path.join(BASE_DIR, '.cache', 'data')
+
+# Bump when validation or the snapshot layout changes so old snapshots are rebuilt
+SNAPSHOT_FORMAT_VERSION = 1
+
+# Dataset name -> source file, relative to the source directory
+DATASETS = {
+    'course_patterns': 'course_stress_patterns.json',
+    'facilities': 'india_mental_health_facilities.json',
+    'city_coordinates': 'city_coordinates.json',
+    'state_cities': 'state_city_data.json',
+}
+
+FACILITY_KINDS = ('hospitals', 'counseling_centers', 'support_groups')
+
+class DataValidationError(ValueError):
+    """A source file does not have the shape the recommendation engine expects"""
+
+def freeze(value):
+    """Recursively convert parsed JSON into read-only mappings and tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+def _require(condition: bool, message: str):
+    if not condition:
+        raise DataValidationError(message)
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _validate_course_patterns(data):
+    _require(isinstance(data, dict) and data, 'expected a non-empty object of courses')
+    for course, pattern in data.items():
+        _require(isinstance(pattern, dict), f'{course}: expected an object')
+        factor = pattern.get('base_stress_factor', 0.5)
+        _require(_is_number(factor) and 0.0 <= factor <= 1.0, f'{course}: base_stress_factor must be in [0, 1]')
+        for field in ('common_triggers', 'peak_stress_periods', 'coping_strategies'):
+            values = pattern.get(field, [])
+            _require(isinstance(values, list) and all(isinstance(v, str) for v in values),
+                     f'{course}: {field} must be a list of strings')
+
+def _validate_facilities(data):
+    _require(isinstance(data, dict) and data, 'expected a non-empty object of states')
+    for state, cities in data.items():
+        _require(isinstance(cities, dict), f'{state}: expected an object of cities')
+        for city, listing in cities.items():
+            _require(isinstance(listing, dict), f'{state}/{city}: expected an object of facility kinds')
+            for kind in FACILITY_KINDS:
+                entries = listing.get(kind, [])
+                _require(isinstance(entries, list), f'{state}/{city}: {kind} must be a list')
+                for entry in entries:
+                    _require(isinstance(entry, dict) and isinstance(entry.get('name'), str),
+                             f'{state}/{city}: every {kind} entry needs a name')
+                    # The facility index lower-cases these and the app joins services
+                    services = entry.get('services', [])
+                    _require(isinstance(services, list) and all(isinstance(service, str) for service in services),
+                             f"{state}/{city}: {entry['name']} services must be a list of strings")
+                    _require(isinstance(entry.get('type', ''), str), f"{state}/{city}: {entry['name']} type must be a string")
+
+def _validate_city_coordinates(data):
+    _require(isinstance(data, dict), 'expected an object of states')
+    for state, cities in data.items():
+        _require(isinstance(cities, dict), f'{state}: expected an object of cities')
+        for city, point in cities.items():
+            _require(isinstance(point, list) and len(point) == 2 and all(_is_number(v) for v in point),
+                     f'{state}/{city}: expected [latitude, longitude]')
+            _require(-90.0 <= point[0] <= 90.0 and -180.0 <= point[1] <= 180.0,
+                     f'{state}/{city}: coordinates out of range')
+
+def _validate_state_cities(data):
+    _require(isinstance(data, dict) and data, 'expected a non-empty object of states')
+    for state, cities in data.items():
+        _require(isinstance(cities, list) and all(isinstance(c, str) for c in cities),
+                 f'{state}: expected a list of city names')
+
+VALIDATORS = {
+    'course_patterns': _validate_course_patterns,
+    'facilities': _validate_facilities,
+    'city_coordinates': _validate_city_coordinates,
+    'state_cities': _validate_state_cities,
+}
+
+class DataSnapshot:
+    """One validated, read-only version of every dataset"""
+
+    def __init__(self, generation: int, digest: str, sources: Dict[str, list], datasets: Dict[str, object]):
+        self.generation = generation
+        self.digest = digest
+        self.sources = sources
+        self.datasets = MappingProxyType({name: freeze(data) for name, data in datasets.items()})
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str):
+        return self.datasets[name]
+
+    @property
+    def course_patterns(self) -> Mapping:
+        return self.datasets['course_patterns']
+
+    @property
+    def facilities(self) -> Mapping:
+        return self.datasets['facilities']
+
+    @property
+    def city_coordinates(self) -> Mapping:
+        return self.datasets['city_coordinates']
+
+    @property
+    def state_cities(self) -> Mapping:
+        return self.datasets['state_cities']
+
+    def derived(self, key: str, factory: Callable[['DataSnapshot'], object]):
+        """Build an object from this version once and share it; it is dropped with the version"""
+        value = self._derived.get(key)
+        if value is None:
+            with self._lock:
+                value = self._derived.get(key)
+                if value is None:
+                    value = self._derived[key] = factory(self)
+        return value
+
+class DataRegistry:
+    """Process-wide read-only access to the JSON datasets through a compiled snapshot
+
+    The sources are parsed and validated once, then written as a marshal snapshot
+    that later processes load instead of the JSON. Source mtimes are checked at most
+    every ``check_interval_seconds`` on access; a changed, valid source set is
+    swapped in atomically and an invalid one is logged and ignored.
+    """
+
+    def __init__(
+        self,
+        source_dir: str = BASE_DIR,
+        snapshot_dir: Optional[str] = DEFAULT_SNAPSHOT_DIR,
+        check_interval_seconds: float = 2.0
+    ):
+        self.source_dir = source_dir
+        self.snapshot_dir = snapshot_dir
+        self.check_interval_seconds = check_interval_seconds
+        self.current = None
+        self._last_check = 0.0
+        self._rejected_stats = None
+        self._lock = threading.Lock()
+
+    @property
+    def snapshot_path(self) -> Optional[str]:
+        if self.snapshot_dir is None:
+            return None
+        # marshal is interpreter-specific, so each interpreter keeps its own snapshot
+        return os.path.join(self.snapshot_dir, f'datasets.{sys.implementation.cache_tag}.snapshot')
+
+    def source_path(self, name: str) -> str:
+        return os.path.join(self.source_dir, DATASETS[name])
+
+    def get(self) -> DataSnapshot:
+        """Current snapshot, loading it on first use and picking up changed sources"""
+        current = self.current
+        if current is None:
+            with self._lock:
+                if self.current is None:
+                    self._swap(self._load())
+                return self.current
+        if time.monotonic() - self._last_check >= self.check_interval_seconds and self._lock.acquire(blocking=False):
+            # One caller checks; the others keep serving the current version meanwhile
+            try:
+                self._check()
+            finally:
+                self._lock.release()
+        return self.current
+
+    def refresh(self) -> bool:
+        """Check the sources now; True when a new version was swapped in"""
+        with self._lock:
+            if self.current is None:
+                self._swap(self._load())
+                return True
+            return self._check()
+
+    def _check(self) -> bool:
+        self._last_check = time.monotonic()
+        stats = self._stat_sources()
+        if stats == self._source_stats(self.current.sources) or stats == self._rejected_stats:
+            return False
+        try:
+            snapshot = self._load(stats)
+        except (OSError, ValueError) as e:
+            # Usually a half-written upload; retried once the files change again
+            self._rejected_stats = stats
+            logger.error('Keeping data version %s; the changed sources could not be loaded: %s', self.current.digest, e)
+            return False
+        if snapshot.digest == self.current.digest:
+            # Touched but unchanged; remember the new mtimes without a swap
+            self.current.sources = snapshot.sources
+            return False
+        self._swap(snapshot)
+        METRICS.increment('data_registry_swaps')
+        logger.info('Swapped in data version %s', snapshot.digest)
+        return True
+
+    def _swap(self, snapshot: DataSnapshot):
+        snapshot.generation = 1 if self.current is None else self.current.generation + 1
+        self.current = snapshot
+        self._last_check = time.monotonic()
+        self._rejected_stats = None
+
+    def _stat_sources(self) -> Dict[str, Tuple[int, int]]:
+        stats = {}
+        for name in DATASETS:
+            stat = os.stat(self.source_path(name))
+            stats[name] = (stat.st_size, stat.st_mtime_ns)
+        return stats
+
+    @staticmethod
+    def _source_stats(sources: Dict[str, list]) -> Dict[str, Tuple[int, int]]:
+        return {name: (source[0], source[1]) for name, source in sources.items()}
+
+    def _load(self, stats: Optional[Dict[str, Tuple[int, int]]] = None) -> DataSnapshot:
+        with METRICS.timer('data_registry_load'):
+            stats = stats or self._stat_sources()
+            compiled = self._read_snapshot()
+            if compiled is not None and self._source_stats(compiled['sources']) == stats:
+                return DataSnapshot(0, compiled['digest'], compiled['sources'], compiled['datasets'])
+            return self._compile(stats, compiled)
+
+    def _read_snapshot(self) -> Optional[dict]:
+        path = self.snapshot_path
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                compiled = marshal.loads(f.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            logger.warning('Ignoring unreadable data snapshot %s', path)
+            return None
+        if not isinstance(compiled, dict) or compiled.get('format') != SNAPSHOT_FORMAT_VERSION:
+            return None
+        if set(compiled.get('sources', ())) != set(DATASETS):
+            return None
+        return compiled
+
+    def _compile(self, stats: Dict[str, Tuple[int, int]], previous: Optional[dict]) -> DataSnapshot:
+        """Parse and validate the sources; reuse the previous snapshot's data when only mtimes moved"""
+        sources, datasets = {}, {}
+        for name in DATASETS:
+            with open(self.source_path(name), 'rb') as f:
+                raw = f.read()
+            size, mtime_ns = stats[name]
+            sha256 = hashlib.sha256(raw).hexdigest()
+            if previous is not None and previous['sources'][name][2] == sha256:
+                datasets[name] = previous['datasets'][name]
+            else:
+                try:
+                    datasets[name] = json.loads(raw)
+                    VALIDATORS[name](datasets[name])
+                except ValueError as e:
+                    raise DataValidationError(f'{DATASETS[name]}: {e}') from e
+            # Stats are taken before reading, so a write racing the read is seen on the next check
+            sources[name] = [size, mtime_ns, sha256]
+
+        digest = hashlib.sha256(''.join(sources[name][2] for name in DATASETS).encode()).hexdigest()[:16]
+        compiled = {'format': SNAPSHOT_FORMAT_VERSION, 'digest': digest, 'sources': sources, 'datasets': datasets}
+        self._write_snapshot(compiled)
+        return DataSnapshot(0, digest, sources, datasets)
+
+    def _write_snapshot(self, compiled: dict):
+        path = self.snapshot_path
+        if path is None:
+            return
+        try:
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            temp_path = f'{path}.{os.getpid()}.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(marshal.dumps(compiled))
+            os.replace(temp_path, path)
+        except OSError:
+            # A read-only checkout still works; it just parses the JSON on every cold start
+            logger.warning('Could not write data snapshot %s', path, exc_info=True)
+
+# Shared by every engine in the process
+DATA_REGISTRY = DataRegistry()
+
+def main():
+    parser = argparse.ArgumentParser(description='Validate the JSON datasets and compile the data snapshot')
+    parser.add_argument('--source-dir', default=BASE_DIR)
+    parser.add_argument('--snapshot-dir', default=DEFAULT_SNAPSHOT_DIR)
+    args = parser.parse_args()
+
+    registry = DataRegistry(args.source_dir, args.snapshot_dir)
+    try:
+        snapshot = registry.get()
+    except (OSError, ValueError) as e:
+        print(f'Invalid data: {e}')
+        sys.exit(1)
+    print(f'Data version {snapshot.digest} -> {registry.snapshot_path}')
+    for name, source in snapshot.sources.items():
+        print(f'  {DATASETS[name]:40s} {len(snapshot[name]):4d} entries  {source[0]:7d} bytes')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,354 @@
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from inference import COMPILED_BATCH_MAX_ROWS, StressPredictor
+from metrics import METRICS
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ARTIFACT_DIR = os.path.join(BASE_DIR, 'models')
+
+ENSEMBLE_CONFIG_NAME = 'ensemble.json'
+
+# Smoothing of the per-member latency estimates the latency budget relies on
+LATENCY_EWMA_ALPHA = 0.2
+
+class EnsemblePredictor:
+    """Soft-voting ensemble over the stored models, with the StressPredictor interface
+
+    Probabilities are the weighted mean of the members' probabilities. Batches too
+    large for the compiled trees go through sklearn, whose Cython and BLAS kernels
+    release the GIL, so members then run concurrently on a thread pool; single rows
+    and micro-batches are cheaper to run inline than to hand to a thread.
+
+    With ``latency_budget_ms`` set, members run in descending weight order and a
+    member whose estimated latency no longer fits the remaining budget is dropped;
+    the highest-weighted member always runs. The weights of the members that ran
+    are renormalized.
+    """
+
+    model_name = 'Ensemble'
+
+    def __init__(
+        self,
+        members: Mapping[str, StressPredictor],
+        weights: Optional[Mapping[str, float]] = None,
+        max_workers: Optional[int] = None,
+        latency_budget_ms: Optional[float] = None
+    ):
+        if not members:
+            raise ValueError('An ensemble needs at least one member')
+        weights = dict(weights) if weights is not None else {name: 1.0 for name in members}
+        unknown = set(weights) - set(members)
+        if unknown:
+            raise ValueError(f"Weights for unknown members: {', '.join(sorted(unknown))}")
+
+        # Members without weight are left out rather than evaluated for nothing
+        order = sorted((name for name in members if weights.get(name, 0.0) > 0), key=lambda name: -weights[name])
+        if not order:
+            raise ValueError('At least one ensemble weight must be positive')
+        self.member_names = order
+        self.members = {name: members[name] for name in order}
+        self.weights = {name: float(weights[name]) for name in order}
+
+        primary = self.members[order[0]]
+        self.feature_columns = primary.feature_columns
+        self.class_names = primary.class_names
+        self.features = primary.features
+        for name, member in self.members.items():
+            if member.class_names != self.class_names or member.feature_columns != self.feature_columns:
+                raise ValueError(f'{name} does not share the class names and feature columns of {order[0]}')
+
+        self.latency_budget = latency_budget_ms / 1000 if latency_budget_ms else None
+        self.max_workers = max_workers if max_workers is not None else min(len(order), os.cpu_count() or 1)
+        self._executor = None
+        self._stage_names = {name: 'ensemble_' + re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_') for name in order}
+
+        # EWMA latency per member: seconds per single-row call and per batch row.
+        # The first call of each kind is skipped because it includes loading the model.
+        self._seconds_per_call = {}
+        self._seconds_per_row = {}
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_artifacts(
+        cls,
+        artifacts,
+        model_names: Optional[Sequence[str]] = None,
+        weights: Optional[Mapping[str, float]] = None,
+        **kwargs
+    ) -> 'EnsemblePredictor':
+        """Ensemble over split model artifacts; weights default to the artifacts' ensemble.json, else equal"""
+        if weights is None:
+            weights = load_weights(artifacts.artifact_dir)
+        model_names = list(model_names or (weights or artifacts.model_names))
+        # Ties in weight keep this order, so the best model stays the primary member
+        model_names.sort(key=lambda name: name != artifacts.best_model)
+        members = {name: StressPredictor.from_artifacts(artifacts, name) for name in model_names}
+        if weights is not None:
+            weights = {name: weight for name, weight in weights.items() if name in members}
+        return cls(members, weights, **kwargs)
+
+    @classmethod
+    def from_package(
+        cls,
+        model_package: Dict,
+        model_names: Optional[Sequence[str]] = None,
+        weights: Optional[Mapping[str, float]] = None,
+        **kwargs
+    ) -> 'EnsemblePredictor':
+        """Ensemble over an in-memory package as written by Stress.ipynb"""
+        model_names = list(model_names or (weights or model_package['models']))
+        model_names.sort(key=lambda name: name != model_package['best_model'])
+        members = {name: StressPredictor.from_package(model_package, name) for name in model_names}
+        return cls(members, weights, **kwargs)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def warm(self):
+        """Load every member and run both inference paths once"""
+        row = [float(value) for value in self.members[self.member_names[0]].scaler_mean]
+        for member in self.members.values():
+            member.predict_proba_one(row)
+            member.predict_proba_batch(np.asarray([row] * (COMPILED_BATCH_MAX_ROWS + 1)))
+
+    def encode(self, name: str, value: str) -> float:
+        return self.features.encode(name, value)
+
+    def build_features(self, **form_inputs) -> List[float]:
+        """Build one feature row from the app's form inputs, shared by every member"""
+        return self.members[self.member_names[0]].build_features(**form_inputs)
+
+    def build_feature_matrix(self, columns) -> np.ndarray:
+        return self.members[self.member_names[0]].build_feature_matrix(columns)
+
+    def latency_estimates(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Current per-member estimates in milliseconds (None until measured)"""
+        with self._lock:
+            return {
+                name: {
+                    'single_ms': self._seconds_per_call[name] * 1000 if name in self._seconds_per_call else None,
+                    'batch_row_ms': self._seconds_per_row[name] * 1000 if name in self._seconds_per_row else None
+                }
+                for name in self.member_names
+            }
+
+    def _estimate(self, name: str, rows: Optional[int]) -> float:
+        if rows is None:
+            return self._seconds_per_call.get(name, 0.0)
+        return self._seconds_per_row.get(name, 0.0) * rows
+
+    def _record(self, name: str, rows: Optional[int], seconds: float):
+        METRICS.observe(self._stage_names[name], seconds)
+        key = (name, rows is None)
+        estimates, value = (self._seconds_per_call, seconds) if rows is None else (self._seconds_per_row, seconds / max(rows, 1))
+        with self._lock:
+            if key not in self._seen:
+                self._seen.add(key)
+                return
+            previous = estimates.get(name)
+            estimates[name] = value if previous is None else previous + LATENCY_EWMA_ALPHA * (value - previous)
+
+    def _run_member(self, name: str, features, rows: Optional[int]) -> np.ndarray:
+        member = self.members[name]
+        started = time.perf_counter()
+        if rows is None:
+            probabilities = np.asarray(member.predict_proba_one(features), dtype=float)
+        else:
+            probabilities = member.predict_proba_batch(features)
+        self._record(name, rows, time.perf_counter() - started)
+        return probabilities
+
+    def _fits(self, name: str, rows: Optional[int], deadline: Optional[float]) -> bool:
+        return deadline is None or time.perf_counter() + self._estimate(name, rows) <= deadline
+
+    def _run_inline(self, features, rows: Optional[int], deadline: Optional[float]) -> Dict[str, np.ndarray]:
+        results = {}
+        for index, name in enumerate(self.member_names):
+            if index and not self._fits(name, rows, deadline):
+                continue
+            results[name] = self._run_member(name, features, rows)
+        return results
+
+    def _run_parallel(self, features, rows: int, deadline: Optional[float]) -> Dict[str, np.ndarray]:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='ensemble')
+
+        futures = {
+            name: self._executor.submit(self._run_member, name, features, rows)
+            for index, name in enumerate(self.member_names)
+            if not index or self._fits(name, rows, deadline)
+        }
+        primary = self.member_names[0]
+        results = {primary: futures[primary].result()}
+        others = [future for name, future in futures.items() if name != primary]
+        if others:
+            # Members still running at the deadline are dropped; their threads finish in the background
+            timeout = None if deadline is None else max(deadline - time.perf_counter(), 0.0)
+            wait(others, timeout=timeout)
+        for name, future in futures.items():
+            if name != primary and future.done():
+                results[name] = future.result()
+        return results
+
+    def _combine(self, results: Dict[str, np.ndarray]) -> np.ndarray:
+        dropped = len(self.member_names) - len(results)
+        if dropped:
+            METRICS.increment('ensemble_members_dropped', dropped)
+        total_weight = sum(self.weights[name] for name in results)
+        return sum(self.weights[name] * probabilities for name, probabilities in results.items()) / total_weight
+
+    def member_probabilities(self, features: np.ndarray) -> Dict[str, np.ndarray]:
+        """Each member's class probabilities for a 2-D feature matrix, ignoring the budget"""
+        features = np.asarray(features, dtype=float)
+        if self.max_workers > 1 and len(features) > COMPILED_BATCH_MAX_ROWS:
+            return self._run_parallel(features, len(features), None)
+        return self._run_inline(features, len(features), None)
+
+    def predict_proba_one(self, features: List[float]) -> List[float]:
+        """Weighted class probabilities for a single feature row"""
+        with METRICS.timer('ensemble_single'):
+            deadline = time.perf_counter() + self.latency_budget if self.latency_budget else None
+            return self._combine(self._run_inline(features, None, deadline)).tolist()
+
+    def predict_proba_batch(self, features: np.ndarray) -> np.ndarray:
+        """Weighted class probabilities for a 2-D feature matrix in feature_columns order"""
+        features = np.asarray(features, dtype=float)
+        with METRICS.timer('ensemble_batch'):
+            deadline = time.perf_counter() + self.latency_budget if self.latency_budget else None
+            if self.max_workers > 1 and len(features) > COMPILED_BATCH_MAX_ROWS:
+                results = self._run_parallel(features, len(features), deadline)
+            else:
+                results = self._run_inline(features, len(features), deadline)
+            return self._combine(results)
+
+    def predict(self, **form_inputs) -> Tuple[str, List[float]]:
+        """Predict (stress level, class probabilities) from the app's form inputs"""
+        probabilities = self.predict_proba_one(self.build_features(**form_inputs))
+        best_class = max(range(len(probabilities)), key=probabilities.__getitem__)
+        return self.class_names[best_class], probabilities
+
+def log_loss(probabilities: np.ndarray, labels: np.ndarray) -> float:
+    """Mean negative log-likelihood of the true class indices"""
+    picked = np.asarray(probabilities)[np.arange(len(labels)), np.asarray(labels, dtype=int)]
+    return float(-np.mean(np.log(np.clip(picked, 1e-15, 1.0))))
+
+def fit_weights(
+    member_probabilities: Mapping[str, np.ndarray],
+    labels: np.ndarray,
+    iterations: int = 2000,
+    learning_rate: float = 0.5,
+    min_weight: float = 1e-3
+) -> Dict[str, float]:
+    """Non-negative weights summing to 1 that minimize the log loss of the weighted mean
+
+    A stacking layer restricted to the probability simplex, fitted by exponentiated
+    gradient descent: it keeps the ensemble's output calibrated as a mixture of the
+    members' distributions and has one parameter per member, so a few hundred rows
+    suffice. Fit it on out-of-fold predictions (train.out_of_fold_probabilities),
+    never on the rows the ensemble is then scored on. Weights below ``min_weight``
+    are zeroed so those members are not evaluated at all.
+    """
+    names = list(member_probabilities)
+    labels = np.asarray(labels, dtype=int)
+    # (members, rows): each member's probability of the true class
+    picked = np.array([np.asarray(member_probabilities[name])[np.arange(len(labels)), labels] for name in names])
+    weights = np.full(len(names), 1.0 / len(names))
+    for _ in range(iterations):
+        mixture = np.clip(weights @ picked, 1e-15, None)
+        gradient = -(picked / mixture).mean(axis=1)
+        weights = weights * np.exp(-learning_rate * (gradient - gradient.min()))
+        weights /= weights.sum()
+    weights[weights < min_weight] = 0.0
+    weights /= weights.sum()
+    return {name: float(weight) for name, weight in zip(names, weights)}
+
+def load_weights(artifact_dir: str) -> Optional[Dict[str, float]]:
+    path = os.path.join(artifact_dir, ENSEMBLE_CONFIG_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return {name: float(weight) for name, weight in json.load(f)['weights'].items()}
+
+def save_weights(artifact_dir: str, weights: Mapping[str, float], metrics: Optional[Dict] = None) -> str:
+    path = os.path.join(artifact_dir, ENSEMBLE_CONFIG_NAME)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump({'weights': dict(weights), 'validation': metrics or {}}, f, indent=2)
+    os.replace(temp_path, path)
+    return path
+
+def held_out_split(data_path: str, seed: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+    """The held-out features and labels train.py evaluated the stored models on"""
+    from train import load_training_data, split_data
+
+    features, target, _, _ = load_training_data(data_path)
+    _, X_test, _, y_test = split_data(features, target, seed)
+    return X_test.to_numpy(dtype=float), y_test.to_numpy(dtype=int)
+
+def main():
+    from model_artifacts import ModelArtifacts
+    from train import DEFAULT_DATA_PATH, load_training_data, out_of_fold_probabilities
+
+    parser = argparse.ArgumentParser(description='Evaluate the soft-voting ensemble on the held-out split and optionally fit its weights')
+    parser.add_argument('--artifacts', default=DEFAULT_ARTIFACT_DIR, help='split model artifact directory')
+    parser.add_argument('--data', default=DEFAULT_DATA_PATH, help='survey CSV the models were trained on')
+    parser.add_argument('--seed', type=int, default=42, help='split seed used by train.py')
+    parser.add_argument('--fit-weights', action='store_true', help=f'fit log-loss weights on out-of-fold predictions and write {ENSEMBLE_CONFIG_NAME}')
+    parser.add_argument('--cv-folds', type=int, default=5, help='CV folds of the training split the weights are fitted on')
+    parser.add_argument('--jobs', type=int, default=-1, help='parallel fold fits (-1 uses every core)')
+    args = parser.parse_args()
+
+    artifacts = ModelArtifacts(args.artifacts)
+    weights = load_weights(args.artifacts)
+    out_of_fold_metrics = None
+    if args.fit_weights:
+        # Weights are fitted on the training split only; the held-out rows below stay unseen
+        features, target, _, _ = load_training_data(args.data)
+        out_of_fold, y_train = out_of_fold_probabilities(features, target, artifacts.model_names, args.cv_folds, args.seed, args.jobs)
+        weights = fit_weights(out_of_fold, y_train)
+        mixture = sum(weight * out_of_fold[name] for name, weight in weights.items())
+        out_of_fold_metrics = {
+            'accuracy': float(np.mean(mixture.argmax(axis=1) == y_train)),
+            'log_loss': log_loss(mixture, y_train),
+            'rows': int(len(y_train)),
+            'cv_folds': args.cv_folds
+        }
+        print(f"Out-of-fold ensemble ({len(y_train)} training rows)  accuracy={out_of_fold_metrics['accuracy']:.3f} log_loss={out_of_fold_metrics['log_loss']:.3f}")
+
+    X_test, y_test = held_out_split(args.data, args.seed)
+    # Every member is scored, including those the weights leave out of the ensemble
+    model_names = sorted(artifacts.model_names, key=lambda name: name != artifacts.best_model)
+    members = {name: StressPredictor.from_artifacts(artifacts, name) for name in model_names}
+    ensemble = EnsemblePredictor(members, weights)
+    rows = {name: np.asarray(member.predict_proba_batch(X_test)) for name, member in members.items()}
+    rows['Ensemble'] = ensemble.predict_proba_batch(X_test)
+    metrics = {
+        name: {'accuracy': float(np.mean(values.argmax(axis=1) == y_test)), 'log_loss': log_loss(values, y_test)}
+        for name, values in rows.items()
+    }
+    print(f'Held-out split ({len(y_test)} rows):')
+    for name, values in metrics.items():
+        weight = ensemble.weights.get(name)
+        label = f'{name} (w={weight:.3f})' if weight is not None else name
+        print(f"{label:32s} accuracy={values['accuracy']:.3f} log_loss={values['log_loss']:.3f}")
+
+    if args.fit_weights:
+        validation = {'held_out': metrics['Ensemble'], 'out_of_fold': out_of_fold_metrics}
+        print(f"Weights written to {save_weights(args.artifacts, ensemble.weights, validation)}")
+
+if __name__ == '__main__':
+    main()
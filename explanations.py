@@ -0,0 +1,225 @@
+import abc
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from metrics import METRICS
+from tree_compiler import CompiledTrees
+
+# Per-request budget for one explanation; the work stops at the first check past it
+DEFAULT_BUDGET_MS = 25.0
+
+# Leaves per step of the single-row tree path; the budget is checked between steps
+LEAF_CHUNK = 1024
+
+# Rows per step of the batched path, so the (rows, leaves, features) arrays stay small
+BATCH_CHUNK_ROWS = 64
+
+# Counsellor-facing names for the model features
+FEATURE_LABELS = {
+    'academic_score': 'Academic average',
+    'bmi': 'BMI',
+    'improvement_ratio': 'College vs school marks',
+    'gender_encoded': 'Gender',
+    'money_status_encoded': 'Financial status',
+    'dept_encoded': 'Course',
+    'marks_10': '10th grade marks',
+    'marks_12': '12th grade marks',
+    'marks_grad': 'College marks',
+    'sal_expect': 'Salary expectation'
+}
+
+def _unit_quadrature(n_features: int):
+    """Gauss-Legendre nodes and weights on [0, 1], exact for polynomials of degree n_features - 1"""
+    nodes, weights = np.polynomial.legendre.leggauss(max(1, (n_features + 1) // 2))
+    return (nodes + 1) / 2, weights / 2
+
+class _Explainer(abc.ABC):
+    """Shared single-row and batched entry points; subclasses implement shap_values"""
+
+    output = 'probability'
+
+    def __init__(self, feature_columns: Sequence[str], class_names: Sequence[str], expected_value: np.ndarray):
+        self.feature_columns = list(feature_columns)
+        self.class_names = list(class_names)
+        self.expected_value = expected_value
+
+    @abc.abstractmethod
+    def shap_values(self, X: np.ndarray, deadline: Optional[float] = None) -> Optional[np.ndarray]:
+        """(rows, features, outputs) attributions; None when ``deadline`` (perf_counter) passed first"""
+
+    def explain_one(self, features: List[float], class_index: int, budget_ms: Optional[float] = DEFAULT_BUDGET_MS) -> Optional[Dict]:
+        """Attributions of one row for one class, largest first; None when over the budget"""
+        started = time.perf_counter()
+        deadline = None if budget_ms is None else started + budget_ms / 1000
+        values = self.shap_values(np.asarray([features], dtype=float), deadline)
+        METRICS.observe('explanation_single', time.perf_counter() - started)
+        if values is None:
+            METRICS.increment('explanations_over_budget')
+            return None
+
+        output = min(class_index, values.shape[2] - 1)
+        contributions = sorted(
+            zip(self.feature_columns, values[0, :, output].tolist()), key=lambda item: -abs(item[1])
+        )
+        return {
+            'class_name': self.class_names[class_index],
+            'output': self.output,
+            'base_value': float(self.expected_value[output]),
+            'contributions': contributions
+        }
+
+    def explain_batch(self, X: np.ndarray, class_indices: Optional[np.ndarray] = None) -> np.ndarray:
+        """(rows, features) attributions, each row for its class in ``class_indices`` (default: the first output)"""
+        X = np.asarray(X, dtype=float)
+        values = np.empty((len(X), len(self.feature_columns)))
+        rows = np.arange(len(X))
+        outputs = np.zeros(len(X), dtype=int) if class_indices is None else np.minimum(class_indices, len(self.expected_value) - 1)
+        with METRICS.timer('explanation_batch'):
+            for start in range(0, len(X), BATCH_CHUNK_ROWS):
+                chunk = slice(start, start + BATCH_CHUNK_ROWS)
+                values[chunk] = self.shap_values(X[chunk])[rows[chunk] - start, :, outputs[chunk]]
+        return values
+
+class TreeExplainer(_Explainer):
+    """Path-dependent TreeSHAP over compiled trees, exact and without the shap package
+
+    The model output is the sum over leaves of ``value * prod_j p_j`` where, per
+    feature on the leaf's path, p_j is o_j (1 when the row satisfies every split on
+    that feature, else 0) when j is known and z_j (the product of those splits'
+    cover ratios) when it is not. Each leaf is a product game, and its Shapley
+    value for feature i is (o_i - z_i) * integral_0^1 prod_{j != i} (z_j + u (o_j - z_j)) du;
+    the integrand is a polynomial, so a few Gauss-Legendre nodes give it exactly.
+    Features off the path have o = z = 1 and drop out as null players, so every
+    leaf is evaluated over the same dense feature axis. The per-leaf paths and
+    cover products are built once; a request only compares the row against them.
+
+    Forests are explained in probability, gradient boosting in raw class scores.
+    """
+
+    def __init__(self, compiled: CompiledTrees, feature_columns: Sequence[str], class_names: Sequence[str]):
+        n_features = compiled.n_features
+        roots, feature, threshold, left, right, _ = compiled._as_lists()
+        node_cover, leaf_cover = compiled.node_cover.tolist(), compiled.leaf_cover.tolist()
+
+        n_leaves = len(compiled.leaf_values)
+        depth = max(compiled.max_depth, 1)
+        self.step_feature = np.zeros((n_leaves, depth), dtype=np.intp)
+        self.step_threshold = np.zeros((n_leaves, depth), dtype=np.float32)
+        self.step_left = np.zeros((n_leaves, depth), dtype=bool)
+        self.step_used = np.zeros((n_leaves, depth), dtype=bool)
+        self.zero_fraction = np.ones((n_leaves, n_features))
+        leaf_tree = np.zeros(n_leaves, dtype=np.intp)
+
+        for tree, root in enumerate(roots):
+            stack = [(root, [])]
+            while stack:
+                node, path = stack.pop()
+                if node < 0:
+                    leaf = ~node
+                    leaf_tree[leaf] = tree
+                    for step, (split_feature, split_threshold, went_left, ratio) in enumerate(path):
+                        self.step_feature[leaf, step] = split_feature
+                        self.step_threshold[leaf, step] = split_threshold
+                        self.step_left[leaf, step] = went_left
+                        self.step_used[leaf, step] = True
+                        self.zero_fraction[leaf, split_feature] *= ratio
+                    continue
+                cover = node_cover[node]
+                for child, went_left in ((left[node], True), (right[node], False)):
+                    child_cover = node_cover[child] if child >= 0 else leaf_cover[~child]
+                    stack.append((child, path + [(feature[node], threshold[node], went_left, child_cover / cover)]))
+
+        # Leaf values as contributions to each output: forests average over trees,
+        # boosting adds each tree to its class score
+        if compiled.kind == 'forest':
+            self.values = compiled.leaf_values / compiled.n_trees
+            self.output = 'probability'
+        else:
+            per_stage = compiled.trees_per_stage
+            self.values = np.zeros((n_leaves, per_stage))
+            self.values[np.arange(n_leaves), leaf_tree % per_stage] = compiled.leaf_values[:, 0]
+            self.output = 'log_odds'
+
+        # Nobody known: every leaf is reached with its share of the training cover
+        coverage = self.zero_fraction.prod(axis=1)
+        super().__init__(feature_columns, class_names, np.asarray(compiled.init, dtype=float) + coverage @ self.values)
+        self.nodes, self.node_weights = _unit_quadrature(n_features)
+
+    def _leaf_shap(self, X32: np.ndarray, leaves: slice) -> np.ndarray:
+        """(rows, features, outputs) contributions of a range of leaves"""
+        n_rows, n_features = X32.shape
+        step_feature = self.step_feature[leaves]
+        n_leaves = len(step_feature)
+        zero = self.zero_fraction[leaves]
+
+        # o: does the row satisfy every split on feature j along the leaf's path
+        one = np.ones((n_rows, n_leaves, n_features))
+        leaf_index = np.arange(n_leaves)
+        for step in range(step_feature.shape[1]):
+            features = step_feature[:, step]
+            satisfied = (X32[:, features] <= self.step_threshold[leaves, step]) == self.step_left[leaves, step]
+            satisfied |= ~self.step_used[leaves, step]
+            one[:, leaf_index, features] *= satisfied
+
+        # Integrand factors z_j + u (o_j - z_j) at every quadrature node: (rows, leaves, features, nodes)
+        difference = one - zero
+        factors = zero[None, :, :, None] + difference[..., None] * self.nodes
+        # Leave-one-out products; every factor is positive since 0 < u < 1 and z > 0
+        others = factors.prod(axis=2, keepdims=True) / factors
+        phi = difference * (others @ self.node_weights)
+        return np.swapaxes(phi, 1, 2) @ self.values[leaves]
+
+    def shap_values(self, X: np.ndarray, deadline: Optional[float] = None) -> Optional[np.ndarray]:
+        # Rows are compared as float32, like the compiled traversal and sklearn
+        X32 = np.ascontiguousarray(X, dtype=np.float32)
+        total = np.zeros((len(X32), X32.shape[1], self.values.shape[1]))
+        for start in range(0, len(self.values), LEAF_CHUNK):
+            if deadline is not None and time.perf_counter() > deadline:
+                return None
+            total += self._leaf_shap(X32, slice(start, start + LEAF_CHUNK))
+        if deadline is not None and time.perf_counter() > deadline:
+            return None
+        return total
+
+class LinearExplainer(_Explainer):
+    """Exact attributions of a multinomial logistic regression's class scores
+
+    With features treated as independent, a linear score's Shapley values are
+    w_i * (x_i - mean_i); the means are the training means the scaler stored.
+    """
+
+    output = 'log_odds'
+
+    def __init__(self, coefficients, intercepts, feature_means, feature_columns: Sequence[str], class_names: Sequence[str]):
+        self.coefficients = np.asarray(coefficients, dtype=float)
+        self.feature_means = np.asarray(feature_means, dtype=float)
+        expected_value = np.asarray(intercepts, dtype=float) + self.coefficients @ self.feature_means
+        super().__init__(feature_columns, class_names, expected_value)
+
+    def shap_values(self, X: np.ndarray, deadline: Optional[float] = None) -> Optional[np.ndarray]:
+        centred = np.asarray(X, dtype=float) - self.feature_means
+        return centred[:, :, None] * self.coefficients.T[None, :, :]
+
+def build_explainer(predictor) -> Optional[_Explainer]:
+    """TreeSHAP for tree models, exact linear attributions for logistic regression, else None"""
+    compiled = predictor.compiled
+    if compiled is not None:
+        return TreeExplainer(compiled, predictor.feature_columns, predictor.class_names)
+    linear = predictor.linear
+    if linear is not None:
+        coefficients, intercepts = linear
+        return LinearExplainer(coefficients, intercepts, predictor.scaler_mean, predictor.feature_columns, predictor.class_names)
+    return None
+
+def explain_prediction(predictor, form_inputs: Dict, predicted_level: str, budget_ms: Optional[float] = DEFAULT_BUDGET_MS) -> Optional[Dict]:
+    """explain_one for a prediction made from the app's form inputs
+
+    None when the predictor has no explainer (SVM, the ensemble) or the budget ran out.
+    """
+    explainer = getattr(predictor, 'explainer', None)
+    if explainer is None:
+        return None
+    features = predictor.build_features(**form_inputs)
+    return explainer.explain_one(features, predictor.class_names.index(predicted_level), budget_ms)
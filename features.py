@@ -0,0 +1,149 @@
+import math
+from typing import Callable, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+# Column order of the model package written by Stress.ipynb and train.py
+FEATURE_COLUMNS = [
+    'academic_score', 'bmi', 'improvement_ratio',
+    'gender_encoded', 'money_status_encoded', 'dept_encoded',
+    'marks_10', 'marks_12', 'marks_grad', 'sal_expect'
+]
+
+# Survey columns the features are derived from
+INPUT_COLUMNS = ['marks_10', 'marks_12', 'marks_grad', 'height', 'weight', 'gender', 'money_status', 'dept', 'sal_expect']
+
+# Label-encoded categorical columns; the feature is '<name>_encoded'
+ENCODED_COLUMNS = ['gender', 'money_status', 'dept']
+
+# Professional courses offered in the app that match a department in the training survey
+COURSE_DEPARTMENTS = {
+    'Commerce': 'Commerce',
+    'Computer Science': 'BCA'
+}
+
+# Derived features, written once with operators that work on Python floats and on
+# NumPy arrays alike, so the single-row and bulk paths cannot drift apart
+DERIVED_FEATURES: Dict[str, Callable] = {
+    'academic_score': lambda c: (c['marks_10'] + c['marks_12'] + c['marks_grad']) / 3,
+    'bmi': lambda c: c['weight'] / (c['height'] / 100) ** 2,
+    'improvement_ratio': lambda c: c['marks_grad'] / (c['marks_12'] + 0.01)
+}
+
+def normalize_label(value) -> str:
+    """Case- and whitespace-insensitive category key ('good' and 'Good ' match)"""
+    return str(value).strip().lower()
+
+def fit_label_classes(columns: Mapping, names: Sequence[str] = ENCODED_COLUMNS) -> Dict[str, List[str]]:
+    """Sorted distinct labels per categorical column, as LabelEncoder.fit would store them"""
+    return {name: sorted({str(value) for value in columns[name]}) for name in names}
+
+def form_inputs_to_columns(
+    mark10th: float,
+    mark12th: float,
+    collegemark: float,
+    gender: str,
+    height: float,
+    weight: float,
+    financial: str,
+    course: str,
+    salexpect: float
+) -> Dict:
+    """The Streamlit form's fields under the survey column names"""
+    return {
+        'marks_10': mark10th,
+        'marks_12': mark12th,
+        'marks_grad': collegemark,
+        'height': height,
+        'weight': weight,
+        'gender': gender,
+        'money_status': financial,
+        'dept': COURSE_DEPARTMENTS.get(course, ''),
+        'sal_expect': salexpect
+    }
+
+class FeatureBuilder:
+    """Builds model features from survey columns: a bulk NumPy path and a plain-Python single-row path"""
+
+    def __init__(
+        self,
+        label_classes: Mapping[str, Sequence[str]],
+        feature_columns: Sequence[str] = FEATURE_COLUMNS,
+        fill_values: Optional[Sequence[float]] = None
+    ):
+        self.feature_columns = list(feature_columns)
+        self.label_classes = {name: [str(label) for label in classes] for name, classes in label_classes.items()}
+
+        # Label encoder classes as plain lookups, case-insensitive ('good' vs 'Good')
+        self.encodings = {
+            name: {normalize_label(label): code for code, label in enumerate(classes)}
+            for name, classes in self.label_classes.items()
+        }
+
+        # Per-feature replacement for unseen categories and missing or invalid numbers
+        # (serving passes the training means); None leaves NaN for the caller to impute
+        self.fill_values = None if fill_values is None else [float(value) for value in fill_values]
+        self._fill_by_column = dict(zip(self.feature_columns, self.fill_values or []))
+
+    def encode(self, name: str, value) -> float:
+        """Label-encode one categorical value"""
+        code = self.encodings.get(name, {}).get(normalize_label(value))
+        return float(code) if code is not None else self._fill_by_column.get(f'{name}_encoded', math.nan)
+
+    def encode_many(self, name: str, values) -> np.ndarray:
+        """Vectorized encode(): one lookup per distinct value"""
+        values = np.asarray(values, dtype=object).astype(str)
+        unique_values, codes = np.unique(values, return_inverse=True)
+        unique_codes = np.array([self.encode(name, value) for value in unique_values], dtype=float)
+        return unique_codes[codes.reshape(-1)]
+
+    def transform_row(self, row: Mapping) -> List[float]:
+        """One feature row from scalar inputs, in feature_columns order, matching transform() exactly
+
+        Plain Python, without NumPy or pandas, except for a derived feature that divides
+        by zero. Unlike transform(), non-numeric marks or measurements raise (TypeError
+        or ValueError) so a bad form submission is reported.
+        """
+        numbers = {
+            name: float(row[name])
+            for name in ('marks_10', 'marks_12', 'marks_grad', 'height', 'weight', 'sal_expect')
+        }
+        values = {}
+        for name, derive in DERIVED_FEATURES.items():
+            try:
+                values[name] = derive(numbers)
+            except ZeroDivisionError:
+                # Evaluated as transform() does, to inf or NaN, which fill_values then replace
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    values[name] = float(derive({key: np.float64(value) for key, value in numbers.items()}))
+        for name in ENCODED_COLUMNS:
+            values[f'{name}_encoded'] = self.encode(name, row[name])
+        values.update(numbers)
+
+        features = [float(values[column]) for column in self.feature_columns]
+        if self.fill_values is not None:
+            features = [value if math.isfinite(value) else fill for value, fill in zip(features, self.fill_values)]
+        return features
+
+    def transform(self, columns) -> np.ndarray:
+        """Feature matrix from a DataFrame or mapping of survey columns, in feature_columns order
+
+        Missing or invalid numbers become NaN and are then replaced by fill_values, if set.
+        """
+        numbers = {
+            name: np.asarray(columns[name], dtype=float)
+            for name in ('marks_10', 'marks_12', 'marks_grad', 'height', 'weight', 'sal_expect')
+        }
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = {name: derive(numbers) for name, derive in DERIVED_FEATURES.items()}
+        for name in ENCODED_COLUMNS:
+            values[f'{name}_encoded'] = self.encode_many(name, columns[name])
+        values.update(numbers)
+
+        matrix = np.column_stack([values[column] for column in self.feature_columns])
+        if self.fill_values is not None:
+            invalid = ~np.isfinite(matrix)
+            if invalid.any():
+                matrix[invalid] = np.broadcast_to(np.asarray(self.fill_values), matrix.shape)[invalid]
+        return matrix
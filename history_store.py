@@ -0,0 +1,320 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+DEFAULT_HISTORY_PATH = 'stress_history.db'
+SECONDS_PER_DAY = 86400
+
+# Levels that extend a student's high-stress streak
+HIGH_STRESS_LEVELS = ('Bad', 'Awful')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assessments (
+    id INTEGER PRIMARY KEY,
+    student_id TEXT NOT NULL,
+    assessed_at REAL NOT NULL,
+    enhanced_score REAL NOT NULL,
+    stress_level TEXT NOT NULL,
+    emotion TEXT NOT NULL DEFAULT '',
+    trigger_events TEXT NOT NULL DEFAULT '[]'
+);
+CREATE INDEX IF NOT EXISTS idx_assessments_student_time ON assessments (student_id, assessed_at);
+CREATE INDEX IF NOT EXISTS idx_assessments_time ON assessments (assessed_at);
+
+-- Per-student, per-day score totals; the rolling windows add and expire whole days
+CREATE TABLE IF NOT EXISTS daily_scores (
+    student_id TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    score_sum REAL NOT NULL,
+    assessments INTEGER NOT NULL,
+    PRIMARY KEY (student_id, day)
+) WITHOUT ROWID;
+
+-- Running aggregates, updated on every insert; sum_7/sum_30 cover the 7 and 30 days
+-- ending at window_day (the latest assessment day)
+CREATE TABLE IF NOT EXISTS student_trends (
+    student_id TEXT PRIMARY KEY,
+    assessments INTEGER NOT NULL,
+    last_assessed_at REAL NOT NULL,
+    last_level TEXT NOT NULL,
+    window_day INTEGER NOT NULL,
+    sum_7 REAL NOT NULL,
+    count_7 INTEGER NOT NULL,
+    sum_30 REAL NOT NULL,
+    count_30 INTEGER NOT NULL,
+    ewma REAL NOT NULL,
+    previous_ewma REAL NOT NULL,
+    high_stress_streak INTEGER NOT NULL,
+    longest_high_stress_streak INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+TREND_COLUMNS = (
+    'student_id', 'assessments', 'last_assessed_at', 'last_level', 'window_day',
+    'sum_7', 'count_7', 'sum_30', 'count_30', 'ewma', 'previous_ewma',
+    'high_stress_streak', 'longest_high_stress_streak'
+)
+
+# Trends as of :today. Stored sums are anchored at window_day, so days that have since
+# left a window are subtracted here; at most 30 day rows per student are touched.
+TRENDS_QUERY = f"""
+SELECT {', '.join('t.' + column for column in TREND_COLUMNS)},
+    COALESCE(SUM(CASE WHEN b.day > t.window_day - 7 THEN b.score_sum END), 0),
+    COALESCE(SUM(CASE WHEN b.day > t.window_day - 7 THEN b.assessments END), 0),
+    COALESCE(SUM(CASE WHEN b.day <= :today - 30 THEN b.score_sum END), 0),
+    COALESCE(SUM(CASE WHEN b.day <= :today - 30 THEN b.assessments END), 0)
+FROM student_trends t
+LEFT JOIN daily_scores b
+    ON b.student_id = t.student_id AND b.day > t.window_day - 30 AND b.day <= :today - 7
+"""
+
+def day_of(timestamp: float) -> int:
+    """UTC day number of a Unix timestamp"""
+    return int(timestamp // SECONDS_PER_DAY)
+
+class HistoryStore:
+    """SQLite store of per-student assessments with incrementally maintained trends
+
+    Every insert updates the student's 7/30-day rolling sums, EWMA of the enhanced
+    score and Bad/Awful streak in constant time: the windows move by whole days,
+    so advancing one only subtracts the at most 7 (or 30) day totals leaving it,
+    read through the daily_scores primary key. The EWMA and streaks follow the
+    order assessments are recorded in.
+    """
+
+    def __init__(self, path: str = DEFAULT_HISTORY_PATH, ewma_alpha: float = 0.3):
+        self.path = path
+        self.ewma_alpha = ewma_alpha
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ':memory:':
+            # Readers (dashboards) do not block the writer
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def record(
+        self,
+        student_id: str,
+        enhanced_score: float,
+        stress_level: str,
+        emotion: str = '',
+        trigger_events: Sequence[str] = (),
+        assessed_at: Optional[float] = None
+    ) -> int:
+        """Store one assessment and update the student's trends; returns the assessment id"""
+        return self.record_many([{
+            'student_id': student_id,
+            'enhanced_score': enhanced_score,
+            'stress_level': stress_level,
+            'emotion': emotion,
+            'trigger_events': trigger_events,
+            'assessed_at': assessed_at
+        }])[0]
+
+    def record_many(self, assessments: Iterable[Dict]) -> List[int]:
+        """record() for many assessments in one transaction"""
+        ids = []
+        with self._lock:
+            cursor = self._connection.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                for assessment in assessments:
+                    ids.append(self._record(cursor, assessment))
+                cursor.execute('COMMIT')
+            except BaseException:
+                cursor.execute('ROLLBACK')
+                raise
+        return ids
+
+    def _day_totals(self, cursor, student_id: str, first_day: int, last_day: int):
+        """(score sum, assessments) over days first_day..last_day inclusive"""
+        if last_day < first_day:
+            return 0.0, 0
+        return cursor.execute(
+            'SELECT COALESCE(SUM(score_sum), 0), COALESCE(SUM(assessments), 0) FROM daily_scores '
+            'WHERE student_id = ? AND day BETWEEN ? AND ?',
+            (student_id, first_day, last_day)
+        ).fetchone()
+
+    def _record(self, cursor, assessment: Dict) -> int:
+        student_id = str(assessment['student_id'])
+        score = float(assessment['enhanced_score'])
+        level = str(assessment['stress_level'])
+        assessed_at = assessment.get('assessed_at')
+        assessed_at = time.time() if assessed_at is None else float(assessed_at)
+
+        cursor.execute(
+            'INSERT INTO assessments (student_id, assessed_at, enhanced_score, stress_level, emotion, trigger_events) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (student_id, assessed_at, score, level, str(assessment.get('emotion') or ''),
+             json.dumps(list(assessment.get('trigger_events') or [])))
+        )
+        assessment_id = cursor.lastrowid
+        self._update_aggregates(cursor, student_id, assessed_at, score, level)
+        return assessment_id
+
+    def _update_aggregates(self, cursor, student_id: str, assessed_at: float, score: float, level: str):
+        day = day_of(assessed_at)
+        cursor.execute(
+            'INSERT INTO daily_scores (student_id, day, score_sum, assessments) VALUES (?, ?, ?, 1) '
+            'ON CONFLICT (student_id, day) DO UPDATE SET score_sum = score_sum + excluded.score_sum, assessments = assessments + 1',
+            (student_id, day, score)
+        )
+
+        row = cursor.execute(
+            f"SELECT {', '.join(TREND_COLUMNS)} FROM student_trends WHERE student_id = ?", (student_id,)
+        ).fetchone()
+        high_stress = level in HIGH_STRESS_LEVELS
+        if row is None:
+            streak = 1 if high_stress else 0
+            cursor.execute(
+                f"INSERT INTO student_trends ({', '.join(TREND_COLUMNS)}) VALUES ({', '.join('?' * len(TREND_COLUMNS))})",
+                (student_id, 1, assessed_at, level, day, score, 1, score, 1, score, score, streak, streak)
+            )
+            return
+
+        trend = dict(zip(TREND_COLUMNS, row))
+        window_day = trend['window_day']
+        if day > window_day:
+            # Slide both windows forward: drop the days that fall out, never more than 7 or 30
+            for size in (7, 30):
+                expired_sum, expired_count = self._day_totals(
+                    cursor, student_id, window_day - size + 1, min(day - size, window_day)
+                )
+                trend[f'sum_{size}'] -= expired_sum
+                trend[f'count_{size}'] -= expired_count
+            window_day = day
+        for size in (7, 30):
+            # A late assessment only counts if its day is still inside the window
+            if day > window_day - size:
+                trend[f'sum_{size}'] += score
+                trend[f'count_{size}'] += 1
+
+        streak = trend['high_stress_streak'] + 1 if high_stress else 0
+        latest = assessed_at >= trend['last_assessed_at']
+        cursor.execute(
+            'UPDATE student_trends SET assessments = ?, last_assessed_at = ?, last_level = ?, window_day = ?, '
+            'sum_7 = ?, count_7 = ?, sum_30 = ?, count_30 = ?, ewma = ?, previous_ewma = ?, '
+            'high_stress_streak = ?, longest_high_stress_streak = ? WHERE student_id = ?',
+            (
+                trend['assessments'] + 1,
+                assessed_at if latest else trend['last_assessed_at'],
+                level if latest else trend['last_level'],
+                window_day,
+                trend['sum_7'], trend['count_7'], trend['sum_30'], trend['count_30'],
+                trend['ewma'] + self.ewma_alpha * (score - trend['ewma']),
+                trend['ewma'],
+                streak,
+                max(streak, trend['longest_high_stress_streak']),
+                student_id
+            )
+        )
+
+    def _trend_rows(self, where: str, parameters: Dict, now: Optional[float]) -> List[Dict]:
+        parameters = dict(parameters, today=day_of(time.time() if now is None else now))
+        with self._lock:
+            rows = self._connection.execute(f'{TRENDS_QUERY} {where} GROUP BY t.student_id', parameters).fetchall()
+
+        trends = []
+        for row in rows:
+            trend = dict(zip(TREND_COLUMNS, row))
+            expired_sum_7, expired_count_7, expired_sum_30, expired_count_30 = row[len(TREND_COLUMNS):]
+            count_7 = trend['count_7'] - expired_count_7
+            count_30 = trend['count_30'] - expired_count_30
+            trends.append({
+                'student_id': trend['student_id'],
+                'assessments': trend['assessments'],
+                'last_assessed_at': trend['last_assessed_at'],
+                'last_level': trend['last_level'],
+                'avg_7d': (trend['sum_7'] - expired_sum_7) / count_7 if count_7 else None,
+                'count_7d': count_7,
+                'avg_30d': (trend['sum_30'] - expired_sum_30) / count_30 if count_30 else None,
+                'count_30d': count_30,
+                'ewma': trend['ewma'],
+                'ewma_change': trend['ewma'] - trend['previous_ewma'],
+                'high_stress_streak': trend['high_stress_streak'],
+                'longest_high_stress_streak': trend['longest_high_stress_streak']
+            })
+        return trends
+
+    def trend(self, student_id: str, now: Optional[float] = None) -> Optional[Dict]:
+        """Current trends of one student, or None if they have no assessments"""
+        trends = self._trend_rows('WHERE t.student_id = :student_id', {'student_id': str(student_id)}, now)
+        return trends[0] if trends else None
+
+    def trends(self, student_ids: Optional[Sequence[str]] = None, now: Optional[float] = None) -> List[Dict]:
+        """Trends of many students (all by default) in one query, for dashboards"""
+        if student_ids is None:
+            return self._trend_rows('', {}, now)
+        placeholders = ', '.join(f':id{index}' for index in range(len(student_ids)))
+        return self._trend_rows(
+            f'WHERE t.student_id IN ({placeholders})',
+            {f'id{index}': str(student_id) for index, student_id in enumerate(student_ids)},
+            now
+        ) if student_ids else []
+
+    def history(self, student_id: str, since: Optional[float] = None, limit: int = 100) -> List[Dict]:
+        """A student's assessments, newest first"""
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT id, assessed_at, enhanced_score, stress_level, emotion, trigger_events FROM assessments '
+                'WHERE student_id = ? AND assessed_at >= ? ORDER BY assessed_at DESC LIMIT ?',
+                (str(student_id), since if since is not None else float('-inf'), limit)
+            ).fetchall()
+        return [
+            {
+                'id': assessment_id,
+                'assessed_at': assessed_at,
+                'enhanced_score': score,
+                'stress_level': level,
+                'emotion': emotion,
+                'trigger_events': json.loads(triggers)
+            }
+            for assessment_id, assessed_at, score, level, emotion, triggers in rows
+        ]
+
+    def rebuild_aggregates(self):
+        """Recompute daily totals and trends from the assessments table, in id order"""
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT student_id, assessed_at, enhanced_score, stress_level FROM assessments ORDER BY id'
+            ).fetchall()
+            self._connection.execute('BEGIN IMMEDIATE')
+            try:
+                self._connection.execute('DELETE FROM daily_scores')
+                self._connection.execute('DELETE FROM student_trends')
+                cursor = self._connection.cursor()
+                for student_id, assessed_at, score, level in rows:
+                    self._update_aggregates(cursor, student_id, assessed_at, score, level)
+                self._connection.execute('COMMIT')
+            except BaseException:
+                self._connection.execute('ROLLBACK')
+                raise
+
+def main():
+    parser = argparse.ArgumentParser(description='Print stress trends from the assessment history store')
+    parser.add_argument('--db', default=DEFAULT_HISTORY_PATH, help='SQLite history database')
+    parser.add_argument('--students', nargs='+', help='student ids (all students by default)')
+    parser.add_argument('--rebuild', action='store_true', help='recompute the aggregates from the stored assessments first')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        parser.error(f'No history database at {args.db}')
+    store = HistoryStore(args.db)
+    if args.rebuild:
+        store.rebuild_aggregates()
+    for trend in store.trends(args.students):
+        print(json.dumps(trend))
+    store.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+import math
+import warnings
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from explanations import build_explainer
+from features import COURSE_DEPARTMENTS, INPUT_COLUMNS, FeatureBuilder, form_inputs_to_columns
+from metrics import METRICS
+from tree_compiler import CompiledTrees
+
+# Models trained on StandardScaler output in Stress.ipynb; the tree models use raw features
+SCALED_MODELS = ('Logistic Regression', 'SVM')
+
+# Largest batch scored with the compiled trees: NumPy traversal wins over sklearn's
+# per-call overhead on micro-batches, sklearn's Cython loop wins on large ones
+COMPILED_BATCH_MAX_ROWS = 64
+
+class StressPredictor:
+    """Stress level inference with the model package written by Stress.ipynb"""
+
+    def __init__(
+        self,
+        model_loader: Callable,
+        model_name: str,
+        feature_columns: List[str],
+        class_names: List[str],
+        scaler_mean: Sequence[float],
+        scaler_scale: Sequence[float],
+        label_classes: Dict[str, Sequence[str]],
+        compiled_loader: Optional[Callable] = None,
+        scale_inputs: Optional[bool] = None
+    ):
+        self.model_name = model_name
+        self.feature_columns = list(feature_columns)
+        self.class_names = list(class_names)
+        # Defaults to the notebook's choice for the packaged models
+        self.scale_inputs = model_name in SCALED_MODELS if scale_inputs is None else scale_inputs
+        self.scaler_mean = np.asarray(scaler_mean, dtype=float)
+        self.scaler_scale = np.asarray(scaler_scale, dtype=float)
+
+        # Unseen categories and invalid numbers fall back to the training mean of the feature
+        self.features = FeatureBuilder(label_classes, self.feature_columns, fill_values=self.scaler_mean)
+
+        # The model itself is loaded on first prediction; tree models are served from
+        # their compiled arrays, read from the artifacts or compiled from the model
+        self._model_loader = model_loader
+        self._model = None
+        self._compiled_loader = compiled_loader
+        self._compiled = None
+        self._compiled_ready = False
+        self._linear = None
+        self._linear_ready = False
+        self._explainer = None
+        self._explainer_ready = False
+
+    @classmethod
+    def from_package(cls, model_package: Dict, model_name: Optional[str] = None) -> 'StressPredictor':
+        """Predictor over an in-memory package as written by Stress.ipynb"""
+        model_name = model_name or model_package['best_model']
+        return cls(
+            model_loader=lambda: model_package['models'][model_name],
+            model_name=model_name,
+            feature_columns=model_package['feature_columns'],
+            class_names=model_package['class_names'],
+            scaler_mean=model_package['scaler'].mean_,
+            scaler_scale=model_package['scaler'].scale_,
+            label_classes={
+                name: encoder.classes_
+                for name, encoder in model_package['label_encoders'].items()
+                if encoder is not None
+            }
+        )
+
+    @classmethod
+    def from_artifacts(cls, artifacts, model_name: Optional[str] = None) -> 'StressPredictor':
+        """Predictor over split model artifacts; only the served model is ever loaded"""
+        model_name = model_name or artifacts.best_model
+        return cls(
+            model_loader=lambda: artifacts.load_model(model_name),
+            model_name=model_name,
+            feature_columns=artifacts.feature_columns,
+            class_names=artifacts.class_names,
+            scaler_mean=artifacts.scaler_mean,
+            scaler_scale=artifacts.scaler_scale,
+            label_classes=artifacts.label_classes,
+            compiled_loader=lambda: artifacts.load_compiled(model_name)
+        )
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = self._model_loader()
+        return self._model
+
+    @property
+    def compiled(self) -> Optional[CompiledTrees]:
+        """Flattened trees of the served model, or None for non-tree models"""
+        if not self._compiled_ready:
+            compiled = self._compiled_loader() if self._compiled_loader is not None else None
+            if compiled is None:
+                compiled = CompiledTrees.from_model(self.model)
+            self._compiled = compiled
+            self._compiled_ready = True
+        return self._compiled
+
+    @property
+    def linear(self) -> Optional[Tuple[List[List[float]], List[float]]]:
+        """(coefficients, intercepts) of a multinomial logistic regression on unscaled features, else None"""
+        if not self._linear_ready:
+            model = self.model
+            if type(model).__name__ == 'LogisticRegression' and len(model.classes_) > 2 and getattr(model, 'multi_class', 'auto') != 'ovr':
+                coefficients, intercepts = model.coef_, model.intercept_
+                if self.scale_inputs:
+                    # Fold the standard scaling into the weights: w.(x - m)/s = (w/s).x - (w/s).m
+                    coefficients = coefficients / self.scaler_scale
+                    intercepts = intercepts - coefficients @ self.scaler_mean
+                self._linear = (coefficients.tolist(), intercepts.tolist())
+            self._linear_ready = True
+        return self._linear
+
+    @property
+    def explainer(self):
+        """Feature attributions for the served model, built once; None when the model has no exact explainer"""
+        if not self._explainer_ready:
+            self._explainer = build_explainer(self)
+            self._explainer_ready = True
+        return self._explainer
+
+    def encode(self, name: str, value: str) -> float:
+        """Label-encode a categorical value the way the notebook did"""
+        return self.features.encode(name, value)
+
+    def build_features(
+        self,
+        mark10th: float,
+        mark12th: float,
+        collegemark: float,
+        gender: str,
+        height: float,
+        weight: float,
+        financial: str,
+        course: str,
+        salexpect: float
+    ) -> List[float]:
+        """Build one feature row from the app's form inputs, in feature_columns order"""
+        return self.features.transform_row(form_inputs_to_columns(
+            mark10th, mark12th, collegemark, gender, height, weight, financial, course, salexpect
+        ))
+
+    def build_feature_matrix(self, columns) -> np.ndarray:
+        """Feature matrix for many students from survey-style columns (see survey_data)
+
+        ``columns`` is a DataFrame or mapping with marks_10, marks_12, marks_grad,
+        height, weight, gender, money_status, sal_expect and either dept or course.
+        Missing or invalid numbers are imputed with the training mean of the feature.
+        """
+        if 'dept' not in columns:
+            departments = [COURSE_DEPARTMENTS.get(course, '') for course in columns['course']]
+            columns = {name: columns[name] for name in INPUT_COLUMNS if name != 'dept'}
+            columns['dept'] = departments
+        return self.features.transform(columns)
+
+    def predict_proba_one(self, features: List[float]) -> List[float]:
+        """Class probabilities for a single feature row"""
+        with METRICS.timer('inference_single'):
+            compiled = self.compiled
+            if compiled is not None:
+                return compiled.predict_proba_row(features)
+            linear = self.linear
+            if linear is not None:
+                return self._linear_proba_row(features, *linear)
+            return self._predict_proba(np.asarray([features], dtype=float))[0].tolist()
+
+    def predict_proba_batch(self, features: np.ndarray) -> np.ndarray:
+        """Class probabilities for a 2-D feature matrix in feature_columns order"""
+        features = np.asarray(features, dtype=float)
+        with METRICS.timer('inference_batch'):
+            compiled = self.compiled if len(features) <= COMPILED_BATCH_MAX_ROWS else None
+            if compiled is not None:
+                probabilities = compiled.predict_proba(features)
+            else:
+                probabilities = self._predict_proba(features)
+        METRICS.increment('inference_batch_rows', len(features))
+        return probabilities
+
+    @staticmethod
+    def _linear_proba_row(features: List[float], coefficients: List[List[float]], intercepts: List[float]) -> List[float]:
+        # Softmax of the class scores in plain Python; sklearn's per-call overhead dwarfs 40 multiplications
+        scores = [intercept + sum(weight * value for weight, value in zip(row, features)) for row, intercept in zip(coefficients, intercepts)]
+        top = max(scores)
+        exps = [math.exp(score - top) for score in scores]
+        norm = sum(exps)
+        return [value / norm for value in exps]
+
+    def _predict_proba(self, features: np.ndarray) -> np.ndarray:
+        if self.scale_inputs:
+            features = (features - self.scaler_mean) / self.scaler_scale
+        with warnings.catch_warnings():
+            # The tree models were fitted on a DataFrame; a bare array is fine here
+            warnings.filterwarnings('ignore', message='X does not have valid feature names')
+            return self.model.predict_proba(features)
+
+    def predict(self, **form_inputs) -> Tuple[str, List[float]]:
+        """Predict (stress level, class probabilities) from the app's form inputs"""
+        probabilities = self.predict_proba_one(self.build_features(**form_inputs))
+        best_class = max(range(len(probabilities)), key=probabilities.__getitem__)
+        return self.class_names[best_class], probabilities
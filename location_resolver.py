@@ -0,0 +1,200 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+# Former and colloquial names mapped to the names used in our datasets
+CITY_ALIASES = {
+    'Bengaluru': 'Bangalore',
+    'Mysuru': 'Mysore',
+    'Mangaluru': 'Mangalore',
+    'Belagavi': 'Belgaum',
+    'Kalaburagi': 'Gulbarga',
+    'Ballari': 'Bellary',
+    'Vijayapura': 'Bijapur',
+    'Shivamogga': 'Shimoga',
+    'Hubli': 'Hubli-Dharwad',
+    'Hubballi': 'Hubli-Dharwad',
+    'Dharwad': 'Hubli-Dharwad',
+    'Trivandrum': 'Thiruvananthapuram',
+    'Cochin': 'Kochi',
+    'Ernakulam': 'Kochi',
+    'Calicut': 'Kozhikode',
+    'Trichur': 'Thrissur',
+    'Quilon': 'Kollam',
+    'Palghat': 'Palakkad',
+    'Alleppey': 'Alappuzha',
+    'Cannanore': 'Kannur',
+    'Bombay': 'Mumbai',
+    'Poona': 'Pune',
+    'New Bombay': 'Navi Mumbai',
+    'Chhatrapati Sambhajinagar': 'Aurangabad',
+    'Madras': 'Chennai',
+    'Trichy': 'Tiruchirappalli',
+    'Tuticorin': 'Thoothukkudi',
+    'Calcutta': 'Kolkata',
+    'Burdwan': 'Bardhaman',
+    'Gurgaon': 'Gurugram',
+    'Prayagraj': 'Allahabad',
+    'Benares': 'Varanasi',
+    'Banaras': 'Varanasi',
+    'Cawnpore': 'Kanpur',
+    'Vizag': 'Visakhapatnam',
+    'Rajamahendravaram': 'Rajahmundry',
+    'Baroda': 'Vadodara',
+    'Simla': 'Shimla',
+    'Dharamsala': 'Dharamshala',
+    'Panjim': 'Panaji',
+    'Madgaon': 'Margao',
+    'Gauhati': 'Guwahati',
+    'Daltonganj': 'Medininagar',
+    'Brahmapur': 'Berhampur',
+    'Pondicherry': 'Puducherry',
+    'Kathua': 'KathuaUpgrade',
+    'Poonch': 'Punch',
+    'Delhi NCR': 'New Delhi'
+}
+
+STATE_ALIASES = {
+    'Orissa': 'Odisha',
+    'Pondicherry': 'Puducherry',
+    'Uttaranchal': 'Uttarakhand',
+    'NCT of Delhi': 'Delhi',
+    'New Delhi': 'Delhi',
+    'J&K': 'Jammu and Kashmir',
+    'Jammu & Kashmir': 'Jammu and Kashmir',
+    'Andaman & Nicobar': 'Andaman and Nicobar Islands',
+    'Daman and Diu': 'Dadra and Nagar Haveli and Daman and Diu',
+    'Dadra and Nagar Haveli': 'Dadra and Nagar Haveli and Daman and Diu',
+    'AP': 'Andhra Pradesh',
+    'HP': 'Himachal Pradesh',
+    'MP': 'Madhya Pradesh',
+    'TN': 'Tamil Nadu',
+    'UP': 'Uttar Pradesh',
+    'WB': 'West Bengal'
+}
+
+LocationMatch = namedtuple('LocationMatch', ['state', 'city', 'score'])
+
+def normalize_place(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return ' '.join(re.sub(r'[^a-z0-9&]+', ' ', str(text).lower()).split())
+
+def trigrams(text: str) -> List[str]:
+    """Character trigrams of a normalized name, padded so short names still match"""
+    padded = f'  {text} '
+    return list({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+class TrigramIndex:
+    """Inverted index from character trigrams to entries, scored by Dice similarity"""
+
+    def __init__(self, names: Iterable[str]):
+        self.names = []
+        self.trigram_counts = []
+        self.postings = {}
+        for entry, name in enumerate(names):
+            grams = trigrams(name)
+            self.names.append(name)
+            self.trigram_counts.append(len(grams))
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(entry)
+
+    def search(self, text: str, min_score: float, allowed: Optional[set] = None) -> List[tuple]:
+        """(score, entry) pairs with Dice similarity >= min_score, best first"""
+        grams = trigrams(text)
+        overlaps = {}
+        for gram in grams:
+            for entry in self.postings.get(gram, ()):
+                overlaps[entry] = overlaps.get(entry, 0) + 1
+
+        # Dice >= t needs at least t * |query| / (2 - t) shared trigrams
+        min_overlap = min_score * len(grams) / (2 - min_score)
+        matches = []
+        for entry, overlap in overlaps.items():
+            if overlap < min_overlap or (allowed is not None and entry not in allowed):
+                continue
+            score = 2 * overlap / (len(grams) + self.trigram_counts[entry])
+            if score >= min_score:
+                matches.append((score, entry))
+        matches.sort(key=lambda match: (-match[0], match[1]))
+        return matches
+
+class LocationResolver:
+    """Typo- and alias-tolerant resolution of free-text state and city names"""
+
+    def __init__(
+        self,
+        locations: Dict[str, Iterable[str]],
+        city_aliases: Optional[Dict[str, str]] = None,
+        state_aliases: Optional[Dict[str, str]] = None,
+        min_score: float = 0.5,
+        cache_size: int = 65536
+    ):
+        self.min_score = min_score
+        city_aliases = CITY_ALIASES if city_aliases is None else city_aliases
+        state_aliases = STATE_ALIASES if state_aliases is None else state_aliases
+
+        # State entries: canonical names plus aliases, each pointing at a canonical state
+        self.states = list(locations)
+        state_names = {normalize_place(state): state for state in self.states}
+        for alias, state in state_aliases.items():
+            if state in locations:
+                state_names.setdefault(normalize_place(alias), state)
+        self.state_targets = list(state_names.values())
+        self.state_index = TrigramIndex(state_names)
+
+        # City entries: (state, city) pairs; aliases expand to every state holding the target
+        city_entries = []
+        for state, cities in locations.items():
+            for city in dict.fromkeys(cities):
+                city_entries.append((normalize_place(city), state, city))
+                for alias, target in city_aliases.items():
+                    if target == city:
+                        city_entries.append((normalize_place(alias), state, city))
+        self.city_targets = [(state, city) for _, state, city in city_entries]
+        self.city_index = TrigramIndex(name for name, _, _ in city_entries)
+        self.city_exact = {}
+        self.city_entries_by_state = {}
+        for entry, (name, state, _) in enumerate(city_entries):
+            self.city_exact.setdefault(name, []).append(entry)
+            self.city_entries_by_state.setdefault(state, set()).add(entry)
+
+        # Bulk imports repeat the same strings; memoize per normalized input
+        self.resolve_state = lru_cache(maxsize=cache_size)(self._resolve_state)
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def _resolve_state(self, text: str) -> Optional[LocationMatch]:
+        """Best canonical state for a free-text state name"""
+        name = normalize_place(text)
+        if not name:
+            return None
+        matches = self.state_index.search(name, self.min_score)
+        if not matches:
+            return None
+        score, entry = matches[0]
+        return LocationMatch(self.state_targets[entry], None, score)
+
+    def _resolve(self, state: Optional[str], city: str) -> Optional[LocationMatch]:
+        """Best canonical (state, city) for free-text input; the state narrows the search when it resolves"""
+        state_match = self.resolve_state(state) if state else None
+        allowed = self.city_entries_by_state.get(state_match.state) if state_match else None
+
+        name = normalize_place(city)
+        if not name:
+            return None
+
+        # Exact names and aliases first, preferring the resolved state
+        exact = self.city_exact.get(name, ())
+        if exact:
+            preferred = [entry for entry in exact if allowed is None or entry in allowed]
+            entry = (preferred or exact)[0]
+            return LocationMatch(*self.city_targets[entry], 1.0)
+
+        matches = self.city_index.search(name, self.min_score, allowed)
+        if not matches and allowed is not None:
+            # The state may be wrong; the city name alone can still identify it
+            matches = self.city_index.search(name, self.min_score)
+        if not matches:
+            return None
+        score, entry = matches[0]
+        return LocationMatch(*self.city_targets[entry], score)
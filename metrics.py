@@ -0,0 +1,203 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds: eight per decade from 1 us to 100 s, so percentile
+# estimates read back from a histogram are within about 15% of the true value
+DEFAULT_BUCKETS = tuple(10 ** (exponent / 8) for exponent in range(-48, 17))
+
+# Returned by timer() while metrics are disabled; entering it does nothing
+_DISABLED_TIMER = nullcontext()
+
+class Histogram:
+    """Fixed-bucket latency histogram, cumulative on export as Prometheus expects"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def percentile(self, q: float) -> float:
+        """Estimated q-th percentile (0-100), interpolated inside the bucket that holds it"""
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+        if not total:
+            return 0.0
+
+        rank = q / 100 * total
+        seen = 0
+        for index, count in enumerate(counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else lower
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def cumulative_counts(self) -> List[int]:
+        with self._lock:
+            counts = list(self.counts)
+        running = 0
+        cumulative = []
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative
+
+class _StageTimer:
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+class MetricsRegistry:
+    """Per-stage latency histograms and event counters for the scoring pipeline
+
+    Disabled by default: timer() then hands back a shared no-op context manager
+    and increment() returns at once, so the hooks cost one attribute check.
+    """
+
+    def __init__(self, enabled: bool = False, namespace: str = 'student_stress'):
+        self.enabled = enabled
+        self.namespace = namespace
+        self.stages = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.counters = {}
+
+    def _histogram(self, stage: str) -> Histogram:
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.stages.setdefault(stage, Histogram())
+        return histogram
+
+    def timer(self, stage: str):
+        """Context manager recording the wall time of one stage"""
+        if not self.enabled:
+            return _DISABLED_TIMER
+        return _StageTimer(self._histogram(stage))
+
+    def observe(self, stage: str, seconds: float):
+        if self.enabled:
+            self._histogram(stage).observe(seconds)
+
+    def increment(self, name: str, amount: int = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def _snapshot(self):
+        with self._lock:
+            return sorted(self.stages.items()), sorted(self.counters.items())
+
+    def summary(self) -> Dict[str, Dict]:
+        """count, mean and p50/p95/p99 (milliseconds) per stage"""
+        stages, _ = self._snapshot()
+        return {
+            stage: {
+                'count': histogram.count,
+                'mean_ms': histogram.sum / histogram.count * 1000 if histogram.count else 0.0,
+                'p50_ms': histogram.percentile(50) * 1000,
+                'p95_ms': histogram.percentile(95) * 1000,
+                'p99_ms': histogram.percentile(99) * 1000
+            }
+            for stage, histogram in stages
+        }
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        stages, counters = self._snapshot()
+        name = f'{self.namespace}_stage_duration_seconds'
+        lines = [
+            f'# HELP {name} Wall time of each scoring pipeline stage.',
+            f'# TYPE {name} histogram'
+        ]
+        for stage, histogram in stages:
+            cumulative = histogram.cumulative_counts()
+            bounds = [f'{bound:.6g}' for bound in histogram.buckets] + ['+Inf']
+            for bound, count in zip(bounds, cumulative):
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.sum:.9g}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {cumulative[-1]}')
+
+        for counter, value in counters:
+            counter_name = f'{self.namespace}_{counter}_total'
+            lines.append(f'# TYPE {counter_name} counter')
+            lines.append(f'{counter_name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def format_summary(self) -> str:
+        """One line per stage for logs"""
+        rows = [
+            f"{stage}: n={stats['count']} p50={stats['p50_ms']:.3f}ms p95={stats['p95_ms']:.3f}ms p99={stats['p99_ms']:.3f}ms"
+            for stage, stats in self.summary().items()
+            if stats['count']
+        ]
+        rows.extend(f'{counter}={value}' for counter, value in self._snapshot()[1])
+        return '\n'.join(rows)
+
+class PeriodicSummaryLogger:
+    """Background thread that logs the registry summary every ``interval_seconds``"""
+
+    def __init__(self, registry: MetricsRegistry, interval_seconds: float = 60.0, log: Optional[logging.Logger] = None):
+        self.registry = registry
+        self.interval_seconds = interval_seconds
+        self.log = log or logger
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='metrics-summary', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            if self.registry.stages or self.registry.counters:
+                self.log.info('Scoring pipeline latency:\n%s', self.registry.format_summary())
+
+# Process-wide registry used by the recommendation engine and inference hooks;
+# set STUDENT_STRESS_METRICS=1 to enable it at import time
+METRICS = MetricsRegistry(enabled=os.environ.get('STUDENT_STRESS_METRICS', '') == '1')
@@ -0,0 +1,160 @@
+import argparse
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from inference import SCALED_MODELS
+from tree_compiler import CompiledTrees
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ARTIFACT_DIR = os.path.join(BASE_DIR, 'models')
+DEFAULT_PACKAGE_PATH = os.path.join(BASE_DIR, 'stress_prediction_models.pkl')
+
+MANIFEST_NAME = 'manifest.json'
+FORMAT_VERSION = 1
+
+# Model types whose predict needs writable arrays
+READ_WRITE_MODEL_TYPES = ('SVC',)
+
+def export_model_package(model_package: Dict, output_dir: str) -> str:
+    """Split a Stress.ipynb model package into a manifest plus one file per model"""
+    import joblib
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    models = {}
+    for name, model in model_package['models'].items():
+        filename = re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_') + '.joblib'
+        # Uncompressed so joblib can memory-map the NumPy arrays on load
+        joblib.dump(model, os.path.join(output_dir, filename), compress=0)
+        models[name] = {
+            'file': filename,
+            'type': type(model).__name__,
+            'scaled_inputs': name in SCALED_MODELS
+        }
+
+        # Tree models are also flattened into .npy arrays that serving reads without sklearn
+        compiled = CompiledTrees.from_model(model)
+        if compiled is not None:
+            compiled_dir = filename.replace('.joblib', '.trees')
+            compiled.save(os.path.join(output_dir, compiled_dir))
+            models[name]['compiled'] = compiled_dir
+
+    scaler = model_package['scaler']
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'best_model': model_package['best_model'],
+        'feature_columns': list(model_package['feature_columns']),
+        'class_names': list(model_package['class_names']),
+        'scaler': {
+            'mean': np.asarray(scaler.mean_, dtype=float).tolist(),
+            'scale': np.asarray(scaler.scale_, dtype=float).tolist()
+        },
+        'label_encoders': {
+            name: [str(label) for label in encoder.classes_]
+            for name, encoder in model_package['label_encoders'].items()
+            if encoder is not None
+        },
+        'models': models
+    }
+
+    # Write the manifest last so readers never see one pointing at missing files
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    temp_path = manifest_path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temp_path, manifest_path)
+    return manifest_path
+
+class ModelArtifacts:
+    """Split model artifacts: the manifest is read eagerly, each model on first use"""
+
+    def __init__(self, artifact_dir: str = DEFAULT_ARTIFACT_DIR, mmap_mode: Optional[str] = 'r'):
+        self.artifact_dir = artifact_dir
+        self.mmap_mode = mmap_mode
+        with open(os.path.join(artifact_dir, MANIFEST_NAME), 'r') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported model artifact format: {self.manifest.get('format_version')}")
+
+        self._models = {}
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    @property
+    def best_model(self) -> str:
+        return self.manifest['best_model']
+
+    @property
+    def model_names(self) -> List[str]:
+        return list(self.manifest['models'])
+
+    @property
+    def feature_columns(self) -> List[str]:
+        return self.manifest['feature_columns']
+
+    @property
+    def class_names(self) -> List[str]:
+        return self.manifest['class_names']
+
+    @property
+    def scaler_mean(self) -> np.ndarray:
+        return np.asarray(self.manifest['scaler']['mean'], dtype=float)
+
+    @property
+    def scaler_scale(self) -> np.ndarray:
+        return np.asarray(self.manifest['scaler']['scale'], dtype=float)
+
+    @property
+    def label_classes(self) -> Dict[str, List[str]]:
+        return self.manifest['label_encoders']
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def load_model(self, name: Optional[str] = None):
+        """Load (once) and return a model by name, the best model by default"""
+        name = name or self.best_model
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            if name not in self._models:
+                # Deferred so serving from compiled trees never imports joblib
+                import joblib
+                entry = self.manifest['models'][name]
+                path = os.path.join(self.artifact_dir, entry['file'])
+                # libsvm writes into its support-vector buffers, so SVC cannot be memory-mapped read-only
+                mmap_mode = None if entry['type'] in READ_WRITE_MODEL_TYPES else self.mmap_mode
+                self._models[name] = joblib.load(path, mmap_mode=mmap_mode)
+            return self._models[name]
+
+    def load_compiled(self, name: Optional[str] = None) -> Optional[CompiledTrees]:
+        """Compiled trees of a model (memory-mapped), or None when none were exported"""
+        name = name or self.best_model
+        compiled_dir = self.manifest['models'][name].get('compiled')
+        if compiled_dir is None:
+            return None
+
+        with self._lock:
+            if name not in self._compiled:
+                self._compiled[name] = CompiledTrees.load(os.path.join(self.artifact_dir, compiled_dir), mmap_mode=self.mmap_mode)
+            return self._compiled[name]
+
+def main():
+    parser = argparse.ArgumentParser(description='Split stress_prediction_models.pkl into lazily loaded per-model artifacts')
+    parser.add_argument('--package', default=DEFAULT_PACKAGE_PATH, help='joblib model package written by Stress.ipynb')
+    parser.add_argument('--output', default=DEFAULT_ARTIFACT_DIR, help='directory for the manifest and model files')
+    args = parser.parse_args()
+
+    import joblib
+    manifest_path = export_model_package(joblib.load(args.package), args.output)
+    print(f'Model artifacts written to {manifest_path}')
+
+if __name__ == '__main__':
+    main()
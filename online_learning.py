@@ -0,0 +1,338 @@
+import argparse
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import joblib
+import numpy as np
+
+from features import FEATURE_COLUMNS, FeatureBuilder
+from inference import StressPredictor
+from metrics import METRICS
+from survey_data import STRESS_LEVELS, read_survey_chunks
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ARTIFACT_DIR = os.path.join(BASE_DIR, 'models')
+
+ONLINE_MODEL_NAME = 'Online SGD'
+SNAPSHOT_FORMAT_VERSION = 1
+LATEST_NAME = 'LATEST'
+STATE_NAME = 'state.joblib'
+META_NAME = 'meta.json'
+
+class OnlineLearner:
+    """SGD logistic regression and its scaler, updated one mini-batch of labelled assessments at a time
+
+    Only running statistics are kept (the scaler's count, mean and variance and the
+    model's weights), so memory does not grow with the number of rows seen. Each
+    batch is scored before the model learns from it, which gives a progressive
+    validation estimate of accuracy and log loss without a held-out set.
+    """
+
+    def __init__(
+        self,
+        label_classes: Mapping[str, Sequence[str]],
+        feature_columns: Sequence[str] = FEATURE_COLUMNS,
+        class_names: Sequence[str] = STRESS_LEVELS,
+        model=None,
+        scaler=None,
+        rows_seen: int = 0,
+        progressive: Optional[Dict] = None,
+        alpha: float = 1e-2,
+        seed: int = 42
+    ):
+        from sklearn.linear_model import SGDClassifier
+        from sklearn.preprocessing import StandardScaler
+
+        self.feature_columns = list(feature_columns)
+        self.class_names = list(class_names)
+        self.label_classes = {name: list(classes) for name, classes in label_classes.items()}
+        # No fill values: invalid numbers stay NaN so the scaler ignores them
+        self.features = FeatureBuilder(self.label_classes, self.feature_columns)
+        self.model = model if model is not None else SGDClassifier(loss='log_loss', alpha=alpha, random_state=seed)
+        self.scaler = scaler if scaler is not None else StandardScaler()
+        self.rows_seen = rows_seen
+        self.progressive = dict(progressive or {'rows': 0, 'correct': 0, 'log_loss_sum': 0.0})
+
+    def _impute(self, features: np.ndarray) -> np.ndarray:
+        # Missing values take the running mean, as serving does with its fill values
+        return np.where(np.isnan(features), np.nan_to_num(self.scaler.mean_), features)
+
+    def partial_fit(self, features: np.ndarray, labels: np.ndarray) -> Dict:
+        """Update the scaler and model with one mini-batch; returns the batch's progressive-validation scores"""
+        features = np.asarray(features, dtype=float)
+        labels = np.asarray(labels, dtype=float)
+        labelled = np.isfinite(labels)
+        features, labels = features[labelled], labels[labelled].astype(int)
+        if not len(labels):
+            return {'rows': 0}
+
+        scores = {'rows': len(labels)}
+        if self.rows_seen:
+            probabilities = self.model.predict_proba(self.scaler.transform(self._impute(features)))
+            picked = np.clip(probabilities[np.arange(len(labels)), labels], 1e-15, 1.0)
+            scores['accuracy'] = float(np.mean(probabilities.argmax(axis=1) == labels))
+            scores['log_loss'] = float(-np.mean(np.log(picked)))
+            self.progressive['rows'] += len(labels)
+            self.progressive['correct'] += int(np.sum(probabilities.argmax(axis=1) == labels))
+            self.progressive['log_loss_sum'] += float(-np.sum(np.log(picked)))
+
+        # NaN entries are skipped by partial_fit, so missing values do not drag the mean
+        self.scaler.partial_fit(features)
+        self.model.partial_fit(
+            self.scaler.transform(self._impute(features)),
+            labels,
+            classes=np.arange(len(self.class_names))
+        )
+        self.rows_seen += len(labels)
+        return scores
+
+    def update(self, frame) -> Dict:
+        """partial_fit() on a cleaned survey frame (see survey_data.read_survey_chunks)"""
+        return self.partial_fit(self.features.transform(frame), frame['stress_levels_encoded'].to_numpy(dtype=float))
+
+    def progressive_scores(self) -> Dict:
+        rows = self.progressive['rows']
+        return {
+            'rows': rows,
+            'accuracy': self.progressive['correct'] / rows if rows else None,
+            'log_loss': self.progressive['log_loss_sum'] / rows if rows else None
+        }
+
+class SnapshotStore:
+    """Versioned learner snapshots in one directory, with a LATEST pointer readers follow
+
+    Each version is written to a temporary directory and renamed into place before
+    LATEST is replaced, so a reader never sees a partial snapshot. One publisher
+    per directory is assumed.
+    """
+
+    def __init__(self, directory: str, keep: int = 5):
+        self.directory = directory
+        self.keep = keep
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def latest_path(self) -> str:
+        return os.path.join(self.directory, LATEST_NAME)
+
+    def versions(self) -> List[str]:
+        return sorted(name for name in os.listdir(self.directory) if re.fullmatch(r'v\d{6}', name))
+
+    def latest_version(self) -> Optional[str]:
+        try:
+            with open(self.latest_path, 'r') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def publish(self, learner: OnlineLearner) -> str:
+        """Write a new snapshot version and point LATEST at it"""
+        versions = self.versions()
+        version = f'v{int(versions[-1][1:]) + 1 if versions else 1:06d}'
+        temp_dir = os.path.join(self.directory, f'.{version}.tmp')
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        os.makedirs(temp_dir)
+
+        joblib.dump({'model': learner.model, 'scaler': learner.scaler}, os.path.join(temp_dir, STATE_NAME))
+        meta = {
+            'format_version': SNAPSHOT_FORMAT_VERSION,
+            'version': version,
+            'created_at': time.time(),
+            'rows_seen': learner.rows_seen,
+            'feature_columns': learner.feature_columns,
+            'class_names': learner.class_names,
+            'label_classes': learner.label_classes,
+            'scaler': {
+                'mean': np.nan_to_num(learner.scaler.mean_).tolist(),
+                'scale': learner.scaler.scale_.tolist()
+            },
+            'progressive': learner.progressive
+        }
+        with open(os.path.join(temp_dir, META_NAME), 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.rename(temp_dir, os.path.join(self.directory, version))
+
+        temp_pointer = self.latest_path + '.tmp'
+        with open(temp_pointer, 'w') as f:
+            f.write(version + '\n')
+        os.replace(temp_pointer, self.latest_path)
+
+        self._prune()
+        return version
+
+    def _prune(self):
+        latest = self.latest_version()
+        stale = [version for version in self.versions()[:-self.keep] if version != latest] if self.keep > 0 else []
+        for version in stale:
+            shutil.rmtree(os.path.join(self.directory, version), ignore_errors=True)
+
+    def read_meta(self, version: str) -> Dict:
+        with open(os.path.join(self.directory, version, META_NAME), 'r') as f:
+            meta = json.load(f)
+        if meta.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format: {meta.get('format_version')}")
+        return meta
+
+    def load_learner(self, version: Optional[str] = None) -> Optional[OnlineLearner]:
+        """Learner resumed from a snapshot (the latest by default), or None when there is none"""
+        version = version or self.latest_version()
+        if version is None:
+            return None
+        meta = self.read_meta(version)
+        state = joblib.load(os.path.join(self.directory, version, STATE_NAME))
+        return OnlineLearner(
+            meta['label_classes'],
+            meta['feature_columns'],
+            meta['class_names'],
+            model=state['model'],
+            scaler=state['scaler'],
+            rows_seen=meta['rows_seen'],
+            progressive=meta['progressive']
+        )
+
+    def load_predictor(self, version: Optional[str] = None) -> StressPredictor:
+        """StressPredictor serving a snapshot (the latest by default)"""
+        version = version or self.latest_version()
+        if version is None:
+            raise FileNotFoundError(f'No snapshot published in {self.directory}')
+        meta = self.read_meta(version)
+        state_path = os.path.join(self.directory, version, STATE_NAME)
+        return StressPredictor(
+            model_loader=lambda: joblib.load(state_path)['model'],
+            model_name=ONLINE_MODEL_NAME,
+            feature_columns=meta['feature_columns'],
+            class_names=meta['class_names'],
+            scaler_mean=meta['scaler']['mean'],
+            scaler_scale=meta['scaler']['scale'],
+            label_classes=meta['label_classes'],
+            scale_inputs=True
+        )
+
+class HotSwapPredictor:
+    """Serves the latest snapshot of a SnapshotStore and swaps in newer ones as they are published
+
+    A new snapshot is fully loaded before it replaces the current predictor in one
+    reference assignment, so no request ever waits for a load. The pass-through
+    methods each read the current predictor; a request that must finish on the
+    version it started with takes pin() once and uses that for every step.
+    """
+
+    def __init__(self, store: SnapshotStore, poll_interval_seconds: float = 5.0):
+        self.store = store
+        self.poll_interval_seconds = poll_interval_seconds
+        self.version = None
+        self.current = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if not self.refresh():
+            raise FileNotFoundError(f'No snapshot published in {store.directory}')
+
+    def refresh(self) -> bool:
+        """Swap to the latest snapshot if it changed; True when a swap happened"""
+        version = self.store.latest_version()
+        if version is None or version == self.version:
+            return False
+        predictor = self.store.load_predictor(version)
+        predictor.model  # load before it takes traffic
+        with self._lock:
+            self.current, self.version = predictor, version
+        METRICS.increment('snapshot_swaps')
+        logger.info('Serving online model snapshot %s', version)
+        return True
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='snapshot-watcher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval_seconds):
+            try:
+                self.refresh()
+            except Exception:
+                # A bad snapshot must not take serving down; keep the current one
+                logger.exception('Could not load the latest online model snapshot')
+
+    @property
+    def model_name(self) -> str:
+        return f'{ONLINE_MODEL_NAME} {self.version}'
+
+    @property
+    def class_names(self) -> List[str]:
+        return self.current.class_names
+
+    @property
+    def feature_columns(self) -> List[str]:
+        return self.current.feature_columns
+
+    def pin(self) -> StressPredictor:
+        """The predictor serving right now; unaffected by later swaps"""
+        return self.current
+
+    def build_features(self, **form_inputs) -> List[float]:
+        return self.current.build_features(**form_inputs)
+
+    def build_feature_matrix(self, columns) -> np.ndarray:
+        return self.current.build_feature_matrix(columns)
+
+    def predict_proba_one(self, features: List[float]) -> List[float]:
+        return self.current.predict_proba_one(features)
+
+    def predict_proba_batch(self, features: np.ndarray) -> np.ndarray:
+        return self.current.predict_proba_batch(features)
+
+    def predict(self, **form_inputs):
+        # One predictor for both steps, even if a swap lands in between
+        return self.pin().predict(**form_inputs)
+
+def main():
+    parser = argparse.ArgumentParser(description='Update the online stress model from new labelled assessments and publish snapshots')
+    parser.add_argument('--data', required=True, help='survey-format CSV of labelled assessments')
+    parser.add_argument('--snapshots', default=os.path.join(DEFAULT_ARTIFACT_DIR, 'online'), help='snapshot directory served by the scoring service')
+    parser.add_argument('--artifacts', default=DEFAULT_ARTIFACT_DIR, help='model artifacts whose label encoders seed a new learner')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='rows per mini-batch')
+    parser.add_argument('--publish-every', type=int, default=10000, help='rows between snapshots (a final snapshot is always written)')
+    parser.add_argument('--keep', type=int, default=5, help='snapshot versions to keep')
+    parser.add_argument('--alpha', type=float, default=1e-2, help='L2 regularization of a new learner')
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.snapshots, keep=args.keep)
+    learner = store.load_learner()
+    if learner is None:
+        from model_artifacts import ModelArtifacts
+        artifacts = ModelArtifacts(args.artifacts)
+        learner = OnlineLearner(artifacts.label_classes, artifacts.feature_columns, artifacts.class_names, alpha=args.alpha)
+        print('Starting a new online model')
+    else:
+        print(f'Resuming from snapshot {store.latest_version()} ({learner.rows_seen} rows seen)')
+
+    since_publish = 0
+    for chunk in read_survey_chunks(args.data, chunk_size=args.chunk_size):
+        since_publish += learner.update(chunk)['rows']
+        if since_publish >= args.publish_every:
+            print(f'Published {store.publish(learner)} after {learner.rows_seen} rows')
+            since_publish = 0
+    if since_publish:
+        print(f'Published {store.publish(learner)} after {learner.rows_seen} rows')
+
+    scores = learner.progressive_scores()
+    if scores['rows']:
+        print(f"Progressive validation over {scores['rows']} rows: accuracy={scores['accuracy']:.3f} log_loss={scores['log_loss']:.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,217 @@
+import hashlib
+import heapq
 import json
+import math
 import re
-from typing import Dict, List, Tuple
-import pandas as pd
+import threading
+import time
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Dict, FrozenSet, List, Mapping, Optional, Tuple
+import numpy as np
+
+from data_registry import DATA_REGISTRY, FACILITY_KINDS, DataRegistry, DataSnapshot, freeze as _freeze
+from location_resolver import LocationResolver
+from metrics import METRICS, MetricsRegistry
+
+if TYPE_CHECKING:
+    # Only score_batch needs pandas; importing it here would add ~0.4 s to every cold start
+    import pandas as pd
+
+
+def _as_probability_matrix(column) -> np.ndarray:
+    """Stack a column of probability lists (or a 2-D array) into a float matrix"""
+    if isinstance(column, np.ndarray) and column.ndim == 2:
+        return column.astype(float, copy=False)
+    return np.array([list(row) for row in column], dtype=float)
+
+def _ml_stress_scores(probabilities: np.ndarray) -> np.ndarray:
+    """Expected class index scaled to 0-1 (higher index = higher stress)"""
+    n_classes = probabilities.shape[1]
+    return probabilities @ np.arange(n_classes) / (n_classes - 1)
+
+def _lookup_scores(values, weights: Dict[str, float], default: float) -> np.ndarray:
+    """Map categorical values to weights, looking up each distinct value once"""
+    values = np.asarray(list(values), dtype=object)
+    if values.size == 0:
+        return np.zeros(0)
+    unique_values, codes = np.unique(values.astype(str), return_inverse=True)
+    unique_scores = np.array([weights.get(value, default) for value in unique_values], dtype=float)
+    return unique_scores[codes.reshape(-1)]
+
+def _as_trigger_list(events) -> List[str]:
+    """Normalize a trigger cell (list, tuple, None or NaN) to a list"""
+    if isinstance(events, str):
+        return [events]
+    if events is None or _is_missing(events):
+        return []
+    return list(events)
+
+def _is_missing(value) -> bool:
+    return isinstance(value, float) and np.isnan(value)
+
+def _copy_mutable(value):
+    """Copy of the dicts, lists and sets in a result; read-only mappings, tuples and scalars are shared"""
+    if isinstance(value, dict):
+        return {key: _copy_mutable(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_mutable(item) for item in value]
+    if isinstance(value, set):
+        return set(value)
+    if isinstance(value, tuple):
+        return tuple(_copy_mutable(item) for item in value)
+    return value
+
+# National helplines, always included with facility results
+EMERGENCY_NUMBERS = _freeze([
+    {
+        'name': 'AASRA (24/7 Crisis Helpline)',
+        'number': '9820466726',
+        'description': 'Suicide prevention and crisis intervention'
+    },
+    {
+        'name': 'Vandrevala Foundation',
+        'number': '9999666555',
+        'description': '24/7 mental health support'
+    },
+    {
+        'name': 'Sneha India',
+        'number': '044-24640050',
+        'description': 'Emotional support and suicide prevention'
+    },
+    {
+        'name': 'iCall (TISS)',
+        'number': '9152987821',
+        'description': 'Psychosocial helpline (Mon-Sat, 8AM-10PM)'
+    },
+    {
+        'name': 'Kiran Mental Health Helpline',
+        'number': '1800-599-0019',
+        'description': 'Government of India 24/7 mental health support'
+    }
+])
+
+class KeywordScanner:
+    """Word-stem matcher for several keyword lists, built once per analyzer
+
+    A term matches a word that starts with it, so 'abuse' finds 'abused' and
+    'abuses' but not 'disabused', and 'sad' does not fire on 'crusade'. In a
+    phrase only the last word is a stem; the words before it must match whole.
+    """
+    
+    token_pattern = re.compile(r"\w+")
+    
+    def __init__(self, lexicons: Dict[str, List[str]]):
+        self.categories = tuple(lexicons)
+        self.stem_categories = {}
+        self.phrases_by_head = {}
+        for category, terms in lexicons.items():
+            for term in terms:
+                words = tuple(self.token_pattern.findall(term.lower()))
+                if len(words) == 1:
+                    self.stem_categories.setdefault(words[0], category)
+                elif words:
+                    self.phrases_by_head.setdefault(words[0], []).append((words, category))
+        # A word is checked against its prefixes of these lengths only
+        self.stem_lengths = sorted({len(stem) for stem in self.stem_categories})
+    
+    def scan(self, text: str) -> Dict[str, set]:
+        """Return the distinct terms of each category found in the text"""
+        hits = {category: set() for category in self.categories}
+        tokens = self.token_pattern.findall(text.lower())
+        present = set(tokens)
+        
+        stem_categories = self.stem_categories
+        for word in present:
+            for length in self.stem_lengths:
+                if length > len(word):
+                    break
+                category = stem_categories.get(word[:length])
+                if category is not None:
+                    hits[category].add(word[:length])
+        
+        # Multi-word phrases are only checked where their first word occurs
+        if not present.isdisjoint(self.phrases_by_head):
+            for position, token in enumerate(tokens):
+                for words, category in self.phrases_by_head.get(token, ()):
+                    found = tokens[position:position + len(words)]
+                    if len(found) == len(words) and found[:-1] == list(words[:-1]) and found[-1].startswith(words[-1]):
+                        hits[category].add(' '.join(words))
+        return hits
+
+class GeoIndex:
+    """KD-tree over points on the unit sphere for nearest-neighbour search by great-circle distance"""
+    
+    EARTH_RADIUS_KM = 6371.0088
+    
+    def __init__(self, coordinates: List[Tuple[float, float]], leaf_size: int = 8):
+        self.points = [self._unit_vector(lat, lon) for lat, lon in coordinates]
+        self.leaf_size = leaf_size
+        self.root = self._build(list(range(len(self.points))), depth=0) if self.points else None
+    
+    @staticmethod
+    def _unit_vector(lat: float, lon: float) -> Tuple[float, float, float]:
+        lat, lon = math.radians(lat), math.radians(lon)
+        return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+    
+    def _build(self, ids: List[int], depth: int):
+        if len(ids) <= self.leaf_size:
+            return ids
+        # Split on the axis with the widest spread
+        spreads = [max(self.points[i][axis] for i in ids) - min(self.points[i][axis] for i in ids) for axis in range(3)]
+        axis = spreads.index(max(spreads))
+        ids.sort(key=lambda i: self.points[i][axis])
+        middle = len(ids) // 2
+        split = self.points[ids[middle]][axis]
+        return (axis, split, self._build(ids[:middle], depth + 1), self._build(ids[middle:], depth + 1))
+    
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        k: int = 5,
+        max_distance_km: Optional[float] = None,
+        allowed: Optional[FrozenSet[int]] = None
+    ) -> List[Tuple[float, int]]:
+        """The k nearest (distance_km, point id) pairs, closest first"""
+        if self.root is None or k <= 0:
+            return []
+        query = self._unit_vector(lat, lon)
+        # Compare squared chord lengths; they order the same way as arc lengths
+        if max_distance_km is None:
+            limit = 4.0
+        else:
+            limit = (2 * math.sin(min(max_distance_km / self.EARTH_RADIUS_KM, math.pi) / 2)) ** 2
+        best = []  # max-heap of (-chord^2, id)
+        
+        def bound():
+            return -best[0][0] if len(best) == k else limit
+        
+        def search(node):
+            if isinstance(node, list):
+                for i in node:
+                    if allowed is not None and i not in allowed:
+                        continue
+                    point = self.points[i]
+                    chord2 = (point[0] - query[0]) ** 2 + (point[1] - query[1]) ** 2 + (point[2] - query[2]) ** 2
+                    if chord2 <= bound():
+                        if len(best) == k:
+                            heapq.heapreplace(best, (-chord2, i))
+                        else:
+                            heapq.heappush(best, (-chord2, i))
+                return
+            axis, split, left, right = node
+            offset = query[axis] - split
+            near, far = (left, right) if offset < 0 else (right, left)
+            search(near)
+            if offset * offset <= bound():
+                search(far)
+        
+        search(self.root)
+        return sorted(
+            (2 * self.EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(-neg_chord2) / 2)), i)
+            for neg_chord2, i in best
+        )
 
 class EmotionalAnalyzer:
     def __init__(self):
@@ -44,6 +254,25 @@ class EmotionalAnalyzer:
             'neglect', 'divorce', 'death', 'accident', 'harassment',
             'discrimination', 'betrayal', 'abandonment', 'rejection'
         ]
+        
+        # Sentiment lexicon for context text
+        self.negative_words = [
+            'sad', 'angry', 'frustrated', 'terrible', 'awful', 'hate',
+            'depressed', 'hopeless', 'worthless', 'failure', 'disappointed',
+            'stressed', 'overwhelmed', 'exhausted', 'tired', 'worried', 'scared'
+        ]
+        
+        self.positive_words = [
+            'happy', 'good', 'great', 'excellent', 'wonderful', 'amazing',
+            'love', 'excited', 'confident', 'optimistic', 'hopeful', 'peaceful'
+        ]
+        
+        # All lexicons compiled once into a single word-stem matcher
+        self.keyword_scanner = KeywordScanner({
+            'trauma': self.trauma_keywords,
+            'negative': self.negative_words,
+            'positive': self.positive_words
+        })
     
     def analyze_emotional_state(self, emotion: str, trigger_events: List[str], context_text: str = "") -> Dict:
         """Analyze emotional state and return stress factors"""
@@ -55,12 +284,11 @@ class EmotionalAnalyzer:
         trigger_scores = [self.trigger_event_weights.get(event, 0.5) for event in trigger_events]
         trigger_score = sum(trigger_scores) / len(trigger_scores) if trigger_scores else 0.3
         
-        # Analyze context text for trauma indicators
-        trauma_detected = self._detect_trauma_in_text(context_text)
+        # Scan the context text once for trauma indicators and sentiment
+        context_signals = self.scan_context(context_text)
+        trauma_detected = bool(context_signals['trauma_hits'])
         trauma_score = 0.9 if trauma_detected else 0.0
-        
-        # Sentiment analysis of context text
-        sentiment_score = self._analyze_sentiment(context_text)
+        sentiment_score = self._sentiment_from_signals(context_signals)
         
         return {
             'emotion_score': emotion_score,
@@ -76,49 +304,63 @@ class EmotionalAnalyzer:
             }
         }
     
-    def _detect_trauma_in_text(self, text: str) -> bool:
-        """Detect trauma-related keywords in context text"""
+    def scan_context(self, text: str) -> Dict:
+        """Single pass over the context text: trauma hits, sentiment counts and word count"""
         if not text:
-            return False
+            return {'trauma_hits': (), 'negative_count': 0, 'positive_count': 0, 'total_words': 0}
         
-        text_lower = text.lower()
-        for keyword in self.trauma_keywords:
-            if keyword in text_lower:
-                return True
-        return False
+        hits = self.keyword_scanner.scan(text)
+        return {
+            'trauma_hits': tuple(sorted(hits['trauma'])),
+            'negative_count': len(hits['negative']),
+            'positive_count': len(hits['positive']),
+            'total_words': len(text.split())
+        }
+    
+    def _detect_trauma_in_text(self, text: str) -> bool:
+        """Detect trauma-related keywords in context text"""
+        return bool(self.scan_context(text)['trauma_hits'])
     
     def _analyze_sentiment(self, text: str) -> float:
         """Simple sentiment analysis - returns score between 0 (positive) and 1 (negative)"""
-        if not text:
-            return 0.5
-        
-        negative_words = [
-            'sad', 'angry', 'frustrated', 'terrible', 'awful', 'hate', 'angry',
-            'depressed', 'hopeless', 'worthless', 'failure', 'disappointed',
-            'stressed', 'overwhelmed', 'exhausted', 'tired', 'worried', 'scared'
-        ]
-        
-        positive_words = [
-            'happy', 'good', 'great', 'excellent', 'wonderful', 'amazing',
-            'love', 'excited', 'confident', 'optimistic', 'hopeful', 'peaceful'
-        ]
-        
-        text_lower = text.lower()
-        negative_count = sum(1 for word in negative_words if word in text_lower)
-        positive_count = sum(1 for word in positive_words if word in text_lower)
-        
-        total_words = len(text.split())
+        return self._sentiment_from_signals(self.scan_context(text))
+    
+    def _sentiment_from_signals(self, signals: Dict) -> float:
+        """Sentiment score from scan_context output (higher = more negative)"""
+        total_words = signals['total_words']
         if total_words == 0:
             return 0.5
         
-        # Calculate sentiment score (higher = more negative)
-        sentiment_score = (negative_count - positive_count + total_words * 0.5) / total_words
+        sentiment_score = (signals['negative_count'] - signals['positive_count'] + total_words * 0.5) / total_words
         return max(0.0, min(1.0, sentiment_score))
 
 class CourseAnalyzer:
-    def __init__(self):
-        with open('course_stress_patterns.json', 'r') as f:
-            self.course_patterns = json.load(f)
+    # Used for courses without coping strategies in course_stress_patterns.json
+    default_strategies = (
+        'Develop effective study habits',
+        'Seek help from professors and peers',
+        'Maintain work-life balance'
+    )
+    
+    def __init__(self, data: Optional[DataSnapshot] = None):
+        # Read-only so the engine can be shared safely between sessions
+        data = data if data is not None else DATA_REGISTRY.get()
+        self.course_patterns = data.course_patterns
+        
+        # Advice per (course, intensity) is composed once and shared by every request
+        self.course_advice = {}
+        for course, course_data in self.course_patterns.items():
+            strategies = course_data.get('coping_strategies', self.default_strategies)
+            self.course_advice[course] = (strategies, strategies + self._intensive_strategies(course))
+    
+    @staticmethod
+    def _intensive_strategies(course: str) -> Tuple[str, ...]:
+        """Additional strategies for high stress levels"""
+        return (
+            f'Consider academic counseling for {course} students',
+            'Explore stress management workshops specific to your field',
+            f'Connect with senior students in {course} for guidance'
+        )
     
     def get_course_stress_factor(self, course: str) -> float:
         """Get stress factor for a specific course"""
@@ -126,27 +368,34 @@ class CourseAnalyzer:
     
     def get_course_specific_advice(self, course: str, stress_level: str) -> List[str]:
         """Get course-specific coping strategies"""
-        course_data = self.course_patterns.get(course, {})
-        strategies = course_data.get('coping_strategies', [
-            'Develop effective study habits',
-            'Seek help from professors and peers',
-            'Maintain work-life balance'
-        ])
+        high_stress = stress_level in ['Bad', 'Awful']
+        advice = self.course_advice.get(course)
+        # The shared strategies are tuples; callers get their own list
+        if advice is not None:
+            return list(advice[1] if high_stress else advice[0])
         
-        if stress_level in ['Bad', 'Awful']:
+        if high_stress:
             # Add more intensive strategies for high stress
-            strategies.extend([
-                f'Consider academic counseling for {course} students',
-                'Explore stress management workshops specific to your field',
-                'Connect with senior students in {course} for guidance'
-            ])
-        
-        return strategies
+            return list(self.default_strategies + self._intensive_strategies(course))
+        return list(self.default_strategies)
 
 class LocationBasedRecommendations:
-    def __init__(self):
-        with open('india_mental_health_facilities.json', 'r') as f:
-            self.facilities = json.load(f)
+    def __init__(self, max_fallback_distance_km: Optional[float] = 500.0, data: Optional[DataSnapshot] = None):
+        self.max_fallback_distance_km = max_fallback_distance_km
+        data = data if data is not None else DATA_REGISTRY.get()
+        
+        self.facilities = data.facilities
+        
+        # Approximate city centres for every city in state_city_data.json and the facilities data
+        self.city_coordinates = data.city_coordinates
+        
+        self._build_facility_index()
+        
+        # Fuzzy resolver over every known state/city name plus common aliases
+        known_locations = {state: list(cities) for state, cities in data.state_cities.items()}
+        for state, cities in self.facilities.items():
+            known_locations.setdefault(state, []).extend(cities)
+        self.location_resolver = LocationResolver(known_locations)
         
         # State capital mapping for fallback
         self.state_capitals = {
@@ -188,85 +437,249 @@ class LocationBasedRecommendations:
             'Puducherry': 'Puducherry'
         }
     
+    def _build_facility_index(self):
+        """Assign integer ids to facilities and index them by location and attributes"""
+        records = []
+        locations = []
+        postings = {}
+        city_facilities = {}
+        
+        for state, cities in self.facilities.items():
+            for city, city_data in cities.items():
+                for kind in FACILITY_KINDS:
+                    for record in city_data.get(kind, ()):
+                        facility_id = len(records)
+                        records.append(record)
+                        locations.append((state, city))
+                        keys = [('state', state), ('location', state, city), ('kind', kind)]
+                        keys.extend(('service', service.lower()) for service in record.get('services', ()))
+                        if 'type' in record:
+                            keys.append(('type', record['type'].lower()))
+                        if 'emergency' in record:
+                            keys.append(('emergency', bool(record['emergency'])))
+                        for key in keys:
+                            postings.setdefault(key, []).append(facility_id)
+                
+                city_facilities[(state, city)] = MappingProxyType({
+                    kind: city_data.get(kind, ()) for kind in FACILITY_KINDS
+                })
+        
+        self.facility_records = tuple(records)
+        self.facility_locations = tuple(locations)
+        self.facility_index = {key: frozenset(ids) for key, ids in postings.items()}
+        self.city_facilities = city_facilities
+        
+        # Spatial index over facilities whose city has coordinates
+        located_ids = [i for i, (state, city) in enumerate(locations) if self._coordinates(state, city)]
+        self.geo_index = GeoIndex([self._coordinates(*locations[i]) for i in located_ids])
+        self.geo_facility_ids = tuple(located_ids)
+        self.geo_points_by_kind = {
+            kind: frozenset(point for point, facility_id in enumerate(located_ids)
+                            if facility_id in self.facility_index.get(('kind', kind), ()))
+            for kind in FACILITY_KINDS
+        }
+    
+    def _coordinates(self, state: str, city: str) -> Optional[Tuple[float, float]]:
+        return self.city_coordinates.get(state, {}).get(city)
+    
+    def nearest_facilities(
+        self,
+        lat: float,
+        lon: float,
+        k: int = 5,
+        max_distance_km: Optional[float] = None,
+        kind: Optional[str] = None
+    ) -> List[Dict]:
+        """The k facilities nearest to a point by great-circle distance, across state borders"""
+        allowed = None if kind is None else self.geo_points_by_kind.get(kind, frozenset())
+        
+        nearest = []
+        for distance_km, point in self.geo_index.nearest(lat, lon, k, max_distance_km, allowed):
+            facility_id = self.geo_facility_ids[point]
+            state, city = self.facility_locations[facility_id]
+            nearest.append({
+                'distance_km': distance_km,
+                'state': state,
+                'city': city,
+                'facility': self.facility_records[facility_id]
+            })
+        return nearest
+    
+    def find_facilities(
+        self,
+        state: Optional[str] = None,
+        city: Optional[str] = None,
+        kind: Optional[str] = None,
+        service: Optional[str] = None,
+        facility_type: Optional[str] = None,
+        emergency: Optional[bool] = None
+    ) -> Tuple[Mapping, ...]:
+        """Facilities matching every given filter, e.g. government hospitals with 24/7 psychiatry in a state"""
+        keys = []
+        if state is not None and city is not None:
+            keys.append(('location', state, city))
+        elif state is not None:
+            keys.append(('state', state))
+        if kind is not None:
+            keys.append(('kind', kind))
+        if service is not None:
+            keys.append(('service', service.lower()))
+        if facility_type is not None:
+            keys.append(('type', facility_type.lower()))
+        if emergency is not None:
+            keys.append(('emergency', bool(emergency)))
+        
+        if not keys:
+            return self.facility_records
+        
+        # Intersect the smallest posting sets first
+        posting_sets = sorted((self.facility_index.get(key, frozenset()) for key in keys), key=len)
+        matches = posting_sets[0].intersection(*posting_sets[1:])
+        return tuple(self.facility_records[facility_id] for facility_id in sorted(matches))
+    
     def get_nearby_facilities(self, state: str, city: str) -> Dict:
-        """Get mental health facilities near the user's location with state capital fallback"""
-        state_data = self.facilities.get(state, {})
-        city_data = state_data.get(city, {})
+        """Get mental health facilities near the user's location with nearest-city fallback"""
+        # Resolve misspelt or alternate names ('Bengaluru', 'Trivandrum') to canonical ones
+        if (state, city) not in self.city_facilities and self._coordinates(state, city) is None:
+            match = self.location_resolver.resolve(state, city)
+            if match is not None:
+                state, city = match.state, match.city
+        
+        city_data = self.city_facilities.get((state, city))
+        fallback_note = None
+        
+        # If exact city not found, use the nearest city with facilities, in any state
+        if city_data is None:
+            coordinates = self._coordinates(state, city)
+            if coordinates is not None:
+                nearest = self.nearest_facilities(*coordinates, k=1, max_distance_km=self.max_fallback_distance_km)
+                if nearest:
+                    nearest_state, nearest_city = nearest[0]['state'], nearest[0]['city']
+                    city_data = self.city_facilities[(nearest_state, nearest_city)]
+                    fallback_note = f"Mental health facilities from {nearest_city}, {nearest_state} (nearest city with data, about {nearest[0]['distance_km']:.0f} km away) as {city} information not available"
         
-        # If exact city not found, try state capital as fallback
-        if not city_data and state in self.state_capitals:
+        # Otherwise, try state capital as fallback
+        if city_data is None and state in self.state_capitals:
             capital_city = self.state_capitals[state]
-            city_data = state_data.get(capital_city, {})
-            if city_data:
-                # Add note about fallback to capital
+            city_data = self.city_facilities.get((state, capital_city))
+            if city_data is not None:
                 fallback_note = f"Mental health facilities from {capital_city} (state capital) as {city} information not available"
-                city_data = city_data.copy()  # Don't modify original data
-                city_data['fallback_note'] = fallback_note
-        
-        # If still no data, try to find any available city in the state
-        if not city_data:
-            available_cities = list(state_data.keys())
-            if available_cities:
-                fallback_city = available_cities[0]
-                city_data = state_data[fallback_city].copy()
-                city_data['fallback_note'] = f"Mental health facilities from {fallback_city} (nearest major city with data) as {city} information not available"
         
         # If still no data, provide generic emergency contacts
-        if not city_data:
-            city_data = {
-                'hospitals': [],
-                'counseling_centers': [],
-                'support_groups': [],
-                'fallback_note': f"No specific facility data available for {city}, {state}. Please contact state health department or search online for local mental health services."
-            }
-        
-        # Always include emergency numbers
-        emergency_numbers = [
-            {
-                'name': 'AASRA (24/7 Crisis Helpline)',
-                'number': '9820466726',
-                'description': 'Suicide prevention and crisis intervention'
-            },
-            {
-                'name': 'Vandrevala Foundation',
-                'number': '9999666555',
-                'description': '24/7 mental health support'
-            },
-            {
-                'name': 'Sneha India',
-                'number': '044-24640050',
-                'description': 'Emotional support and suicide prevention'
-            },
-            {
-                'name': 'iCall (TISS)',
-                'number': '9152987821',
-                'description': 'Psychosocial helpline (Mon-Sat, 8AM-10PM)'
-            },
-            {
-                'name': 'Kiran Mental Health Helpline',
-                'number': '1800-599-0019',
-                'description': 'Government of India 24/7 mental health support'
-            }
-        ]
+        if city_data is None:
+            city_data = {kind: () for kind in FACILITY_KINDS}
+            fallback_note = f"No specific facility data available for {city}, {state}. Please contact state health department or search online for local mental health services."
         
+        # Facility records are shared, read-only views; nothing is copied per request
         result = {
-            'hospitals': city_data.get('hospitals', []),
-            'counseling_centers': city_data.get('counseling_centers', []),
-            'support_groups': city_data.get('support_groups', []),
-            'emergency_numbers': emergency_numbers
+            'hospitals': city_data['hospitals'],
+            'counseling_centers': city_data['counseling_centers'],
+            'support_groups': city_data['support_groups'],
+            'emergency_numbers': EMERGENCY_NUMBERS
         }
         
         # Add fallback note if present
-        if 'fallback_note' in city_data:
-            result['fallback_note'] = city_data['fallback_note']
+        if fallback_note:
+            result['fallback_note'] = fallback_note
         
         return result
 
+class RecommendationCache:
+    """Thread-safe LRU cache with optional TTL and hit/miss/eviction statistics
+
+    Values are copied in and out (see _copy_mutable), so a caller that edits its
+    result changes neither the cached entry nor what other callers get.
+    """
+    
+    def __init__(self, max_size: int = 1024, ttl_seconds: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    @staticmethod
+    def make_key(*parts) -> bytes:
+        """Stable digest of JSON-serializable request inputs"""
+        payload = json.dumps(parts, separators=(',', ':'), ensure_ascii=False)
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).digest()
+    
+    def get(self, key: bytes):
+        with self._lock:
+            value = self._lookup(key)
+        # Stored values are never modified, so the copy needs no lock
+        return None if value is None else _copy_mutable(value)
+    
+    def _lookup(self, key: bytes):
+        entry = self._entries.get(key)
+        if entry is not None:
+            stored_at, value = entry
+            if self.ttl_seconds is None or time.monotonic() - stored_at < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+            self.expirations += 1
+        self.misses += 1
+        return None
+    
+    def put(self, key: bytes, value):
+        value = _copy_mutable(value)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
 class PersonalizedRecommendationEngine:
-    def __init__(self):
+    def __init__(
+        self,
+        cache_size: int = 0,
+        cache_ttl_seconds: Optional[float] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        data_registry: Optional[DataRegistry] = None
+    ):
         self.emotional_analyzer = EmotionalAnalyzer()
-        self.course_analyzer = CourseAnalyzer()
-        self.location_recommendations = LocationBasedRecommendations()
+        
+        # Course and location data follow the registry, so updated listings are served without a restart
+        self.data_registry = data_registry if data_registry is not None else DATA_REGISTRY
+        
+        # Optional result cache; every caller gets its own copy of a cached result
+        self.cache = RecommendationCache(cache_size, cache_ttl_seconds) if cache_size > 0 else None
+        
+        # Per-stage latency hooks; a no-op unless the registry is enabled
+        self.metrics = metrics if metrics is not None else METRICS
+    
+    @property
+    def course_analyzer(self) -> CourseAnalyzer:
+        return self.data_registry.get().derived('course_analyzer', CourseAnalyzer)
+    
+    @property
+    def location_recommendations(self) -> LocationBasedRecommendations:
+        return self.data_registry.get().derived(
+            'location_recommendations', lambda data: LocationBasedRecommendations(data=data)
+        )
     
     def generate_comprehensive_recommendations(
         self, 
@@ -281,33 +694,83 @@ class PersonalizedRecommendationEngine:
         user_profile: Dict
     ) -> Dict:
         """Generate comprehensive personalized recommendations"""
+        with self.metrics.timer('recommendations_total'):
+            if self.cache is None:
+                return self._generate_recommendations(
+                    ml_prediction, ml_probabilities, course, emotion, trigger_events,
+                    context_text, state, city, user_profile
+                )
+            
+            # user_profile does not influence the output, so it is not part of the key;
+            # the data version is, so a facility update is not hidden behind cached results
+            key = RecommendationCache.make_key(
+                ml_prediction, [float(p) for p in ml_probabilities], course, emotion,
+                list(trigger_events), context_text or '', state, city, self.data_registry.get().digest
+            )
+            result = self.cache.get(key)
+            if result is not None:
+                self.metrics.increment('recommendation_cache_hits')
+                return result
+            
+            self.metrics.increment('recommendation_cache_misses')
+            result = self._generate_recommendations(
+                ml_prediction, ml_probabilities, course, emotion, trigger_events,
+                context_text, state, city, user_profile
+            )
+            self.cache.put(key, result)
+            return result
+    
+    def _generate_recommendations(
+        self,
+        ml_prediction: str,
+        ml_probabilities: List[float],
+        course: str,
+        emotion: str,
+        trigger_events: List[str],
+        context_text: str,
+        state: str,
+        city: str,
+        user_profile: Dict
+    ) -> Dict:
+        """Uncached body of generate_comprehensive_recommendations"""
+        metrics = self.metrics
         
         # Analyze emotional state
-        emotional_analysis = self.emotional_analyzer.analyze_emotional_state(
-            emotion, trigger_events, context_text
-        )
+        with metrics.timer('emotional_analysis'):
+            emotional_analysis = self.emotional_analyzer.analyze_emotional_state(
+                emotion, trigger_events, context_text
+            )
         
         # Get course stress factor
-        course_stress_factor = self.course_analyzer.get_course_stress_factor(course)
-        
-        # Calculate enhanced stress score
-        enhanced_stress_score = self._calculate_enhanced_stress_score(
-            ml_probabilities, course_stress_factor, emotional_analysis
-        )
+        with metrics.timer('course_factor'):
+            course_stress_factor = self.course_analyzer.get_course_stress_factor(course)
         
-        # Determine final stress level
-        final_stress_level = self._determine_stress_level(enhanced_stress_score)
+        # Calculate enhanced stress score and determine final stress level
+        with metrics.timer('score_fusion'):
+            enhanced_stress_score = self._calculate_enhanced_stress_score(
+                ml_probabilities, course_stress_factor, emotional_analysis
+            )
+            final_stress_level = self._determine_stress_level(enhanced_stress_score)
         
         # Generate personalized solutions
-        personalized_solutions = self._generate_personalized_solutions(
-            final_stress_level, course, emotional_analysis, context_text, user_profile
-        )
+        with metrics.timer('personalized_solutions'):
+            personalized_solutions = self._generate_personalized_solutions(
+                final_stress_level, course, emotional_analysis, context_text, user_profile
+            )
         
         # Get location-based recommendations
-        location_facilities = self.location_recommendations.get_nearby_facilities(state, city)
+        with metrics.timer('facility_lookup'):
+            location_facilities = self.location_recommendations.get_nearby_facilities(state, city)
         
         # Get course-specific advice
-        course_advice = self.course_analyzer.get_course_specific_advice(course, final_stress_level)
+        with metrics.timer('course_advice'):
+            course_advice = self.course_analyzer.get_course_specific_advice(course, final_stress_level)
+        
+        with metrics.timer('immediate_actions'):
+            immediate_actions = self._get_immediate_actions(final_stress_level, emotional_analysis)
+        
+        with metrics.timer('long_term_strategies'):
+            long_term_strategies = self._get_long_term_strategies(final_stress_level, course)
         
         return {
             'original_ml_prediction': ml_prediction,
@@ -323,8 +786,8 @@ class PersonalizedRecommendationEngine:
             'personalized_solutions': personalized_solutions,
             'course_specific_advice': course_advice,
             'location_based_facilities': location_facilities,
-            'immediate_actions': self._get_immediate_actions(final_stress_level, emotional_analysis),
-            'long_term_strategies': self._get_long_term_strategies(final_stress_level, course)
+            'immediate_actions': immediate_actions,
+            'long_term_strategies': long_term_strategies
         }
     
     def _calculate_enhanced_stress_score(
@@ -352,6 +815,116 @@ class PersonalizedRecommendationEngine:
         
         return final_score
     
+    def score_batch(self, students, include_facilities: bool = True) -> 'pd.DataFrame':
+        """Score many students at once and return a columnar result.
+
+        ``students`` is a DataFrame (or a mapping of column arrays) with the
+        columns ``ml_probabilities``, ``course``, ``emotion``,
+        ``trigger_events``, ``context_text``, ``state`` and ``city``.
+        ``ml_probabilities`` may be a 2-D array or a column of per-row
+        probability lists; ``context_text``, ``state`` and ``city`` are optional.
+        Facility lookups are skipped when ``include_facilities`` is False.
+        """
+        import pandas as pd
+
+        started = time.perf_counter()
+        index = students.index if isinstance(students, pd.DataFrame) else None
+        probabilities = _as_probability_matrix(students['ml_probabilities'])
+        n_students = probabilities.shape[0]
+
+        # Emotion and course factors: one dictionary lookup per distinct value
+        emotion_scores = _lookup_scores(
+            students['emotion'], self.emotional_analyzer.emotion_stress_weights, 0.5
+        )
+        course_factors = _lookup_scores(
+            students['course'],
+            {course: data.get('base_stress_factor', 0.5)
+             for course, data in self.course_analyzer.course_patterns.items()},
+            0.5
+        )
+
+        # Trigger score: mean weight of each student's triggers, 0.3 if none
+        trigger_lists = [_as_trigger_list(events) for events in students['trigger_events']]
+        trigger_counts = np.fromiter((len(events) for events in trigger_lists), dtype=np.int64, count=n_students)
+        flat_weights = _lookup_scores(
+            [event for events in trigger_lists for event in events],
+            self.emotional_analyzer.trigger_event_weights,
+            0.5
+        )
+        owners = np.repeat(np.arange(n_students), trigger_counts)
+        trigger_sums = np.bincount(owners, weights=flat_weights, minlength=n_students)
+        trigger_scores = np.divide(
+            trigger_sums, trigger_counts,
+            out=np.full(n_students, 0.3), where=trigger_counts > 0
+        )
+
+        # Trauma detection runs once per distinct context text
+        if 'context_text' in students:
+            texts = ['' if _is_missing(text) else str(text) for text in students['context_text']]
+            unique_texts, text_codes = np.unique(np.asarray(texts, dtype=object), return_inverse=True)
+            unique_trauma = np.fromiter(
+                (self.emotional_analyzer._detect_trauma_in_text(text) for text in unique_texts),
+                dtype=bool, count=len(unique_texts)
+            )
+            trauma_detected = unique_trauma[text_codes.reshape(-1)]
+        else:
+            trauma_detected = np.zeros(n_students, dtype=bool)
+
+        enhanced_scores = self._calculate_enhanced_stress_scores(
+            probabilities, course_factors, emotion_scores, trigger_scores, trauma_detected
+        )
+
+        result = pd.DataFrame({
+            'ml_stress_score': _ml_stress_scores(probabilities),
+            'course_factor': course_factors,
+            'emotion_score': emotion_scores,
+            'trigger_score': trigger_scores,
+            'trauma_detected': trauma_detected,
+            'enhanced_stress_score': enhanced_scores,
+            'enhanced_stress_level': self._determine_stress_levels(enhanced_scores)
+        }, index=index)
+
+        # Facility lookups are shared between students in the same city
+        if include_facilities and 'state' in students and 'city' in students:
+            facilities_by_location = {}
+            location_facilities = []
+            for state, city in zip(students['state'], students['city']):
+                key = (state, city)
+                if key not in facilities_by_location:
+                    facilities_by_location[key] = self.location_recommendations.get_nearby_facilities(state, city)
+                location_facilities.append(facilities_by_location[key])
+            result['location_based_facilities'] = location_facilities
+
+        self.metrics.observe('score_batch', time.perf_counter() - started)
+        self.metrics.increment('score_batch_rows', n_students)
+        return result
+
+    def _calculate_enhanced_stress_scores(
+        self,
+        probabilities: np.ndarray,
+        course_factors: np.ndarray,
+        emotion_scores: np.ndarray,
+        trigger_scores: np.ndarray,
+        trauma_detected: np.ndarray
+    ) -> np.ndarray:
+        """Vectorized form of _calculate_enhanced_stress_score"""
+        final_scores = (
+            0.70 * _ml_stress_scores(probabilities) +
+            0.10 * course_factors +
+            0.10 * emotion_scores +
+            0.10 * trigger_scores
+        )
+        return np.where(trauma_detected, np.minimum(1.0, final_scores + 0.1), final_scores)
+
+    def _determine_stress_levels(self, scores: np.ndarray) -> np.ndarray:
+        """Vectorized form of _determine_stress_level"""
+        levels = np.array(['Fabulous', 'Good', 'Bad', 'Awful'], dtype=object)
+        scores = np.asarray(scores, dtype=float)
+        indices = np.searchsorted([0.4, 0.6, 0.8], scores, side='right')
+        # searchsorted orders NaN above every threshold; the scalar comparisons all fail instead
+        indices[np.isnan(scores)] = 0
+        return levels[indices]
+
     def _determine_stress_level(self, score: float) -> str:
         """Determine stress level based on enhanced score"""
         if score >= 0.8:
@@ -455,7 +1028,7 @@ class PersonalizedRecommendationEngine:
             if 'friend' in context_lower or 'social' in context_lower:
                 solutions.append('Nurture existing friendships and consider joining social activities')
         
-        return list(set(solutions))  # Remove duplicates
+        return list(dict.fromkeys(solutions))  # Remove duplicates, keeping order
     
     def _get_immediate_actions(self, stress_level: str, emotional_analysis: Dict) -> List[str]:
         """Get immediate actions based on stress level and emotional state"""
@@ -0,0 +1,416 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from types import MappingProxyType
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from inference import StressPredictor
+from metrics import METRICS, PeriodicSummaryLogger
+from recommendation_engine import PersonalizedRecommendationEngine
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ARTIFACT_DIR = os.path.join(BASE_DIR, 'models')
+DEFAULT_PACKAGE_PATH = os.path.join(BASE_DIR, 'stress_prediction_models.pkl')
+
+FORM_FIELDS = ('mark10th', 'mark12th', 'collegemark', 'gender', 'height', 'weight', 'financial', 'course', 'salexpect')
+MAX_BODY_BYTES = 64 * 1024
+# Text inputs of the recommendation engine with the form's defaults (course is required)
+TEXT_FIELDS = {'course': None, 'emotion': 'Neutral', 'context_text': '', 'state': '', 'city': ''}
+
+HTTP_REASONS = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    500: 'Internal Server Error'
+}
+
+class RequestError(Exception):
+    """Client error that maps to an HTTP status"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+class MicroBatcher:
+    """Groups concurrent single-row predictions into one vectorized call"""
+
+    def __init__(self, predict_batch: Callable, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = None
+        self.worker = None
+        self.batches = 0
+        self.rows = 0
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self.worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, features: List[float], predict_batch: Optional[Callable] = None) -> List[float]:
+        """Queue one feature row and wait for its class probabilities
+
+        ``predict_batch`` replaces the batcher's function for this row; rows are only
+        batched together with rows that use the same function.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((features, predict_batch or self.predict_batch, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            groups = {}
+            for row, predict_batch, future in batch:
+                groups.setdefault(predict_batch, []).append((row, future))
+            for predict_batch, group in groups.items():
+                features = np.asarray([row for row, _ in group], dtype=float)
+                try:
+                    # Inference runs off the event loop so new requests keep queueing
+                    probabilities = await loop.run_in_executor(None, predict_batch, features)
+                except Exception as e:
+                    for _, future in group:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+
+                self.batches += 1
+                self.rows += len(group)
+                for (_, future), row in zip(group, probabilities):
+                    if not future.done():
+                        future.set_result(row.tolist())
+
+    def stats(self) -> Dict:
+        return {
+            'batches': self.batches,
+            'rows': self.rows,
+            'mean_batch_size': self.rows / self.batches if self.batches else 0.0,
+            'queued': self.queue.qsize() if self.queue is not None else 0,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000
+        }
+
+class ScoringService:
+    """JSON scoring endpoint: model inference plus personalized recommendations"""
+
+    def __init__(
+        self,
+        predictor: StressPredictor,
+        engine: PersonalizedRecommendationEngine,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        history=None
+    ):
+        self.predictor = predictor
+        self.engine = engine
+        # Optional HistoryStore: assessments with a student_id are recorded for trend tracking
+        self.history = history
+        self.batcher = MicroBatcher(predictor.predict_proba_batch, max_batch_size, max_wait_ms)
+        self.started_at = time.time()
+
+    async def score(self, payload: Dict) -> Dict:
+        """Score one assessment (the same inputs as the Streamlit form)"""
+        missing = [field for field in FORM_FIELDS if field not in payload]
+        if missing:
+            raise RequestError(400, f"Missing fields: {', '.join(missing)}")
+        # list() of a string would silently split it into characters
+        trigger_events = payload.get('trigger_events', [])
+        if not isinstance(trigger_events, list) or not all(isinstance(event, str) for event in trigger_events):
+            raise RequestError(400, 'trigger_events must be a list of strings')
+        text = {field: payload.get(field, default) for field, default in TEXT_FIELDS.items()}
+        for field, value in text.items():
+            if not isinstance(value, str):
+                raise RequestError(400, f'{field} must be a string')
+        # A hot-swapping predictor is pinned so features and probabilities come from one version
+        pin = getattr(self.predictor, 'pin', None)
+        predictor = pin() if pin is not None else self.predictor
+        try:
+            features = predictor.build_features(**{field: payload[field] for field in FORM_FIELDS})
+        except (TypeError, ValueError) as e:
+            raise RequestError(400, f'Invalid form values: {e}')
+
+        probabilities = await self.batcher.submit(features, predictor.predict_proba_batch)
+        prediction = predictor.class_names[int(np.argmax(probabilities))]
+
+        recommendations = await asyncio.get_running_loop().run_in_executor(
+            None,
+            lambda: self.engine.generate_comprehensive_recommendations(
+                ml_prediction=prediction,
+                ml_probabilities=probabilities,
+                course=text['course'],
+                emotion=text['emotion'],
+                trigger_events=list(trigger_events),
+                context_text=text['context_text'],
+                state=text['state'],
+                city=text['city'],
+                user_profile={}
+            )
+        )
+
+        student_id = payload.get('student_id')
+        if self.history is not None and student_id is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                None,
+                lambda: self.history.record(
+                    str(student_id),
+                    recommendations['stress_score_breakdown']['final_score'],
+                    recommendations['enhanced_stress_level'],
+                    emotion=text['emotion'],
+                    trigger_events=list(trigger_events)
+                )
+            )
+        return {
+            'ml_prediction': prediction,
+            'ml_probabilities': probabilities,
+            'recommendations': recommendations
+        }
+
+    def stats(self) -> Dict:
+        stats = {
+            'uptime_seconds': time.time() - self.started_at,
+            'batching': self.batcher.stats()
+        }
+        if self.engine.cache is not None:
+            stats['recommendation_cache'] = self.engine.cache.stats()
+        if isinstance(getattr(self.predictor, 'weights', None), dict):
+            stats['ensemble'] = {
+                'weights': self.predictor.weights,
+                'member_latency': self.predictor.latency_estimates()
+            }
+        if METRICS.enabled:
+            stats['stage_latency'] = METRICS.summary()
+        return stats
+
+    async def dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Union[Dict, str]]:
+        if path == '/health':
+            return 200, {'status': 'ok'}
+        if path == '/stats':
+            return 200, self.stats()
+        if path == '/metrics':
+            # Prometheus scrapes plain text rather than JSON
+            return 200, METRICS.render_prometheus()
+        if path not in ('/score', '/trends'):
+            raise RequestError(404, f'Unknown path: {path}')
+        if method != 'POST':
+            raise RequestError(405, f'Use POST for {path}')
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            raise RequestError(400, 'Request body is not valid JSON')
+        if not isinstance(payload, dict):
+            raise RequestError(400, 'Request body must be a JSON object')
+        if path == '/trends':
+            return 200, await self.trends(payload)
+        return 200, await self.score(payload)
+
+    async def trends(self, payload: Dict) -> Dict:
+        """Stress trends for the listed student_ids (all students when omitted)"""
+        if self.history is None:
+            raise RequestError(404, 'Assessment history is not enabled (start with --history-db)')
+        student_ids = payload.get('student_ids')
+        if student_ids is not None and not isinstance(student_ids, list):
+            raise RequestError(400, 'student_ids must be a list')
+        trends = await asyncio.get_running_loop().run_in_executor(None, self.history.trends, student_ids)
+        return {'trends': trends}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Minimal HTTP/1.1 handling with keep-alive"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, 400, {'error': 'Malformed request line'}, keep_alive=False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    await self._respond(writer, 400, {'error': 'Invalid Content-Length'}, keep_alive=False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {'error': 'Request body too large'}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                try:
+                    status, response = await self.dispatch(method.upper(), target.split('?', 1)[0], body)
+                except RequestError as e:
+                    status, response = e.status, {'error': str(e)}
+                except Exception as e:
+                    status, response = 500, {'error': f'Scoring failed: {e}'}
+                await self._respond(writer, status, response, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ValueError:
+            # A request or header line over the stream limit (asyncio's LimitOverrunError)
+            try:
+                await self._respond(writer, 400, {'error': 'Request line or header too long'}, keep_alive=False)
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: Union[Dict, str], keep_alive: bool):
+        if isinstance(payload, str):
+            body = payload.encode('utf-8')
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            body = json.dumps(payload, default=_json_default).encode('utf-8')
+            content_type = 'application/json'
+        head = (
+            f'HTTP/1.1 {status} {HTTP_REASONS.get(status, "")}\r\n'
+            f'Content-Type: {content_type}\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'
+        )
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8600):
+        self.batcher.start()
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f'Scoring service listening on http://{host}:{port} (POST /score)')
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.stop()
+
+def _json_default(value):
+    # Facility records are shared read-only mappings
+    if isinstance(value, MappingProxyType):
+        return dict(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+def load_predictor(
+    artifact_dir: str = DEFAULT_ARTIFACT_DIR,
+    package_path: str = DEFAULT_PACKAGE_PATH,
+    ensemble: bool = False,
+    latency_budget_ms: Optional[float] = None
+) -> StressPredictor:
+    """Predictor from split artifacts when present, otherwise from the joblib package
+
+    With ``ensemble`` the stored models are combined by soft voting (see ensemble.py).
+    """
+    from model_artifacts import MANIFEST_NAME, ModelArtifacts
+
+    if os.path.exists(os.path.join(artifact_dir, MANIFEST_NAME)):
+        artifacts = ModelArtifacts(artifact_dir)
+        if ensemble:
+            from ensemble import EnsemblePredictor
+            predictor = EnsemblePredictor.from_artifacts(artifacts, latency_budget_ms=latency_budget_ms)
+            # Load every member now, so the first requests do not blow the latency budget
+            predictor.warm()
+            return predictor
+        return StressPredictor.from_artifacts(artifacts)
+
+    import joblib
+    if ensemble:
+        from ensemble import EnsemblePredictor
+        return EnsemblePredictor.from_package(joblib.load(package_path), latency_budget_ms=latency_budget_ms)
+    return StressPredictor.from_package(joblib.load(package_path))
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve stress predictions and recommendations over HTTP')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--max-batch-size', type=int, default=32, help='largest group of requests per predict_proba call')
+    parser.add_argument('--max-wait-ms', type=float, default=5.0, help='how long the first request in a batch waits for others')
+    parser.add_argument('--cache-size', type=int, default=4096, help='recommendation cache entries (0 disables)')
+    parser.add_argument('--artifacts', default=DEFAULT_ARTIFACT_DIR, help='split model artifact directory')
+    parser.add_argument('--ensemble', action='store_true', help='serve the soft-voting ensemble of all stored models')
+    parser.add_argument('--latency-budget-ms', type=float, default=None, help='ensemble members expected to miss this budget are skipped')
+    parser.add_argument('--online-snapshots', default=None, help='serve the online model from this snapshot directory, hot-swapping new versions')
+    parser.add_argument('--snapshot-poll-seconds', type=float, default=5.0, help='how often to check for a new online model snapshot')
+    parser.add_argument('--history-db', default=None, help='SQLite file recording assessments that carry a student_id (served at /trends)')
+    parser.add_argument('--metrics', action='store_true', help='record per-stage latency (served at /metrics)')
+    parser.add_argument('--metrics-log-interval', type=float, default=60.0, help='seconds between latency summaries in the log (0 disables)')
+    args = parser.parse_args()
+
+    summary_logger = None
+    if args.metrics:
+        METRICS.enable()
+        if args.metrics_log_interval > 0:
+            logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(message)s')
+            summary_logger = PeriodicSummaryLogger(METRICS, args.metrics_log_interval)
+            summary_logger.start()
+
+    snapshot_watcher = None
+    if args.online_snapshots:
+        from online_learning import HotSwapPredictor, SnapshotStore
+        predictor = snapshot_watcher = HotSwapPredictor(SnapshotStore(args.online_snapshots), args.snapshot_poll_seconds)
+        snapshot_watcher.start()
+    else:
+        predictor = load_predictor(args.artifacts, ensemble=args.ensemble, latency_budget_ms=args.latency_budget_ms)
+
+    history = None
+    if args.history_db:
+        from history_store import HistoryStore
+        history = HistoryStore(args.history_db)
+
+    service = ScoringService(
+        predictor,
+        PersonalizedRecommendationEngine(cache_size=args.cache_size, cache_ttl_seconds=3600),
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+        history=history
+    )
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if snapshot_watcher is not None:
+            snapshot_watcher.stop()
+        if history is not None:
+            history.close()
+        if summary_logger is not None:
+            summary_logger.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+import argparse
+import ast
+import importlib
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+from typing import Dict, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# The committed baseline; runs write elsewhere unless asked to replace it
+DEFAULT_PROFILE = os.path.join(BASE_DIR, 'import_profile.json')
+DEFAULT_OUTPUT = os.path.join(BASE_DIR, '.cache', 'import_profile.json')
+
+# Heavy modules kept off the first-paint path and imported once the page is up
+DEFERRED_IMPORTS = ('pandas', 'joblib')
+
+# Scripts whose module-level imports are profiled; they run before anything is served
+ENTRY_POINTS = ('streamlit_app.py', 'scoring_service.py')
+
+_warm_lock = threading.Lock()
+_warm_thread = None
+
+def warm_imports(modules: Sequence[str] = DEFERRED_IMPORTS) -> threading.Thread:
+    """Import ``modules`` on a daemon thread, once per process
+
+    A later ``import`` in a request blocks on the module lock until the warm-up
+    finishes instead of importing twice, so callers never see a partial module.
+    """
+    global _warm_thread
+    with _warm_lock:
+        if _warm_thread is None:
+            _warm_thread = threading.Thread(target=_import_all, args=(tuple(modules),), name='import-warmer', daemon=True)
+            _warm_thread.start()
+        return _warm_thread
+
+def _import_all(modules: Sequence[str]):
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            logger.exception('Could not pre-import %s', name)
+
+def entry_imports(path: str) -> str:
+    """Source of the module-level import statements of a script, without running the rest"""
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        tree = ast.parse(f.read(), path)
+    statements = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return '\n'.join(ast.unparse(node) for node in statements)
+
+def _parse_importtime(stderr: str) -> Dict[str, int]:
+    """Cumulative microseconds per top-level import from ``python -X importtime`` output"""
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or line.endswith('imported package'):
+            continue
+        _, total_us, name = line[len('import time:'):].split('|')
+        # Nested imports are indented under the import that triggered them
+        if not name.startswith('  '):
+            cumulative[name.strip()] = int(total_us)
+    return cumulative
+
+def profile_entry(path: str, repeats: int = 5) -> Dict:
+    """Median import cost of a script's module-level imports over fresh interpreters"""
+    code = entry_imports(path)
+    runs = []
+    for _ in range(repeats):
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            cwd=os.path.dirname(os.path.abspath(path)), capture_output=True, text=True, check=True
+        )
+        runs.append(_parse_importtime(completed.stderr))
+    modules = {}
+    for name in runs[0]:
+        modules[name] = statistics.median(run.get(name, 0) for run in runs) / 1000
+    return {
+        'total_ms': round(statistics.median(sum(run.values()) for run in runs) / 1000, 1),
+        'modules': {name: round(ms, 1) for name, ms in sorted(modules.items(), key=lambda item: -item[1])}
+    }
+
+def profile_imports(entries: Sequence[str] = ENTRY_POINTS, repeats: int = 5, top: int = 15) -> Dict:
+    """Import-time profile of every entry point, keeping the ``top`` heaviest imports of each"""
+    profiles = {}
+    for entry in entries:
+        profile = profile_entry(os.path.join(BASE_DIR, entry), repeats)
+        profile['modules'] = dict(list(profile['modules'].items())[:top])
+        profiles[entry] = profile
+    return {
+        'metadata': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeats': repeats,
+        },
+        'entries': profiles
+    }
+
+def compare_profiles(current: Dict, baseline: Dict, threshold: float = 0.25, new_module_ms: float = 20.0) -> List[Dict]:
+    """Per-entry change in total import time, plus heavy imports that are new since the baseline"""
+    comparison = []
+    for entry, profile in current['entries'].items():
+        previous = baseline['entries'].get(entry)
+        if previous is None:
+            continue
+        change = profile['total_ms'] / previous['total_ms'] - 1 if previous['total_ms'] else 0.0
+        added = [name for name, ms in profile['modules'].items() if ms >= new_module_ms and name not in previous['modules']]
+        comparison.append({
+            'entry': entry,
+            'total_change': change,
+            'added_modules': added,
+            'regression': change > threshold or bool(added)
+        })
+    return comparison
+
+def main():
+    parser = argparse.ArgumentParser(description='Profile the import time of the app entry points')
+    parser.add_argument('--entries', nargs='+', default=list(ENTRY_POINTS))
+    parser.add_argument('--repeats', type=int, default=5, help='fresh interpreters per entry point')
+    parser.add_argument('--top', type=int, default=15, help='heaviest imports kept per entry point')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help=f'where to write the profile JSON (pass {os.path.basename(DEFAULT_PROFILE)} to update the baseline)')
+    parser.add_argument('--compare', help=f'baseline profile JSON to compare against, e.g. {os.path.basename(DEFAULT_PROFILE)}')
+    parser.add_argument('--threshold', type=float, default=0.25, help='relative slowdown flagged as a regression')
+    parser.add_argument('--fail-on-regression', action='store_true', help='exit with status 1 when a regression is flagged')
+    args = parser.parse_args()
+    if args.compare and os.path.abspath(args.compare) == os.path.abspath(args.output):
+        # Writing over the baseline would make every regression the new baseline
+        parser.error('--output must differ from --compare')
+
+    document = profile_imports(args.entries, args.repeats, args.top)
+    for entry, profile in document['entries'].items():
+        print(f"{entry}: {profile['total_ms']:.1f} ms")
+        for name, ms in list(profile['modules'].items())[:5]:
+            print(f'  {name:<40} {ms:>8.1f} ms')
+
+    regressions = 0
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        comparison = compare_profiles(document, baseline, args.threshold)
+        print()
+        for row in comparison:
+            flag = '  REGRESSION' if row['regression'] else ''
+            added = f" (new: {', '.join(row['added_modules'])})" if row['added_modules'] else ''
+            print(f"{row['entry']:<40} {row['total_change']:>+9.1%}{added}{flag}")
+        regressions = sum(row['regression'] for row in comparison)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(document, f, indent=2)
+    print(f'Profile written to {args.output}')
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,27 @@
 ﻿import streamlit as st
-import pandas as pd
-import numpy as np
-import joblib
-from sklearn.preprocessing import StandardScaler, MinMaxScaler
-import datetime
-import json
+import os
+from data_registry import DATA_REGISTRY
 from recommendation_engine import PersonalizedRecommendationEngine
+from inference import StressPredictor
+from explanations import FEATURE_LABELS, explain_prediction
+from model_artifacts import DEFAULT_ARTIFACT_DIR, DEFAULT_PACKAGE_PATH, MANIFEST_NAME, ModelArtifacts
+from startup import warm_imports
+
+# pandas and joblib are imported where they are used, so the form renders without
+# paying for them; warm_imports() at the end of the script loads them in the background
+
+MODEL_ARTIFACT_DIR = DEFAULT_ARTIFACT_DIR
 
 # Load the trained model and mappings
 @st.cache_resource
 def load_model():
     try:
-        model = joblib.load('stress_prediction_models.pkl')
+        # Split artifacts load only the served model, on first use
+        if os.path.exists(os.path.join(MODEL_ARTIFACT_DIR, MANIFEST_NAME)):
+            model = ModelArtifacts(MODEL_ARTIFACT_DIR)
+        else:
+            import joblib
+            model = joblib.load(DEFAULT_PACKAGE_PATH)
         st.success('Model loaded successfully!')
         return model
     except Exception as e:
@@ -19,11 +29,22 @@ def load_model():
         return None
 
 @st.cache_resource
+def load_predictor(_model_data):
+    """Build the inference wrapper around the package's best model"""
+    if _model_data is None:
+        return None
+    try:
+        if isinstance(_model_data, ModelArtifacts):
+            return StressPredictor.from_artifacts(_model_data)
+        return StressPredictor.from_package(_model_data)
+    except Exception as e:
+        st.error(f'Could not prepare model for inference: {e}')
+        return None
+
 def load_location_data():
-    """Load state and city data"""
+    """State and city data from the shared registry, which picks up edits without a restart"""
     try:
-        with open('state_city_data.json', 'r') as f:
-            return json.load(f)
+        return DATA_REGISTRY.get().state_cities
     except Exception as e:
         st.error(f'Could not load location data: {e}')
         return {}
@@ -32,11 +53,28 @@ def load_location_data():
 def initialize_recommendation_engine():
     """Initialize the recommendation engine"""
     try:
-        return PersonalizedRecommendationEngine()
+        return PersonalizedRecommendationEngine(cache_size=1024, cache_ttl_seconds=3600)
     except Exception as e:
         st.error(f'Could not initialize recommendation engine: {e}')
         return None
 
+@st.cache_resource
+def load_worker_pool(_predictor, _engine):
+    """Optional worker processes for scoring, enabled with STUDENT_STRESS_WORKERS=<count>
+
+    The in-process predictor and engine stay as the fallback for a full queue,
+    a timeout or a crashed worker.
+    """
+    workers = int(os.environ.get('STUDENT_STRESS_WORKERS', '0') or 0)
+    if workers <= 0 or _predictor is None:
+        return None
+    try:
+        from worker_pool import AssessmentPool
+        return AssessmentPool(workers, MODEL_ARTIFACT_DIR, fallback_predictor=_predictor, fallback_engine=_engine)
+    except Exception as e:
+        st.error(f'Could not start scoring workers, scoring in-process instead: {e}')
+        return None
+
 def get_psychological_risks_and_actions(stress_level):
     """Get psychological risks and recommended actions based on stress level"""
     
@@ -163,23 +201,418 @@ def predict_stress_level(mark10th, mark12th, collegemark, carrer_willing, smtime
     else:
         return 'Fabulous', [0.6, 0.3, 0.1, 0.0]
 
+def get_ml_prediction(predictor, mark10th, mark12th, collegemark, carrer_willing, smtime, financial,
+                      gender, height, weight, professional_course, salexpect):
+    """Model prediction when the trained model is available, rule-based otherwise"""
+    if predictor is not None:
+        return predictor.predict(
+            mark10th=mark10th,
+            mark12th=mark12th,
+            collegemark=collegemark,
+            gender=gender,
+            height=height,
+            weight=weight,
+            financial=financial,
+            course=professional_course,
+            salexpect=salexpect
+        )
+    return predict_stress_level(mark10th, mark12th, collegemark, carrer_willing, smtime, financial)
+
+# Widget keys of the inputs that feed an assessment, in a fixed order
+FORM_KEYS = (
+    'mark10th', 'mark12th', 'collegemark', 'professional_course', 'gender', 'height', 'weight',
+    'studytime', 'smtime', 'travel', 'salexpect', 'carrer_willing', 'financial',
+    'current_emotion', 'trigger_events', 'context_description'
+)
+
+# Assessments kept per server process, shared by every session
+ASSESSMENT_CACHE_SIZE = 512
+
+# st.fragment is the stable name from Streamlit 1.37; older releases only have the experimental one
+fragment = getattr(st, 'fragment', None) or st.experimental_fragment
+
+def normalized_inputs(state) -> tuple:
+    """Hashable form inputs; surrounding whitespace in the context text is not a change"""
+    values = []
+    for key in FORM_KEYS:
+        value = state[key]
+        if isinstance(value, str):
+            value = value.strip()
+        elif isinstance(value, list):
+            value = tuple(value)
+        values.append(value)
+    return tuple(values)
+
+@st.cache_resource(max_entries=ASSESSMENT_CACHE_SIZE, ttl=3600, show_spinner=False)
+def assess(_predictor, _engine, _pool, inputs: tuple, location: tuple, data_version: str):
+    """Prediction, recommendations and chart data for one input tuple
+
+    Memoized across sessions, so the result is shared and must be treated as read-only.
+    ``data_version`` is only part of the key, so a data update is not served stale.
+    With a worker pool the scoring runs in another process, off this session's GIL.
+    """
+    form = dict(zip(FORM_KEYS, inputs))
+    user_profile = {
+        'academic_performance': (form['mark10th'] + form['mark12th'] + form['collegemark']) / 3,
+        'study_time': form['studytime'],
+        'social_media_time': form['smtime'],
+        'career_willingness': form['carrer_willing'],
+        'financial_status': form['financial'],
+        'gender': form['gender'],
+        'travel_time': form['travel']
+    }
+    recommendation_inputs = None
+    if _engine is not None:
+        recommendation_inputs = {
+            'course': form['professional_course'],
+            'emotion': form['current_emotion'],
+            'trigger_events': list(form['trigger_events']),
+            'context_text': form['context_description'],
+            'state': location[0],
+            'city': location[1],
+            'user_profile': user_profile
+        }
+
+    # StressPredictor.predict's keyword arguments
+    model_inputs = {
+        'mark10th': form['mark10th'],
+        'mark12th': form['mark12th'],
+        'collegemark': form['collegemark'],
+        'gender': form['gender'],
+        'height': form['height'],
+        'weight': form['weight'],
+        'financial': form['financial'],
+        'course': form['professional_course'],
+        'salexpect': form['salexpect']
+    }
+    if _pool is not None:
+        # The attributions are computed in the worker too, off this session's thread
+        predicted_level, probabilities, comprehensive_results, explanation = _pool.assess(
+            model_inputs, recommendation_inputs, explain=True
+        )
+    else:
+        predicted_level, probabilities = get_ml_prediction(
+            _predictor, form['mark10th'], form['mark12th'], form['collegemark'], form['carrer_willing'],
+            form['smtime'], form['financial'], form['gender'], form['height'], form['weight'],
+            form['professional_course'], form['salexpect']
+        )
+        comprehensive_results = None
+        if recommendation_inputs is not None:
+            comprehensive_results = _engine.generate_comprehensive_recommendations(
+                ml_prediction=predicted_level, ml_probabilities=probabilities, **recommendation_inputs
+            )
+        # Memoized with the rest; an over-budget explanation is simply left out
+        explanation = explain_prediction(_predictor, model_inputs, predicted_level) if _predictor is not None else None
+
+    import pandas as pd
+    chart = pd.DataFrame({
+        'Stress Level': ['Fabulous', 'Good', 'Bad', 'Awful'],
+        'Probability': probabilities
+    }).set_index('Stress Level')
+
+    return {
+        'inputs': inputs,
+        'predicted_level': predicted_level,
+        'probabilities': probabilities,
+        'chart': chart,
+        'user_profile': user_profile,
+        'explanation': explanation,
+        'results': comprehensive_results
+    }
+
+@st.cache_resource(max_entries=ASSESSMENT_CACHE_SIZE, show_spinner=False)
+def nearby_facilities(_engine, state: str, city: str, data_version: str):
+    """Facility listing for one location, memoized across sessions"""
+    return _engine.location_recommendations.get_nearby_facilities(state, city)
+
+def run_assessment(predictor, engine, pool):
+    """Predict button callback
+
+    Runs before the rerun, so the location fragment drawn above the button already sees the result.
+    """
+    state = st.session_state
+    state['assessment'] = assess(
+        predictor, engine, pool, normalized_inputs(state),
+        (state['selected_state'], state['selected_city']), DATA_REGISTRY.get().digest
+    )
+
+def current_assessment():
+    """The last assessment, while the form still holds the inputs it was made from"""
+    assessment = st.session_state.get('assessment')
+    if assessment is not None and assessment['inputs'] == normalized_inputs(st.session_state):
+        return assessment
+    return None
+
+def render_facilities(location_facilities, selected_state, selected_city):
+    """Crisis helplines and local facilities for the selected location"""
+    st.markdown('---')
+    st.header(f'🏥 Mental Health Resources in {selected_city}, {selected_state}')
+
+    # Show fallback note if present
+    if 'fallback_note' in location_facilities:
+        st.info(f"ℹ️ **Note**: {location_facilities['fallback_note']}")
+
+    # Emergency Numbers
+    st.subheader('🚨 Emergency Crisis Helplines (24/7)')
+    emergency_numbers = location_facilities.get('emergency_numbers', [])
+    for emergency in emergency_numbers:
+        st.error(f"📞 **{emergency['name']}**: {emergency['number']} - {emergency['description']}")
+
+    # Local Facilities
+    facility_col1, facility_col2, facility_col3 = st.columns(3)
+
+    with facility_col1:
+        st.subheader('🏥 Hospitals')
+        hospitals = location_facilities.get('hospitals', [])
+        if hospitals:
+            for hospital in hospitals[:3]:  # Show first 3
+                with st.expander(f"{hospital['name']} ({hospital['type']})"):
+                    st.write(f"📍 {hospital['address']}")
+                    st.write(f"📞 {hospital['phone']}")
+                    st.write(f"🏥 Services: {', '.join(hospital['services'])}")
+                    if hospital.get('emergency'):
+                        st.write("🚨 Emergency services available")
+        else:
+            st.info(f'No hospital data available for {selected_city}. Please check the state capital or nearby major cities.')
+
+    with facility_col2:
+        st.subheader('🧠 Counseling Centers')
+        counseling_centers = location_facilities.get('counseling_centers', [])
+        if counseling_centers:
+            for center in counseling_centers:
+                with st.expander(f"{center['name']}"):
+                    st.write(f"📍 {center['address']}")
+                    st.write(f"📞 {center['phone']}")
+                    st.write(f"💰 Cost: {center['cost']}")
+                    st.write(f"🛠️ Services: {', '.join(center['services'])}")
+        else:
+            st.info('Contact nearby cities for counseling center information.')
+
+    with facility_col3:
+        st.subheader('🤝 Support Groups')
+        support_groups = location_facilities.get('support_groups', [])
+        if support_groups:
+            for group in support_groups:
+                with st.expander(f"{group['name']}"):
+                    st.write(f"📧 Contact: {group['contact']}")
+                    st.write(f"📅 Meeting: {group['meeting']}")
+        else:
+            st.info('Check online for virtual support groups or local community centers.')
+
+@fragment
+def location_panel():
+    """Location selectors and facility listings; a location change reruns only this panel"""
+    location_data = load_location_data()
+    st.subheader('📍 Your Location (for local mental health resources)')
+    loc_col1, loc_col2 = st.columns(2)
+
+    with loc_col1:
+        states = list(location_data.keys()) if location_data else ['Karnataka', 'Maharashtra', 'Tamil Nadu', 'Delhi']
+        selected_state = st.selectbox('Select your state:', states, key='selected_state')
+
+    with loc_col2:
+        cities = location_data.get(selected_state, ['Bangalore', 'Mumbai', 'Chennai', 'New Delhi'])
+        selected_city = st.selectbox('Select your city:', cities, key='selected_city')
+
+    if recommendation_engine is not None and current_assessment() is not None:
+        location_facilities = nearby_facilities(
+            recommendation_engine, selected_state, selected_city, DATA_REGISTRY.get().digest
+        )
+        render_facilities(location_facilities, selected_state, selected_city)
+
+def render_explanation(explanation, top: int = 5):
+    """The model inputs that moved the prediction most, from the served model's attributions"""
+    if explanation is None:
+        return
+    st.write(f"**Why the model predicted {explanation['class_name']}:**")
+    for feature, value in explanation['contributions'][:top]:
+        label = FEATURE_LABELS.get(feature, feature)
+        direction = 'raised' if value > 0 else 'lowered'
+        if explanation['output'] == 'probability':
+            st.write(f'• {label} {direction} its probability by {abs(value)*100:.1f} points')
+        else:
+            st.write(f'• {label} {direction} its score by {abs(value):.2f} log-odds')
+
+def render_assessment(assessment):
+    """Prediction, recommendation and resource panels for a memoized assessment"""
+    probabilities = assessment['probabilities']
+    comprehensive_results = assessment['results']
+    if comprehensive_results is None:
+        st.error('Recommendation engine not available. Using basic prediction.')
+
+        # Display basic results
+        st.success('✅ Basic Prediction Completed!')
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric('🎯 Predicted Stress Level', assessment['predicted_level'])
+        with col2:
+            confidence = max(probabilities) * 100
+            st.metric('🎚️ Confidence', f'{confidence:.1f}%')
+        return
+
+    # Display enhanced results
+    st.success('✅ Enhanced Analysis Completed!')
+
+    # Main metrics
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric('🎯 Original ML Prediction', comprehensive_results['original_ml_prediction'])
+    with col2:
+        st.metric('🔬 Enhanced Stress Level', comprehensive_results['enhanced_stress_level'])
+    with col3:
+        confidence = max(probabilities) * 100
+        st.metric('🎚️ Confidence', f'{confidence:.1f}%')
+
+    # Enhanced profile summary
+    form = dict(zip(FORM_KEYS, assessment['inputs']))
+    academic_avg = assessment['user_profile']['academic_performance']
+    st.info(f"📊 **Enhanced Profile**: Course: {form['professional_course']} | Academic: {academic_avg:.1f}% | Emotion: {form['current_emotion']} | Career: {form['carrer_willing']}% | Financial: {form['financial']}")
+
+    # Stress score breakdown
+    st.subheader('📊 Enhanced Stress Score Breakdown')
+    breakdown = comprehensive_results['stress_score_breakdown']
+
+    breakdown_col1, breakdown_col2 = st.columns(2)
+    with breakdown_col1:
+        st.write('**Factor Contributions:**')
+        st.write(f'• ML Model Prediction: {breakdown["ml_model_contribution"]*100:.0f}%')
+        st.write(f'• Professional Course Factor: {breakdown["course_factor_contribution"]*100:.0f}%')
+        st.write(f'• Emotional State: {breakdown["emotional_state_contribution"]*100:.0f}%')
+        st.write(f'• Trigger Events: {breakdown["trigger_events_contribution"]*100:.0f}%')
+        render_explanation(assessment['explanation'])
+
+    with breakdown_col2:
+        st.metric('🎯 Final Enhanced Score', f'{breakdown["final_score"]:.2f}')
+        # Show probability chart
+        st.bar_chart(assessment['chart'])
+
+    # Emotional Analysis Results
+    emotional_analysis = comprehensive_results['emotional_analysis']
+    if emotional_analysis['trauma_detected']:
+        st.warning('⚠️ **Trauma indicators detected in your description.** Specialized support recommendations have been included.')
+
+    # Display status with appropriate color
+    enhanced_level = comprehensive_results['enhanced_stress_level']
+    if enhanced_level == 'Fabulous':
+        st.success(f'🌟 Enhanced Assessment: {enhanced_level}')
+    elif enhanced_level == 'Good':
+        st.info(f'😊 Enhanced Assessment: {enhanced_level}')
+    elif enhanced_level == 'Bad':
+        st.warning(f'😰 Enhanced Assessment: {enhanced_level}')
+    else:
+        st.error(f'🚨 Enhanced Assessment: {enhanced_level}')
+
+    # Immediate Actions Section
+    st.markdown('---')
+    st.header('🚨 Immediate Actions Required')
+    immediate_actions = comprehensive_results['immediate_actions']
+    for action in immediate_actions:
+        st.markdown(f'• {action}')
+
+    # Personalized Solutions Section
+    st.markdown('---')
+    st.header('💡 Personalized Solutions')
+
+    solution_col1, solution_col2 = st.columns(2)
+
+    with solution_col1:
+        st.subheader('🎯 Customized Recommendations')
+        personalized_solutions = comprehensive_results['personalized_solutions']
+        for i, solution in enumerate(personalized_solutions[:len(personalized_solutions)//2 + 1]):
+            st.markdown(f'• {solution}')
+
+    with solution_col2:
+        st.subheader('📚 Course-Specific Strategies')
+        course_advice = comprehensive_results['course_specific_advice']
+        for advice in course_advice:
+            st.markdown(f'• {advice}')
+
+        if len(personalized_solutions) > len(personalized_solutions)//2 + 1:
+            st.subheader('🔄 Additional Recommendations')
+            for solution in personalized_solutions[len(personalized_solutions)//2 + 1:]:
+                st.markdown(f'• {solution}')
+
+    # Long-term Strategies
+    st.markdown('---')
+    st.header('📈 Long-term Mental Health Strategies')
+    long_term_strategies = comprehensive_results['long_term_strategies']
+
+    # Display in two columns
+    strategy_col1, strategy_col2 = st.columns(2)
+    mid_point = len(long_term_strategies) // 2
+
+    with strategy_col1:
+        for strategy in long_term_strategies[:mid_point]:
+            st.markdown(f'• {strategy}')
+
+    with strategy_col2:
+        for strategy in long_term_strategies[mid_point:]:
+            st.markdown(f'• {strategy}')
+
+    # Location-based facilities are drawn by location_panel, which reruns on its own
+
+    # Additional Resources
+    st.markdown('---')
+    st.header('📚 Additional Mental Health Resources')
+
+    resource_col1, resource_col2 = st.columns(2)
+
+    with resource_col1:
+        st.subheader('📱 Mobile Apps')
+        st.markdown("""
+        • **Headspace** - Meditation and mindfulness
+        • **Calm** - Sleep stories and relaxation
+        • **Sanvello** - Anxiety and mood tracking
+        • **Youper** - AI emotional health assistant
+        """)
+
+        st.subheader('🌐 Online Resources')
+        st.markdown("""
+        • **Mind.org.uk** - Mental health information
+        • **Psychology Today** - Find therapists
+        • **NAMI.org** - Mental health support
+        • **Crisis Text Line** - Text HOME to 741741
+        """)
+
+    with resource_col2:
+        st.subheader('📖 Self-Help Techniques')
+        st.markdown("""
+        • **Deep Breathing**: 4-7-8 technique
+        • **Progressive Muscle Relaxation**
+        • **Mindfulness Meditation**: 10 minutes daily
+        • **Journaling**: Reflect on thoughts and feelings
+        • **Exercise**: 30 minutes daily
+        """)
+
+        st.subheader('🎓 Student-Specific Resources')
+        st.markdown("""
+        • Campus counseling centers
+        • Student support services
+        • Academic advisors
+        • Peer support groups
+        • Mental health accommodations
+        """)
+
 # App title
 st.title('🎓 Enhanced Student Stress Level Predictor')
 st.markdown('### AI-Powered Mental Health Assessment with Personalized Recommendations')
 
 # Load model and data
 model_data = load_model()
+predictor = load_predictor(model_data)
 location_data = load_location_data()
 recommendation_engine = initialize_recommendation_engine()
+worker_pool = load_worker_pool(predictor, recommendation_engine)
+
 
 # Create three columns for input
 col1, col2, col3 = st.columns(3)
 
 with col1:
     st.subheader('📚 Academic Information')
-    mark10th = st.slider('10th Grade Marks (%)', 30, 100, 75)
-    mark12th = st.slider('12th Grade Marks (%)', 30, 100, 75)
-    collegemark = st.slider('College Marks (%)', 30, 100, 75)
+    mark10th = st.slider('10th Grade Marks (%)', 30, 100, 75, key='mark10th')
+    mark12th = st.slider('12th Grade Marks (%)', 30, 100, 75, key='mark12th')
+    collegemark = st.slider('College Marks (%)', 30, 100, 75, key='collegemark')
     
     # Professional Course Selection
     st.subheader('🎯 Professional Course')
@@ -187,23 +620,23 @@ with col1:
         'Engineering', 'Medical', 'Law', 'Commerce', 'Arts/Humanities', 
         'Science', 'MBA', 'Computer Science'
     ]
-    professional_course = st.selectbox('Select your professional course:', course_options)
+    professional_course = st.selectbox('Select your professional course:', course_options, key='professional_course')
     
     st.subheader('👤 Personal Information')
-    gender = st.selectbox('Gender', ['Male', 'Female'])
-    height = st.slider('Height (cm)', 140, 200, 170)
-    weight = st.slider('Weight (kg)', 30, 120, 65)
+    gender = st.selectbox('Gender', ['Male', 'Female'], key='gender')
+    height = st.slider('Height (cm)', 140, 200, 170, key='height')
+    weight = st.slider('Weight (kg)', 30, 120, 65, key='weight')
 
 with col2:
     st.subheader('🏃 Lifestyle & Career')
-    studytime = st.slider('Study Time (hours/day)', 0, 12, 6)
-    smtime = st.slider('Social Media Time (hours/day)', 0, 24, 3)
-    travel = st.slider('Travel Time (minutes)', 0, 180, 30)
+    studytime = st.slider('Study Time (hours/day)', 0, 12, 6, key='studytime')
+    smtime = st.slider('Social Media Time (hours/day)', 0, 24, 3, key='smtime')
+    travel = st.slider('Travel Time (minutes)', 0, 180, 30, key='travel')
     
     st.subheader('💰 Expectations & Status')
-    salexpect = st.number_input('Salary Expectation (₹)', 10000, 2000000, 50000)
-    carrer_willing = st.slider('Career Willingness (%)', 0, 100, 50)
-    financial = st.selectbox('Financial Status', ['Awful', 'Bad', 'Good', 'Fabulous'])
+    salexpect = st.number_input('Salary Expectation (₹)', 10000, 2000000, 50000, key='salexpect')
+    carrer_willing = st.slider('Career Willingness (%)', 0, 100, 50, key='carrer_willing')
+    financial = st.selectbox('Financial Status', ['Awful', 'Bad', 'Good', 'Fabulous'], key='financial')
 
 with col3:
     st.subheader('😊 Current Emotional State')
@@ -212,7 +645,7 @@ with col3:
         'Stressed', 'Very Stressed', 'Anxious', 'Depressed', 'Overwhelmed',
         'Panicked', 'Hopeless'
     ]
-    current_emotion = st.selectbox('How are you feeling right now?', emotion_options, index=3)
+    current_emotion = st.selectbox('How are you feeling right now?', emotion_options, index=3, key='current_emotion')
     
     st.subheader('⚡ Trigger Events')
     trigger_options = [
@@ -224,285 +657,43 @@ with col3:
     trigger_events = st.multiselect(
         'What events might have contributed to your current emotional state?',
         trigger_options,
-        default=['None/No specific trigger']
+        default=['None/No specific trigger'],
+        key='trigger_events'
     )
     
     st.subheader('📝 Additional Context')
     context_description = st.text_area(
         'Describe your current situation or any additional context:',
         placeholder='Optional: Share any additional details about your current emotional state, recent events, or concerns...',
-        height=100
+        height=100,
+        key='context_description'
     )
 
-# Location Section
-st.subheader('📍 Your Location (for local mental health resources)')
-loc_col1, loc_col2 = st.columns(2)
 
-with loc_col1:
-    states = list(location_data.keys()) if location_data else ['Karnataka', 'Maharashtra', 'Tamil Nadu', 'Delhi']
-    selected_state = st.selectbox('Select your state:', states)
+# Location selectors and facilities rerun on their own
+location_panel()
 
-with loc_col2:
-    cities = location_data.get(selected_state, ['Bangalore', 'Mumbai', 'Chennai', 'New Delhi'])
-    selected_city = st.selectbox('Select your city:', cities)
+# Predict button; the callback memoizes the assessment per normalized input tuple
+st.button(
+    '🔮 Predict Stress Level & Get Recommendations', type='primary',
+    on_click=run_assessment, args=(predictor, recommendation_engine, worker_pool)
+)
 
-# Predict button
-if st.button('🔮 Predict Stress Level & Get Recommendations', type='primary'):
-    if recommendation_engine is None:
-        st.error('Recommendation engine not available. Using basic prediction.')
-        # Fallback to original prediction method
-        predicted_level, probabilities = predict_stress_level(
-            mark10th, mark12th, collegemark, carrer_willing, smtime, financial
-        )
-        
-        # Display basic results
-        st.success('✅ Basic Prediction Completed!')
-        col1, col2 = st.columns(2)
-        with col1:
-            st.metric('🎯 Predicted Stress Level', predicted_level)
-        with col2:
-            confidence = max(probabilities) * 100
-            st.metric('🎚️ Confidence', f'{confidence:.1f}%')
-    else:
-        # Use enhanced prediction system
-        with st.spinner('🔄 Analyzing your profile and generating personalized recommendations...'):
-            # Get basic ML prediction first
-            predicted_level, probabilities = predict_stress_level(
-                mark10th, mark12th, collegemark, carrer_willing, smtime, financial
-            )
-            
-            # Create user profile
-            user_profile = {
-                'academic_performance': (mark10th + mark12th + collegemark) / 3,
-                'study_time': studytime,
-                'social_media_time': smtime,
-                'career_willingness': carrer_willing,
-                'financial_status': financial,
-                'gender': gender,
-                'travel_time': travel
-            }
-            
-            # Generate comprehensive recommendations
-            comprehensive_results = recommendation_engine.generate_comprehensive_recommendations(
-                ml_prediction=predicted_level,
-                ml_probabilities=probabilities,
-                course=professional_course,
-                emotion=current_emotion,
-                trigger_events=trigger_events,
-                context_text=context_description,
-                state=selected_state,
-                city=selected_city,
-                user_profile=user_profile
-            )
-            
-            # Display enhanced results
-            st.success('✅ Enhanced Analysis Completed!')
-            
-            # Main metrics
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric('🎯 Original ML Prediction', comprehensive_results['original_ml_prediction'])
-            with col2:
-                st.metric('🔬 Enhanced Stress Level', comprehensive_results['enhanced_stress_level'])
-            with col3:
-                confidence = max(probabilities) * 100
-                st.metric('🎚️ Confidence', f'{confidence:.1f}%')
-            
-            # Enhanced profile summary
-            academic_avg = user_profile['academic_performance']
-            st.info(f'📊 **Enhanced Profile**: Course: {professional_course} | Academic: {academic_avg:.1f}% | Emotion: {current_emotion} | Career: {carrer_willing}% | Financial: {financial}')
-            
-            # Stress score breakdown
-            st.subheader('📊 Enhanced Stress Score Breakdown')
-            breakdown = comprehensive_results['stress_score_breakdown']
-            
-            breakdown_col1, breakdown_col2 = st.columns(2)
-            with breakdown_col1:
-                st.write('**Factor Contributions:**')
-                st.write(f'• ML Model Prediction: {breakdown["ml_model_contribution"]*100:.0f}%')
-                st.write(f'• Professional Course Factor: {breakdown["course_factor_contribution"]*100:.0f}%')
-                st.write(f'• Emotional State: {breakdown["emotional_state_contribution"]*100:.0f}%')
-                st.write(f'• Trigger Events: {breakdown["trigger_events_contribution"]*100:.0f}%')
-            
-            with breakdown_col2:
-                st.metric('🎯 Final Enhanced Score', f'{breakdown["final_score"]:.2f}')
-                # Show probability chart
-                prob_df = pd.DataFrame({
-                    'Stress Level': ['Fabulous', 'Good', 'Bad', 'Awful'],
-                    'Probability': probabilities
-                })
-                st.bar_chart(prob_df.set_index('Stress Level'))
-            
-            # Emotional Analysis Results
-            emotional_analysis = comprehensive_results['emotional_analysis']
-            if emotional_analysis['trauma_detected']:
-                st.warning('⚠️ **Trauma indicators detected in your description.** Specialized support recommendations have been included.')
-            
-            # Display status with appropriate color
-            enhanced_level = comprehensive_results['enhanced_stress_level']
-            if enhanced_level == 'Fabulous':
-                st.success(f'🌟 Enhanced Assessment: {enhanced_level}')
-            elif enhanced_level == 'Good':
-                st.info(f'😊 Enhanced Assessment: {enhanced_level}')
-            elif enhanced_level == 'Bad':
-                st.warning(f'😰 Enhanced Assessment: {enhanced_level}')
-            else:
-                st.error(f'🚨 Enhanced Assessment: {enhanced_level}')
-            
-            # Immediate Actions Section
-            st.markdown('---')
-            st.header('🚨 Immediate Actions Required')
-            immediate_actions = comprehensive_results['immediate_actions']
-            for action in immediate_actions:
-                st.markdown(f'• {action}')
-            
-            # Personalized Solutions Section
-            st.markdown('---')
-            st.header('💡 Personalized Solutions')
-            
-            solution_col1, solution_col2 = st.columns(2)
-            
-            with solution_col1:
-                st.subheader('🎯 Customized Recommendations')
-                personalized_solutions = comprehensive_results['personalized_solutions']
-                for i, solution in enumerate(personalized_solutions[:len(personalized_solutions)//2 + 1]):
-                    st.markdown(f'• {solution}')
-            
-            with solution_col2:
-                st.subheader('📚 Course-Specific Strategies')
-                course_advice = comprehensive_results['course_specific_advice']
-                for advice in course_advice:
-                    st.markdown(f'• {advice}')
-                
-                if len(personalized_solutions) > len(personalized_solutions)//2 + 1:
-                    st.subheader('🔄 Additional Recommendations')
-                    for solution in personalized_solutions[len(personalized_solutions)//2 + 1:]:
-                        st.markdown(f'• {solution}')
-            
-            # Long-term Strategies
-            st.markdown('---')
-            st.header('📈 Long-term Mental Health Strategies')
-            long_term_strategies = comprehensive_results['long_term_strategies']
-            
-            # Display in two columns
-            strategy_col1, strategy_col2 = st.columns(2)
-            mid_point = len(long_term_strategies) // 2
-            
-            with strategy_col1:
-                for strategy in long_term_strategies[:mid_point]:
-                    st.markdown(f'• {strategy}')
-            
-            with strategy_col2:
-                for strategy in long_term_strategies[mid_point:]:
-                    st.markdown(f'• {strategy}')
-            
-            # Location-Based Mental Health Facilities
-            st.markdown('---')
-            st.header(f'🏥 Mental Health Resources in {selected_city}, {selected_state}')
-            
-            location_facilities = comprehensive_results['location_based_facilities']
-            
-            # Show fallback note if present
-            if 'fallback_note' in location_facilities:
-                st.info(f"ℹ️ **Note**: {location_facilities['fallback_note']}")
-            
-            # Emergency Numbers
-            st.subheader('🚨 Emergency Crisis Helplines (24/7)')
-            emergency_numbers = location_facilities.get('emergency_numbers', [])
-            for emergency in emergency_numbers:
-                st.error(f"📞 **{emergency['name']}**: {emergency['number']} - {emergency['description']}")
-            
-            # Local Facilities
-            facility_col1, facility_col2, facility_col3 = st.columns(3)
-            
-            with facility_col1:
-                st.subheader('🏥 Hospitals')
-                hospitals = location_facilities.get('hospitals', [])
-                if hospitals:
-                    for hospital in hospitals[:3]:  # Show first 3
-                        with st.expander(f"{hospital['name']} ({hospital['type']})"):
-                            st.write(f"📍 {hospital['address']}")
-                            st.write(f"📞 {hospital['phone']}")
-                            st.write(f"🏥 Services: {', '.join(hospital['services'])}")
-                            if hospital.get('emergency'):
-                                st.write("🚨 Emergency services available")
-                else:
-                    st.info(f'No hospital data available for {selected_city}. Please check the state capital or nearby major cities.')
-            
-            with facility_col2:
-                st.subheader('🧠 Counseling Centers')
-                counseling_centers = location_facilities.get('counseling_centers', [])
-                if counseling_centers:
-                    for center in counseling_centers:
-                        with st.expander(f"{center['name']}"):
-                            st.write(f"📍 {center['address']}")
-                            st.write(f"📞 {center['phone']}")
-                            st.write(f"💰 Cost: {center['cost']}")
-                            st.write(f"🛠️ Services: {', '.join(center['services'])}")
-                else:
-                    st.info('Contact nearby cities for counseling center information.')
-            
-            with facility_col3:
-                st.subheader('🤝 Support Groups')
-                support_groups = location_facilities.get('support_groups', [])
-                if support_groups:
-                    for group in support_groups:
-                        with st.expander(f"{group['name']}"):
-                            st.write(f"📧 Contact: {group['contact']}")
-                            st.write(f"📅 Meeting: {group['meeting']}")
-                else:
-                    st.info('Check online for virtual support groups or local community centers.')
-            
-            # Additional Resources
-            st.markdown('---')
-            st.header('📚 Additional Mental Health Resources')
-            
-            resource_col1, resource_col2 = st.columns(2)
-            
-            with resource_col1:
-                st.subheader('📱 Mobile Apps')
-                st.markdown("""
-                • **Headspace** - Meditation and mindfulness
-                • **Calm** - Sleep stories and relaxation
-                • **Sanvello** - Anxiety and mood tracking
-                • **Youper** - AI emotional health assistant
-                """)
-                
-                st.subheader('🌐 Online Resources')
-                st.markdown("""
-                • **Mind.org.uk** - Mental health information
-                • **Psychology Today** - Find therapists
-                • **NAMI.org** - Mental health support
-                • **Crisis Text Line** - Text HOME to 741741
-                """)
-            
-            with resource_col2:
-                st.subheader('📖 Self-Help Techniques')
-                st.markdown("""
-                • **Deep Breathing**: 4-7-8 technique
-                • **Progressive Muscle Relaxation**
-                • **Mindfulness Meditation**: 10 minutes daily
-                • **Journaling**: Reflect on thoughts and feelings
-                • **Exercise**: 30 minutes daily
-                """)
-                
-                st.subheader('🎓 Student-Specific Resources')
-                st.markdown("""
-                • Campus counseling centers
-                • Student support services
-                • Academic advisors
-                • Peer support groups
-                • Mental health accommodations
-                """)
+# Results stay on screen across reruns until an input changes
+assessment = current_assessment()
+if assessment is not None:
+    render_assessment(assessment)
     
     # Crisis disclaimer for critical cases
-    if 'comprehensive_results' in locals() and comprehensive_results['enhanced_stress_level'] == 'Awful':
-        st.markdown('---')
-        st.error('🚨 **CRISIS DISCLAIMER**: This is an automated assessment. If you are having thoughts of self-harm or suicide, please seek immediate professional help or call emergency services. Your life matters and help is available 24/7.')
-    elif 'predicted_level' in locals() and predicted_level == 'Awful':
+    comprehensive_results = assessment['results']
+    if comprehensive_results is not None and comprehensive_results['enhanced_stress_level'] == 'Awful' \
+            or comprehensive_results is None and assessment['predicted_level'] == 'Awful':
         st.markdown('---')
         st.error('🚨 **CRISIS DISCLAIMER**: This is an automated assessment. If you are having thoughts of self-harm or suicide, please seek immediate professional help or call emergency services. Your life matters and help is available 24/7.')
 
 st.markdown('---')
 st.caption('Enhanced Student Stress Prediction System v2.0 | Includes Professional Course Analysis, Emotional State Tracking, and Location-Based Mental Health Resources')
 st.caption('⚠️ Disclaimer: This tool is for informational purposes only and should not replace professional medical advice.')
+
+# After first paint: import the deferred modules before the first prediction needs them
+warm_imports()
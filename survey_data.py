@@ -0,0 +1,59 @@
+from typing import Iterator, Optional
+
+import pandas as pd
+
+# Survey column names (whitespace stripped) -> names used in Stress.ipynb
+SURVEY_COLUMNS = {
+    'Certification Course': 'certifications',
+    'Gender': 'gender',
+    'Department': 'dept',
+    'Height(CM)': 'height',
+    'Weight(KG)': 'weight',
+    '10th Mark': 'marks_10',
+    '12th Mark': 'marks_12',
+    'college mark': 'marks_grad',
+    'daily studing time': 'study_time',
+    'prefer to study in': 'preferred_time',
+    'salary expectation': 'sal_expect',
+    'Do you like your degree?': 'like_degree',
+    'willingness to pursue a career based on their degree': 'career_pursue',
+    'social medai & video': 'watch_time',
+    'Travelling Time': 'travel_time',
+    'Stress Level': 'stress_levels',
+    'Financial Status': 'money_status',
+    'part-time job': 'part_time_job'
+}
+
+NUMERIC_COLUMNS = ['height', 'weight', 'marks_10', 'marks_12', 'marks_grad', 'sal_expect']
+YES_NO_COLUMNS = ['certifications', 'like_degree', 'part_time_job']
+
+STRESS_LEVELS = ['Fabulous', 'Good', 'Bad', 'Awful']
+
+def clean_survey_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """Notebook cleaning that is valid row by row: names, numeric types and label formatting
+
+    Imputation and outlier capping need statistics over the whole dataset, so they
+    are left to the training pipeline and the feature builders.
+    """
+    frame = frame.copy()
+    frame.columns = frame.columns.str.strip()
+    frame = frame.rename(columns=SURVEY_COLUMNS)
+
+    for column in NUMERIC_COLUMNS:
+        if column in frame.columns:
+            frame[column] = pd.to_numeric(frame[column], errors='coerce')
+
+    for column in YES_NO_COLUMNS:
+        if column in frame.columns:
+            frame[column] = frame[column].astype(str).str.strip().str.title()
+
+    if 'stress_levels' in frame.columns:
+        frame['stress_levels'] = frame['stress_levels'].astype(str).str.strip().str.title()
+        frame['stress_levels_encoded'] = frame['stress_levels'].map({level: code for code, level in enumerate(STRESS_LEVELS)})
+
+    return frame
+
+def read_survey_chunks(path: str, chunk_size: int = 10000, usecols: Optional[list] = None) -> Iterator[pd.DataFrame]:
+    """Stream a survey CSV in cleaned chunks without loading the whole file"""
+    for chunk in pd.read_csv(path, chunksize=chunk_size, usecols=usecols):
+        yield clean_survey_frame(chunk)
@@ -0,0 +1,49 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import bulk_score as bulk_score_module
+from bulk_score import bulk_score
+from survey_data import read_survey_chunks
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SURVEY_PATH = os.path.join(ROOT, 'Student Attitude and Behavior.csv')
+ARTIFACT_DIR = os.path.join(ROOT, 'models')
+
+def test_ndjson_output_has_one_json_object_per_row(tmp_path):
+    output = tmp_path / 'scores.ndjson'
+    rows = bulk_score(SURVEY_PATH, str(output), chunk_size=100, artifact_dir=ARTIFACT_DIR)
+
+    with open(output, 'r') as f:
+        lines = f.read().split('\n')
+    assert lines[-1] == ''
+    records = [json.loads(line) for line in lines[:-1]]
+    assert rows == len(records) == len(pd.read_csv(SURVEY_PATH))
+    assert [record['row'] for record in records] == list(range(rows))
+
+def test_unknown_departments_are_scored_like_unknown_courses():
+    bulk_score_module._init_worker(ARTIFACT_DIR)
+    chunk = next(read_survey_chunks(SURVEY_PATH, 3))
+    chunk['dept'] = ['Physics', None, 'BCA']
+    result = bulk_score_module.score_chunk(chunk)
+
+    engine = bulk_score_module._engine
+    assert result['course_factor'].tolist() == [
+        engine.course_analyzer.get_course_stress_factor(''),
+        engine.course_analyzer.get_course_stress_factor(''),
+        engine.course_analyzer.get_course_stress_factor('Computer Science')
+    ]
+    # The online path leaves an unmapped course's department empty
+    online = chunk.drop(columns='dept').assign(course=['Physics', 'Physics', 'Computer Science'])
+    predictor = bulk_score_module._predictor
+    np.testing.assert_array_equal(predictor.build_feature_matrix(chunk), predictor.build_feature_matrix(online))
+
+def test_workers_do_not_load_the_sklearn_model_up_front():
+    bulk_score_module._init_worker(ARTIFACT_DIR)
+    predictor = bulk_score_module._predictor
+    assert predictor.compiled is not None
+    assert predictor._model is None
+    bulk_score_module.score_chunk(next(read_survey_chunks(SURVEY_PATH, 10)))
+    assert predictor._model is None
@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import cohort_analytics
+from cohort_analytics import MISSING_VALUE, CohortStore
+
+def _rows(course, scores):
+    return {
+        'course': [course] * len(scores), 'state': ['Delhi'] * len(scores),
+        'enhanced_stress_score': scores, 'assessed_at': [1750000000] * len(scores)
+    }
+
+def test_default_store_is_next_to_the_module():
+    assert cohort_analytics.DEFAULT_STORE_DIR == os.path.join(cohort_analytics.BASE_DIR, '.cache', 'cohorts')
+
+def test_missing_categorical_values_share_the_missing_code(tmp_path):
+    store = CohortStore(str(tmp_path))
+    frame = pd.DataFrame({
+        'course': ['Law', None, np.nan, 'Law'],
+        'emotion': ['Happy', np.nan, 'Happy', None],
+        'enhanced_stress_score': [0.1, 0.2, 0.3, 0.4]
+    })
+    store.append(frame, assessed_at=1750000000)
+
+    assert 'nan' not in store.vocabularies['course'] and 'None' not in store.vocabularies['course']
+    groups = {row['course']: row['count'] for row in store.aggregate(group_by=['course'])}
+    assert groups == {'Law': 2, MISSING_VALUE: 2}
+    groups = {row['emotion']: row['count'] for row in store.aggregate(group_by=['emotion'])}
+    assert groups == {'Happy': 2, MISSING_VALUE: 2}
+
+def test_stale_writers_do_not_reuse_codes_or_segments(tmp_path):
+    # Two stores opened on the same directory stand in for two appending processes
+    first, second = CohortStore(str(tmp_path)), CohortStore(str(tmp_path))
+    first.append(_rows('Course A', [0.1, 0.2]))
+    second.append(_rows('Course B', [0.7]))
+    first.append(_rows('Course C', [0.5]))
+
+    reader = CohortStore(str(tmp_path))
+    assert len(reader.segments) == 3
+    groups = {row['course']: row['count'] for row in reader.aggregate(group_by=['course'])}
+    assert groups == {'Course A': 2, 'Course B': 1, 'Course C': 1}
+    courses = reader.vocabularies['course']
+    assert len(set(courses)) == len(courses)
@@ -0,0 +1,49 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from data_registry import DATASETS, DataRegistry, DataValidationError, _validate_facilities
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _facilities(**fields):
+    entry = {'name': 'City Hospital', 'type': 'Government', 'services': ['OPD', 'Counselling']}
+    entry.update(fields)
+    return {'Delhi': {'New Delhi': {'hospitals': [entry]}}}
+
+def test_well_formed_facilities_pass():
+    _validate_facilities(_facilities())
+    _validate_facilities(_facilities(services=[]))
+    with open(os.path.join(ROOT, DATASETS['facilities']), 'r') as f:
+        _validate_facilities(json.load(f))
+
+@pytest.mark.parametrize('fields', [
+    {'services': 'OPD'},
+    {'services': ['OPD', 3]},
+    {'services': None},
+    {'type': 5},
+    {'type': ['Government']}
+])
+def test_malformed_facility_fields_are_rejected(fields):
+    with pytest.raises(DataValidationError):
+        _validate_facilities(_facilities(**fields))
+
+def test_invalid_facility_update_keeps_the_current_version(tmp_path):
+    for filename in DATASETS.values():
+        shutil.copy(os.path.join(ROOT, filename), tmp_path / filename)
+    registry = DataRegistry(str(tmp_path), snapshot_dir=None)
+    current = registry.get()
+
+    path = tmp_path / DATASETS['facilities']
+    data = json.loads(path.read_text())
+    state = next(iter(data))
+    city = next(iter(data[state]))
+    kind = next(kind for kind, entries in data[state][city].items() if entries)
+    data[state][city][kind][0]['services'] = 'OPD'
+    path.write_text(json.dumps(data))
+    os.utime(path, ns=(0, 0))
+
+    assert not registry.refresh()
+    assert registry.get() is current
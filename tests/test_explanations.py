@@ -0,0 +1,92 @@
+import math
+import os
+
+import numpy as np
+import pytest
+
+from explanations import TreeExplainer, explain_prediction
+from model_artifacts import ModelArtifacts
+from inference import StressPredictor
+from tree_compiler import CompiledTrees
+from worker_pool import run_assessment
+
+ARTIFACT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
+
+FORMS = [
+    {'mark10th': 75, 'mark12th': 75, 'collegemark': 75, 'gender': 'Male', 'height': 170, 'weight': 65,
+     'financial': 'Good', 'course': 'Engineering', 'salexpect': 50000},
+    {'mark10th': 40, 'mark12th': 90, 'collegemark': 55, 'gender': 'Female', 'height': 155, 'weight': 48,
+     'financial': 'Awful', 'course': 'Commerce', 'salexpect': 15000}
+]
+
+@pytest.fixture(scope='module')
+def predictor():
+    return StressPredictor.from_artifacts(ModelArtifacts(ARTIFACT_DIR))
+
+def _expected_output(compiled, x, known):
+    """E[f(x) | features in ``known`` fixed], following both branches of unknown splits by cover"""
+    roots, feature, threshold, left, right, leaf_values = compiled._as_lists()
+    node_cover, leaf_cover = compiled.node_cover.tolist(), compiled.leaf_cover.tolist()
+    cover = lambda node: node_cover[node] if node >= 0 else leaf_cover[~node]
+    x32 = np.float32(x).tolist()
+    total = np.zeros(len(compiled.init))
+
+    def descend(node, weight, tree):
+        if node < 0:
+            if compiled.kind == 'forest':
+                total[:] += weight * np.asarray(leaf_values[~node]) / compiled.n_trees
+            else:
+                total[tree % compiled.trees_per_stage] += weight * leaf_values[~node][0]
+            return
+        if feature[node] in known:
+            descend(left[node] if x32[feature[node]] <= threshold[node] else right[node], weight, tree)
+        else:
+            descend(left[node], weight * cover(left[node]) / cover(node), tree)
+            descend(right[node], weight * cover(right[node]) / cover(node), tree)
+
+    for tree, root in enumerate(roots):
+        descend(root, 1.0, tree)
+    return total + (0 if compiled.kind == 'forest' else np.asarray(compiled.init))
+
+def _brute_force_shapley(compiled, x):
+    n = compiled.n_features
+    values = {mask: _expected_output(compiled, x, {j for j in range(n) if mask >> j & 1}) for mask in range(1 << n)}
+    phi = np.zeros((n, len(compiled.init)))
+    for i in range(n):
+        for mask in range(1 << n):
+            if not mask >> i & 1:
+                size = bin(mask).count('1')
+                weight = math.factorial(size) * math.factorial(n - size - 1) / math.factorial(n)
+                phi[i] += weight * (values[mask | 1 << i] - values[mask])
+    return phi
+
+def test_tree_shap_matches_brute_force_shapley_values(predictor):
+    compiled = CompiledTrees.load(os.path.join(ARTIFACT_DIR, 'decision_tree.trees'))
+    explainer = TreeExplainer(compiled, predictor.feature_columns, predictor.class_names)
+    for form in FORMS:
+        x = predictor.build_features(**form)
+        np.testing.assert_allclose(explainer.shap_values(np.array([x]))[0], _brute_force_shapley(compiled, x), atol=1e-12)
+
+def test_attributions_add_up_to_the_prediction(predictor):
+    for form in FORMS:
+        level, probabilities = predictor.predict(**form)
+        explanation = explain_prediction(predictor, form, level, budget_ms=None)
+        total = explanation['base_value'] + sum(value for _, value in explanation['contributions'])
+        assert total == pytest.approx(probabilities[predictor.class_names.index(level)], abs=1e-9)
+
+def test_batch_matches_single_rows(predictor):
+    X = np.array([predictor.build_features(**form) for form in FORMS])
+    classes = np.array([1, 3])
+    batch = predictor.explainer.explain_batch(X, classes)
+    single = predictor.explainer.shap_values(X)
+    np.testing.assert_allclose(batch, single[np.arange(len(X)), :, classes], atol=1e-12)
+
+def test_over_budget_explanation_is_dropped(predictor):
+    level, _ = predictor.predict(**FORMS[0])
+    assert explain_prediction(predictor, FORMS[0], level, budget_ms=0.0) is None
+
+def test_run_assessment_returns_the_explanation(predictor):
+    level, probabilities, results, explanation = run_assessment(predictor, None, FORMS[0], explain=True)
+    assert results is None
+    assert explanation['class_name'] == level
+    assert run_assessment(predictor, None, FORMS[0])[3] is None
@@ -0,0 +1,76 @@
+import math
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from features import FEATURE_COLUMNS, INPUT_COLUMNS, FeatureBuilder
+from survey_data import clean_survey_frame
+
+SURVEY_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Student Attitude and Behavior.csv')
+
+LABEL_CLASSES = {
+    'gender': ['Female', 'Male'],
+    'money_status': ['High', 'Low', 'Medium'],
+    'dept': ['B.com Accounting and Finance ', 'B.com ISM', 'BCA', 'Commerce']
+}
+
+# Training means stand in for missing, invalid and unseen values, as when serving
+FILL_VALUES = [72.6, 26.0, 1.06, 0.68, 2.06, 1.98, 77.0, 68.9, 71.8, 2.4]
+
+BASE_ROW = {
+    'marks_10': 80.0, 'marks_12': 70.0, 'marks_grad': 75.0, 'height': 165.0, 'weight': 60.0,
+    'gender': 'Male', 'money_status': 'Medium', 'dept': 'BCA', 'sal_expect': 30000.0
+}
+
+EDGE_ROWS = [
+    BASE_ROW,
+    {**BASE_ROW, 'marks_10': math.nan},
+    {**BASE_ROW, 'marks_12': math.nan, 'marks_grad': math.nan},
+    {**BASE_ROW, 'height': math.nan, 'weight': math.nan},
+    {**BASE_ROW, 'sal_expect': math.nan},
+    {**BASE_ROW, 'gender': 'Other', 'money_status': 'Unknown', 'dept': 'Mechanical'},
+    {**BASE_ROW, 'gender': ' male ', 'money_status': 'MEDIUM', 'dept': 'bca'},
+    {**BASE_ROW, 'gender': math.nan, 'dept': ''},
+    {**BASE_ROW, 'height': 0.0},
+    {**BASE_ROW, 'height': 0.0, 'weight': 0.0},
+    {**BASE_ROW, 'height': -0.0, 'weight': -5.0},
+    {**BASE_ROW, 'marks_12': -0.01},
+    {**BASE_ROW, 'marks_10': math.inf}
+]
+
+def _columns(rows):
+    return {name: [row[name] for row in rows] for name in INPUT_COLUMNS}
+
+def _single_rows(builder, columns):
+    rows = [dict(zip(INPUT_COLUMNS, values)) for values in zip(*(columns[name] for name in INPUT_COLUMNS))]
+    return np.array([builder.transform_row(row) for row in rows], dtype=float).reshape(-1, len(builder.feature_columns))
+
+@pytest.fixture(params=[None, FILL_VALUES], ids=['unfilled', 'filled'])
+def builder(request):
+    return FeatureBuilder(LABEL_CLASSES, FEATURE_COLUMNS, fill_values=request.param)
+
+def test_paths_match_on_survey_csv(builder):
+    survey = clean_survey_frame(pd.read_csv(SURVEY_PATH))
+    columns = {name: survey[name].tolist() for name in INPUT_COLUMNS}
+    # NaN in both paths counts as equal; anything else must match exactly
+    np.testing.assert_array_equal(builder.transform(survey), _single_rows(builder, columns))
+
+def test_paths_match_on_edge_rows(builder):
+    columns = _columns(EDGE_ROWS)
+    np.testing.assert_array_equal(builder.transform(columns), _single_rows(builder, columns))
+
+def test_fill_values_replace_every_invalid_feature():
+    builder = FeatureBuilder(LABEL_CLASSES, FEATURE_COLUMNS, fill_values=FILL_VALUES)
+    features = builder.transform(_columns(EDGE_ROWS))
+    assert np.isfinite(features).all()
+
+    zero_height = builder.transform_row({**BASE_ROW, 'height': 0.0})
+    assert zero_height[FEATURE_COLUMNS.index('bmi')] == FILL_VALUES[FEATURE_COLUMNS.index('bmi')]
+    unseen = builder.transform_row({**BASE_ROW, 'dept': 'Mechanical'})
+    assert unseen[FEATURE_COLUMNS.index('dept_encoded')] == FILL_VALUES[FEATURE_COLUMNS.index('dept_encoded')]
+
+def test_single_row_rejects_non_numeric_input(builder):
+    with pytest.raises(ValueError):
+        builder.transform_row({**BASE_ROW, 'height': 'tall'})
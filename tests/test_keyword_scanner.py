@@ -0,0 +1,37 @@
+import pytest
+
+from recommendation_engine import EmotionalAnalyzer, KeywordScanner
+
+@pytest.fixture(scope='module')
+def analyzer():
+    return EmotionalAnalyzer()
+
+@pytest.mark.parametrize('text, term', [
+    ('I was abused by a relative', 'abuse'),
+    ('My parents divorced last year', 'divorce'),
+    ('Two deaths in the family this term', 'death'),
+    ('Accidents keep replaying in my head', 'accident'),
+    ('Constant BULLYING at the hostel', 'bullying'),
+    ('Dealing with harassments online', 'harassment'),
+    ('Years of childhood\ntrauma', 'childhood trauma'),
+])
+def test_inflected_trauma_words_are_detected(analyzer, text, term):
+    signals = analyzer.scan_context(text)
+    assert term in signals['trauma_hits']
+    assert analyzer.analyze_emotional_state('Neutral', [], text)['trauma_detected']
+
+@pytest.mark.parametrize('text', [
+    'Our history class covered the crusade',
+    'She was quickly disabused of that idea',
+    'I reject nothing, all good',
+    'Nothing happened',
+    '',
+])
+def test_words_merely_containing_a_term_are_not_trauma(analyzer, text):
+    assert analyzer.scan_context(text)['trauma_hits'] == ()
+    assert not analyzer.analyze_emotional_state('Neutral', [], text)['trauma_detected']
+
+def test_sentiment_terms_match_as_stems():
+    scanner = KeywordScanner({'negative': ['sad', 'hate'], 'positive': ['hopeful']})
+    hits = scanner.scan('Sadness and I hated it, yet hopefully better; the crusade was hopeless')
+    assert hits == {'negative': {'sad', 'hate'}, 'positive': {'hopeful'}}
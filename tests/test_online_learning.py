@@ -0,0 +1,98 @@
+import asyncio
+import os
+
+import numpy as np
+import pytest
+
+from model_artifacts import ModelArtifacts
+from online_learning import HotSwapPredictor, OnlineLearner, SnapshotStore
+from recommendation_engine import PersonalizedRecommendationEngine
+from scoring_service import ScoringService
+from survey_data import read_survey_chunks
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARTIFACT_DIR = os.path.join(ROOT, 'models')
+SURVEY_PATH = os.path.join(ROOT, 'Student Attitude and Behavior.csv')
+
+FORM = {
+    'mark10th': 75, 'mark12th': 75, 'collegemark': 75, 'gender': 'Male', 'height': 170, 'weight': 65,
+    'financial': 'Good', 'course': 'Engineering', 'salexpect': 50000
+}
+
+@pytest.fixture
+def store(tmp_path):
+    return SnapshotStore(str(tmp_path / 'snapshots'), keep=2)
+
+def _new_learner() -> OnlineLearner:
+    artifacts = ModelArtifacts(ARTIFACT_DIR)
+    return OnlineLearner(artifacts.label_classes, artifacts.feature_columns, artifacts.class_names)
+
+def test_publish_resume_and_hot_swap(store):
+    chunks = list(read_survey_chunks(SURVEY_PATH, chunk_size=60))
+    learner = _new_learner()
+    for chunk in chunks[:2]:
+        learner.update(chunk)
+    first = store.publish(learner)
+
+    resumed = store.load_learner()
+    assert resumed.rows_seen == learner.rows_seen
+    assert resumed.progressive == learner.progressive
+    features = learner.features.transform(chunks[2])
+    np.testing.assert_array_equal(
+        resumed.model.predict_proba(resumed.scaler.transform(resumed._impute(features))),
+        learner.model.predict_proba(learner.scaler.transform(learner._impute(features)))
+    )
+
+    predictor = HotSwapPredictor(store)
+    assert predictor.version == first
+    pinned = predictor.pin()
+    before = pinned.predict_proba_one(pinned.build_features(**FORM))
+
+    for chunk in chunks[2:]:
+        resumed.update(chunk)
+    second = store.publish(resumed)
+    assert predictor.refresh()
+    assert predictor.version == second
+    assert predictor.pin() is not pinned
+    assert not predictor.refresh()
+
+    # The pinned predictor keeps serving its own version after the swap
+    assert pinned.predict_proba_one(pinned.build_features(**FORM)) == before
+    assert predictor.store.latest_version() == second
+    assert store.versions() == [first, second]
+
+def test_service_requests_finish_on_the_version_they_started_with(store, monkeypatch):
+    chunks = list(read_survey_chunks(SURVEY_PATH, chunk_size=60))
+    learner = _new_learner()
+    learner.update(chunks[0])
+    store.publish(learner)
+    predictor = HotSwapPredictor(store)
+    pinned = predictor.pin()
+
+    for chunk in chunks[1:]:
+        learner.update(chunk)
+    store.publish(learner)
+    build_features = pinned.build_features
+
+    def build_then_swap(**form_inputs):
+        # A new snapshot lands between feature building and batched inference
+        features = build_features(**form_inputs)
+        assert predictor.refresh()
+        return features
+    monkeypatch.setattr(pinned, 'build_features', build_then_swap)
+
+    service = ScoringService(predictor, PersonalizedRecommendationEngine(cache_size=0))
+
+    async def score():
+        service.batcher.start()
+        try:
+            return await service.score(dict(FORM))
+        finally:
+            await service.batcher.stop()
+    result = asyncio.run(score())
+
+    expected = pinned.predict_proba_batch(np.array([build_features(**FORM)]))[0].tolist()
+    latest = predictor.pin()
+    assert latest is not pinned
+    assert latest.predict_proba_batch(np.array([latest.build_features(**FORM)]))[0].tolist() != expected
+    assert result['ml_probabilities'] == expected
@@ -0,0 +1,57 @@
+import pytest
+
+from recommendation_engine import PersonalizedRecommendationEngine, RecommendationCache
+
+REQUEST = {
+    'ml_prediction': 'Bad',
+    'ml_probabilities': [0.1, 0.2, 0.4, 0.3],
+    'course': 'Engineering',
+    'emotion': 'Anxious',
+    'context_text': 'I was abused and feel hopeless about exams',
+    'state': 'Karnataka',
+    'city': 'Bangalore',
+    'user_profile': {}
+}
+
+def _request():
+    # A fresh trigger list each time, as each session builds its own
+    return {**REQUEST, 'trigger_events': ['Exam failure', 'Family conflicts']}
+
+@pytest.fixture
+def engine():
+    return PersonalizedRecommendationEngine(cache_size=16)
+
+def test_editing_a_result_does_not_change_later_hits(engine):
+    expected = PersonalizedRecommendationEngine().generate_comprehensive_recommendations(**_request())
+
+    first = engine.generate_comprehensive_recommendations(**_request())
+    first['personalized_solutions'].append('Injected advice')
+    first['stress_score_breakdown']['final_score'] = -1.0
+    first['emotional_analysis']['analysis_summary']['trigger_events'].clear()
+    second = engine.generate_comprehensive_recommendations(**_request())
+    second['immediate_actions'][:] = []
+
+    third = engine.generate_comprehensive_recommendations(**_request())
+    assert engine.cache.stats()['hits'] == 2
+    assert third == expected
+    assert second is not third
+
+def test_callers_trigger_list_is_not_shared_with_the_cache(engine):
+    request = _request()
+    engine.generate_comprehensive_recommendations(**request)
+    request['trigger_events'].append('Health issues')
+
+    result = engine.generate_comprehensive_recommendations(**_request())
+    assert result['emotional_analysis']['analysis_summary']['trigger_events'] == ['Exam failure', 'Family conflicts']
+
+def test_cache_copies_values_in_and_out():
+    cache = RecommendationCache(max_size=4)
+    value = {'items': [1, 2], 'nested': {'tags': {'a'}}, 'pair': ([3],)}
+    cache.put(b'key', value)
+    value['items'].append(3)
+
+    hit = cache.get(b'key')
+    assert hit == {'items': [1, 2], 'nested': {'tags': {'a'}}, 'pair': ([3],)}
+    hit['nested']['tags'].add('b')
+    hit['pair'][0].append(4)
+    assert cache.get(b'key') == {'items': [1, 2], 'nested': {'tags': {'a'}}, 'pair': ([3],)}
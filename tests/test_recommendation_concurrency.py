@@ -0,0 +1,95 @@
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from recommendation_engine import PersonalizedRecommendationEngine
+
+COURSES = ['Engineering', 'Medical', 'Law', 'Commerce', 'Arts/Humanities', 'Underwater Basket Weaving']
+STRESS_LEVELS = ['Fabulous', 'Good', 'Bad', 'Awful']
+THREADS = 16
+ROUNDS = 20
+
+REQUESTS = [
+    {
+        'ml_prediction': level,
+        'ml_probabilities': probabilities,
+        'course': course,
+        'emotion': emotion,
+        'trigger_events': triggers,
+        'context_text': context,
+        'state': 'Karnataka',
+        'city': 'Bangalore',
+        'user_profile': {}
+    }
+    for (level, probabilities), course, (emotion, triggers, context) in itertools.product(
+        [('Good', [0.2, 0.5, 0.2, 0.1]), ('Awful', [0.05, 0.1, 0.25, 0.6])],
+        COURSES[:3],
+        [
+            ('Neutral', [], ''),
+            ('Anxious', ['Exam failure', 'Family issues'], 'I feel overwhelmed and hopeless before exams'),
+            ('Sad', ['Loss of loved one'], 'My grandfather died last month and I cannot focus')
+        ]
+    )
+]
+
+def _run_concurrently(call, arguments):
+    """Every call in ``arguments``, ROUNDS times over, from THREADS threads released together"""
+    barrier = threading.Barrier(THREADS)
+
+    def worker(offset):
+        barrier.wait()
+        # Each thread starts at a different request so the same inputs overlap in time
+        shifted = arguments[offset:] + arguments[:offset]
+        return [(index % len(arguments), call(*args)) for index, args in enumerate(shifted * ROUNDS, start=offset)]
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        return list(itertools.chain.from_iterable(pool.map(worker, range(THREADS))))
+
+@pytest.fixture(params=[0, 256], ids=['uncached', 'cached'])
+def engine(request):
+    return PersonalizedRecommendationEngine(cache_size=request.param)
+
+def test_course_advice_is_identical_across_threads(engine):
+    analyzer = engine.course_analyzer
+    arguments = list(itertools.product(COURSES, STRESS_LEVELS))
+    expected = [analyzer.get_course_specific_advice(course, level) for course, level in arguments]
+
+    for index, advice in _run_concurrently(analyzer.get_course_specific_advice, arguments):
+        assert advice == expected[index]
+    # Repeated calls must not have grown the shared lists
+    assert [analyzer.get_course_specific_advice(course, level) for course, level in arguments] == expected
+
+def test_comprehensive_recommendations_are_identical_across_threads(engine):
+    reference = PersonalizedRecommendationEngine()
+    expected = [reference.generate_comprehensive_recommendations(**request) for request in REQUESTS]
+
+    def call(index):
+        return engine.generate_comprehensive_recommendations(**REQUESTS[index])
+
+    for index, result in _run_concurrently(call, [(index,) for index in range(len(REQUESTS))]):
+        assert result == expected[index]
+
+def test_course_patterns_are_read_only():
+    patterns = PersonalizedRecommendationEngine().course_analyzer.course_patterns
+    course = next(iter(patterns))
+
+    with pytest.raises(TypeError):
+        patterns['New Course'] = {}
+    with pytest.raises(TypeError):
+        del patterns[course]
+    with pytest.raises(TypeError):
+        patterns[course]['base_stress_factor'] = 0.0
+    with pytest.raises((TypeError, AttributeError)):
+        patterns[course]['coping_strategies'].append('Sleep less')
+    with pytest.raises(TypeError):
+        patterns[course]['coping_strategies'][0] = 'Sleep less'
+
+def test_course_advice_is_a_list_callers_may_extend(engine):
+    analyzer = engine.course_analyzer
+    for course in COURSES + ['Unknown Course']:
+        advice = analyzer.get_course_specific_advice(course, 'Awful')
+        assert isinstance(advice, list)
+        advice.append('Talk to a counsellor')
+        assert analyzer.get_course_specific_advice(course, 'Awful') + ['Talk to a counsellor'] == advice
@@ -0,0 +1,91 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from recommendation_engine import PersonalizedRecommendationEngine
+from scoring_service import ScoringService, load_predictor
+
+ARTIFACT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
+
+FORM = {
+    'mark10th': 75, 'mark12th': 75, 'collegemark': 75, 'gender': 'Male', 'height': 170, 'weight': 65,
+    'financial': 'Good', 'course': 'Engineering', 'salexpect': 50000
+}
+
+@pytest.fixture(scope='module')
+def service():
+    return ScoringService(load_predictor(ARTIFACT_DIR), PersonalizedRecommendationEngine(cache_size=0))
+
+def test_default_artifacts_do_not_depend_on_the_working_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    predictor = load_predictor()
+    assert predictor.predict_proba_one(predictor.build_features(**FORM))
+    assert list(tmp_path.iterdir()) == []
+
+def _exchange(service, request: bytes):
+    """Send one raw request to a live server; return (status, decoded JSON body)"""
+    async def run():
+        service.batcher.start()
+        server = await asyncio.start_server(service.handle_connection, '127.0.0.1', 0)
+        try:
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(request)
+            await writer.drain()
+            response = await asyncio.wait_for(reader.read(), timeout=30)
+            writer.close()
+        finally:
+            server.close()
+            await server.wait_closed()
+            await service.batcher.stop()
+        head, _, body = response.partition(b'\r\n\r\n')
+        return int(head.split()[1]), json.loads(body)
+    return asyncio.run(run())
+
+def _post(body: bytes, extra_headers: str = '') -> bytes:
+    return (
+        f'POST /score HTTP/1.1\r\nConnection: close\r\nContent-Length: {len(body)}\r\n{extra_headers}\r\n'
+    ).encode('latin-1') + body
+
+def test_scores_a_valid_request(service):
+    status, body = _exchange(service, _post(json.dumps({**FORM, 'trigger_events': ['exams']}).encode()))
+    assert status == 200
+    assert abs(sum(body['ml_probabilities']) - 1) < 1e-6
+
+def test_negative_content_length_is_rejected(service):
+    status, body = _exchange(service, b'POST /score HTTP/1.1\r\nContent-Length: -5\r\n\r\n')
+    assert status == 400
+    assert body['error'] == 'Invalid Content-Length'
+
+@pytest.mark.parametrize('request_bytes', [
+    b'GET /' + b'a' * 70000 + b' HTTP/1.1\r\n\r\n',
+    b'GET /health HTTP/1.1\r\nX-Padding: ' + b'a' * 70000 + b'\r\n\r\n'
+])
+def test_overlong_lines_get_a_response(service, request_bytes):
+    status, body = _exchange(service, request_bytes)
+    assert status == 400
+    assert 'too long' in body['error']
+
+@pytest.mark.parametrize('fields, error', [
+    ({'trigger_events': 'exams'}, 'trigger_events must be a list of strings'),
+    ({'trigger_events': [1, 2]}, 'trigger_events must be a list of strings'),
+    ({'trigger_events': {'exams': True}}, 'trigger_events must be a list of strings'),
+    ({'trigger_events': None}, 'trigger_events must be a list of strings'),
+    ({'context_text': 123}, 'context_text must be a string'),
+    ({'city': ['x']}, 'city must be a string'),
+    ({'state': {'name': 'Delhi'}}, 'state must be a string'),
+    ({'emotion': 5}, 'emotion must be a string'),
+    ({'course': None}, 'course must be a string')
+])
+def test_malformed_fields_are_client_errors(service, fields, error):
+    status, body = _exchange(service, _post(json.dumps({**FORM, **fields}).encode()))
+    assert status == 400
+    assert body['error'] == error
+
+def test_course_is_required(service):
+    payload = {field: value for field, value in FORM.items() if field != 'course'}
+    status, body = _exchange(service, _post(json.dumps(payload).encode()))
+    assert status == 400
+    assert body['error'] == 'Missing fields: course'
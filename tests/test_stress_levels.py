@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+
+from recommendation_engine import PersonalizedRecommendationEngine
+
+SCORES = [
+    np.nan, -0.1, 0.0, 0.39999999, 0.4, 0.40000001, 0.5, 0.59999999, 0.6,
+    0.7, 0.79999999, 0.8, 0.9, 1.0, 1.5, np.inf, -np.inf
+]
+
+@pytest.fixture(scope='module')
+def engine():
+    return PersonalizedRecommendationEngine(cache_size=0)
+
+def test_vectorized_levels_match_the_scalar_levels(engine):
+    expected = [engine._determine_stress_level(score) for score in SCORES]
+    assert engine._determine_stress_levels(np.array(SCORES)).tolist() == expected
+
+def test_exact_thresholds_and_nan(engine):
+    levels = engine._determine_stress_levels(np.array([0.4, 0.6, 0.8, np.nan]))
+    assert levels.tolist() == ['Good', 'Bad', 'Awful', 'Fabulous']
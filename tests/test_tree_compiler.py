@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from inference import StressPredictor
+from model_artifacts import ModelArtifacts
+from survey_data import clean_survey_frame
+from tree_compiler import CompiledTrees, _float32_thresholds
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARTIFACT_DIR = os.path.join(ROOT, 'models')
+SURVEY_PATH = os.path.join(ROOT, 'Student Attitude and Behavior.csv')
+
+TREE_MODELS = ['Random Forest', 'Gradient Boosting', 'Decision Tree']
+
+@pytest.fixture(scope='module')
+def artifacts():
+    return ModelArtifacts(ARTIFACT_DIR)
+
+@pytest.fixture(scope='module')
+def survey_features(artifacts):
+    predictor = StressPredictor.from_artifacts(artifacts)
+    return predictor.build_feature_matrix(clean_survey_frame(pd.read_csv(SURVEY_PATH)))
+
+def _threshold_rows(model, base: np.ndarray, max_splits: int = 250) -> np.ndarray:
+    """Copies of ``base`` with one feature exactly on, and one float32 step either side of, a split threshold"""
+    splits = set()
+    for estimator in np.ravel(getattr(model, 'estimators_', [model])):
+        tree = estimator.tree_
+        splits.update((int(feature), float(threshold)) for feature, threshold in zip(tree.feature, tree.threshold) if feature >= 0)
+    splits = sorted(splits)
+    # An even sample keeps the large ensembles quick while covering every feature
+    splits = [splits[index] for index in np.linspace(0, len(splits) - 1, min(max_splits, len(splits))).astype(int)]
+    rows = []
+    for feature, threshold in splits:
+        as_float32 = np.float32(threshold)
+        for value in (threshold, as_float32, np.nextafter(as_float32, np.float32(-np.inf)), np.nextafter(as_float32, np.float32(np.inf))):
+            row = base[len(rows) % len(base)].copy()
+            row[feature] = value
+            rows.append(row)
+    return np.array(rows)
+
+@pytest.mark.parametrize('name', TREE_MODELS)
+def test_compiled_trees_match_sklearn(artifacts, survey_features, name):
+    model = artifacts.load_model(name)
+    X = np.vstack([survey_features, _threshold_rows(model, survey_features)])
+    expected = model.predict_proba(pd.DataFrame(X, columns=model.feature_names_in_))
+
+    for compiled in (artifacts.load_compiled(name), CompiledTrees.from_model(model)):
+        np.testing.assert_allclose(compiled.predict_proba(X), expected, rtol=0, atol=1e-12)
+        rows = np.array([compiled.predict_proba_row(row.tolist()) for row in X])
+        np.testing.assert_allclose(rows, expected, rtol=0, atol=1e-12)
+
+def test_thresholds_round_down_to_float32():
+    thresholds = np.concatenate([np.random.default_rng(0).normal(scale=1e4, size=1000), [0.1, 0.5, 1 / 3, -2.75]])
+    rounded = _float32_thresholds(thresholds)
+    assert rounded.dtype == np.float32
+    # The largest float32 not above each threshold
+    assert (rounded.astype(np.float64) <= thresholds).all()
+    assert (np.nextafter(rounded, np.float32(np.inf)).astype(np.float64) > thresholds).all()
@@ -0,0 +1,72 @@
+import os
+import signal
+import sys
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from scoring_service import load_predictor
+from worker_pool import AssessmentPool, _plain, run_assessment
+
+ARTIFACT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
+
+FORM = {
+    'mark10th': 75, 'mark12th': 75, 'collegemark': 75, 'gender': 'Male', 'height': 170, 'weight': 65,
+    'financial': 'Good', 'course': 'Engineering', 'salexpect': 50000
+}
+
+@pytest.fixture(scope='module')
+def predictor():
+    return load_predictor(ARTIFACT_DIR)
+
+@pytest.fixture
+def app_main(tmp_path, monkeypatch):
+    """A stand-in __main__ with a __file__, as Streamlit installs; importing the script leaves a marker"""
+    marker = tmp_path / 'imported'
+    script = tmp_path / 'app_script.py'
+    script.write_text(f'open({str(marker)!r}, "w").close()\n')
+    main = types.ModuleType('__main__')
+    main.__file__ = str(script)
+    monkeypatch.setitem(sys.modules, '__main__', main)
+    return main, marker
+
+@pytest.fixture
+def pool(predictor, app_main):
+    pool = AssessmentPool(1, ARTIFACT_DIR, timeout_seconds=30, fallback_predictor=predictor)
+    yield pool
+    pool.shutdown()
+
+def test_workers_do_not_import_the_callers_main(pool, app_main):
+    main, marker = app_main
+    pool.assess(FORM)
+    assert not marker.exists()
+    assert sys.modules['__main__'] is main
+
+def test_pooled_result_matches_in_process(pool, predictor):
+    # Results cross the process boundary as plain lists and dicts
+    assert pool.assess(FORM, explain=True) == tuple(_plain(run_assessment(predictor, None, FORM, explain=True)))
+
+def test_crashed_pool_is_replaced_with_warm_workers(pool, app_main):
+    main, marker = app_main
+    old_pids = set(pool.worker_pids)
+    for pid in old_pids:
+        os.kill(pid, signal.SIGKILL)
+
+    # The caller that finds the crash restarts the pool and gets a fallback result
+    level, probabilities, _, _ = pool.assess(FORM)
+    assert pool.stats()['fallbacks'] == 1
+    assert pool.stats()['restarts'] == 1
+    assert pool.worker_pids and pool.worker_pids.isdisjoint(old_pids)
+
+    assert pool.assess(FORM)[:2] == (level, probabilities)
+    assert pool.stats()['completed'] == 1
+    assert not marker.exists()
+    assert sys.modules['__main__'] is main
+
+def test_counters_do_not_lose_increments(pool):
+    calls = 200
+    with ThreadPoolExecutor(16) as callers:
+        list(callers.map(lambda _: pool.assess(FORM), range(calls)))
+    stats = pool.stats()
+    assert stats['completed'] + stats['fallbacks'] == calls
@@ -0,0 +1,347 @@
+import argparse
+import hashlib
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from features import ENCODED_COLUMNS, FEATURE_COLUMNS, FeatureBuilder, fit_label_classes
+from survey_data import NUMERIC_COLUMNS, STRESS_LEVELS, clean_survey_frame
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ARTIFACT_DIR = os.path.join(BASE_DIR, 'models')
+DEFAULT_PACKAGE_PATH = os.path.join(BASE_DIR, 'stress_prediction_models.pkl')
+DEFAULT_EVALUATION_PATH = os.path.join(BASE_DIR, 'model_evaluation_results.pkl')
+DEFAULT_DATA_PATH = os.path.join(BASE_DIR, 'Student Attitude and Behavior.csv')
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, '.cache', 'training')
+
+# Bump when cleaning or feature engineering changes so stale caches are ignored
+FEATURE_CACHE_VERSION = 2
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's contents, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def clean_training_frame(raw: pd.DataFrame) -> pd.DataFrame:
+    """Stress.ipynb cleaning: imputation, 5th-95th percentile capping and label formatting"""
+    frame = clean_survey_frame(raw)
+
+    for column in NUMERIC_COLUMNS:
+        if column in frame.columns:
+            frame[column] = frame[column].fillna(frame[column].median())
+            frame[column] = frame[column].clip(frame[column].quantile(0.05), frame[column].quantile(0.95))
+
+    for column in frame.columns.difference(NUMERIC_COLUMNS + ['stress_levels_encoded']):
+        mode = frame[column].mode()
+        frame[column] = frame[column].fillna(mode.iloc[0] if not mode.empty else 'Unknown')
+
+    # Rows whose stress level is not one of the four classes cannot be used
+    return frame.dropna(subset=['stress_levels_encoded'])
+
+def engineer_features(frame: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series, Dict]:
+    """Feature matrix, target and fitted label encoders, built with the same FeatureBuilder as serving"""
+    from sklearn.preprocessing import LabelEncoder
+
+    label_classes = fit_label_classes(frame, ENCODED_COLUMNS)
+    features = pd.DataFrame(
+        FeatureBuilder(label_classes, FEATURE_COLUMNS).transform(frame),
+        columns=FEATURE_COLUMNS,
+        index=frame.index
+    )
+    features = features.fillna(features.median())
+
+    # The package stores LabelEncoders, as the notebook's did
+    label_encoders = {}
+    for column, classes in label_classes.items():
+        encoder = LabelEncoder()
+        encoder.classes_ = np.asarray(classes, dtype=object)
+        label_encoders[column] = encoder
+
+    target = frame['stress_levels_encoded'].astype(int)
+    return features, target, label_encoders
+
+def load_training_data(data_path: str, cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> Tuple[pd.DataFrame, pd.Series, Dict, bool]:
+    """(features, target, label_encoders, cache_hit), reusing the on-disk feature cache when the input is unchanged"""
+    cache_path = None
+    if cache_dir:
+        key = hashlib.sha256(f'{file_digest(data_path)}:{FEATURE_CACHE_VERSION}'.encode()).hexdigest()[:32]
+        cache_path = os.path.join(cache_dir, f'features-{key}.joblib')
+        if os.path.exists(cache_path):
+            cached = joblib.load(cache_path)
+            return cached['features'], cached['target'], cached['label_encoders'], True
+
+    features, target, label_encoders = engineer_features(clean_training_frame(pd.read_csv(data_path)))
+
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        temp_path = cache_path + '.tmp'
+        joblib.dump({'features': features, 'target': target, 'label_encoders': label_encoders}, temp_path)
+        os.replace(temp_path, cache_path)
+    return features, target, label_encoders, False
+
+def build_model(name: str, seed: int = 42):
+    """Unfitted candidate model with the notebook's hyperparameters"""
+    from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.svm import SVC
+    from sklearn.tree import DecisionTreeClassifier
+
+    if name == 'Logistic Regression':
+        return LogisticRegression(class_weight='balanced', random_state=seed, max_iter=1000)
+    if name == 'Random Forest':
+        return RandomForestClassifier(n_estimators=100, class_weight='balanced', random_state=seed, max_depth=10, min_samples_split=5)
+    if name == 'Gradient Boosting':
+        return GradientBoostingClassifier(n_estimators=100, learning_rate=0.1, max_depth=5, random_state=seed)
+    if name == 'SVM':
+        return SVC(class_weight='balanced', random_state=seed, probability=True)
+    if name == 'Decision Tree':
+        return DecisionTreeClassifier(class_weight='balanced', random_state=seed, max_depth=10, min_samples_split=5)
+    raise ValueError(f'Unknown model: {name}')
+
+CANDIDATE_MODELS = ['Logistic Regression', 'Random Forest', 'Gradient Boosting', 'SVM', 'Decision Tree']
+
+def split_data(features: pd.DataFrame, target: pd.Series, seed: int = 42):
+    """(X_train, X_test, y_train, y_test): the stratified 80/20 split every model is evaluated on"""
+    from sklearn.model_selection import train_test_split
+
+    return train_test_split(features, target, test_size=0.2, random_state=seed, stratify=target)
+
+def fold_splits(X_train, y_train, cv_folds: int = 5, seed: int = 42) -> List:
+    """Stratified CV (train_index, validation_index) pairs over the training split"""
+    from sklearn.model_selection import StratifiedKFold
+
+    if cv_folds <= 1:
+        return []
+    return list(StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=seed).split(X_train, y_train))
+
+def fit_fold(name: str, X_train: np.ndarray, y_train: np.ndarray, train_index: np.ndarray, validation_index: np.ndarray, seed: int):
+    """(model fitted on one fold's training rows, that fold's validation inputs)"""
+    from sklearn.preprocessing import StandardScaler
+
+    from inference import SCALED_MODELS
+
+    model = build_model(name, seed)
+    X_fold, X_validation = X_train[train_index], X_train[validation_index]
+    if name in SCALED_MODELS:
+        # Scale inside the fold so validation rows never inform the scaler
+        fold_scaler = StandardScaler().fit(X_fold)
+        X_fold, X_validation = fold_scaler.transform(X_fold), fold_scaler.transform(X_validation)
+    model.fit(X_fold, y_train[train_index])
+    return model, X_validation
+
+def _fit_task(name: str, fold: Optional[int], X_train: np.ndarray, y_train: np.ndarray, splits: List, seed: int) -> Dict:
+    """One unit of parallel work: the final fit of a model (fold None) or one CV fold"""
+    from sklearn.metrics import accuracy_score
+
+    if fold is None:
+        model = build_model(name, seed)
+        model.fit(X_train, y_train)
+        return {'name': name, 'fold': None, 'model': model}
+
+    train_index, validation_index = splits[fold]
+    model, X_validation = fit_fold(name, X_train, y_train, train_index, validation_index, seed)
+    return {'name': name, 'fold': fold, 'accuracy': accuracy_score(y_train[validation_index], model.predict(X_validation))}
+
+def _fold_probabilities_task(name: str, fold: int, X_train: np.ndarray, y_train: np.ndarray, splits: List, seed: int) -> Tuple[str, int, np.ndarray]:
+    train_index, validation_index = splits[fold]
+    model, X_validation = fit_fold(name, X_train, y_train, train_index, validation_index, seed)
+    return name, fold, model.predict_proba(X_validation)
+
+def out_of_fold_probabilities(
+    features: pd.DataFrame,
+    target: pd.Series,
+    model_names: List[str] = CANDIDATE_MODELS,
+    cv_folds: int = 5,
+    seed: int = 42,
+    n_jobs: int = -1
+) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """({model: class probabilities}, labels) for every training-split row, each from the fold model that did not see it
+
+    Uses train_models' split and folds, so anything fitted on these rows (ensemble
+    weights) never sees the held-out split the stored models are scored on.
+    """
+    from joblib import Parallel, delayed
+
+    X_train, _, y_train, _ = split_data(features, target, seed)
+    X_train, y_train = X_train.to_numpy(dtype=float), y_train.to_numpy(dtype=int)
+    splits = fold_splits(X_train, y_train, cv_folds, seed)
+    if not splits:
+        raise ValueError('Out-of-fold probabilities need at least 2 CV folds')
+
+    outputs = Parallel(n_jobs=n_jobs)(
+        delayed(_fold_probabilities_task)(name, fold, X_train, y_train, splits, seed)
+        for name in model_names for fold in range(len(splits))
+    )
+    n_classes = len(np.unique(y_train))
+    probabilities = {name: np.zeros((len(y_train), n_classes)) for name in model_names}
+    for name, fold, fold_probabilities in outputs:
+        probabilities[name][splits[fold][1]] = fold_probabilities
+    return probabilities, y_train
+
+def train_models(
+    features: pd.DataFrame,
+    target: pd.Series,
+    model_names: List[str] = CANDIDATE_MODELS,
+    cv_folds: int = 5,
+    seed: int = 42,
+    n_jobs: int = -1
+) -> Dict:
+    """Fit every candidate and its CV folds in parallel, then evaluate on the held-out split"""
+    from joblib import Parallel, delayed
+    from sklearn.metrics import accuracy_score, balanced_accuracy_score, f1_score, precision_score, recall_score
+    from sklearn.preprocessing import StandardScaler
+
+    from inference import SCALED_MODELS
+
+    X_train, X_test, y_train, y_test = split_data(features, target, seed)
+    scaler = StandardScaler().fit(X_train)
+    X_train_scaled, X_test_scaled = scaler.transform(X_train), scaler.transform(X_test)
+
+    # Tree models keep the DataFrame so they record feature names, as the notebook's did
+    train_inputs = {name: X_train_scaled if name in SCALED_MODELS else X_train for name in model_names}
+    splits = fold_splits(X_train, y_train, cv_folds, seed)
+
+    # One task per final fit and per (model, fold), so every core stays busy
+    tasks = [(name, None) for name in model_names] + [(name, fold) for name in model_names for fold in range(len(splits))]
+    outputs = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_task)(
+            name, fold,
+            train_inputs[name] if fold is None else X_train.to_numpy(),
+            y_train if fold is None else y_train.to_numpy(),
+            splits, seed
+        )
+        for name, fold in tasks
+    )
+
+    models = {output['name']: output['model'] for output in outputs if output['fold'] is None}
+    cv_scores = {name: [] for name in model_names}
+    for output in outputs:
+        if output['fold'] is not None:
+            cv_scores[output['name']].append(output['accuracy'])
+
+    results = {}
+    comparison_metrics = {}
+    for name in model_names:
+        model = models[name]
+        X_eval = X_test_scaled if name in SCALED_MODELS else X_test
+        predictions = model.predict(X_eval)
+        results[name] = {
+            'accuracy': accuracy_score(y_test, predictions),
+            'predictions': predictions,
+            'probabilities': model.predict_proba(X_eval)
+        }
+        comparison_metrics[name] = {
+            'Accuracy': results[name]['accuracy'],
+            'Balanced Accuracy': balanced_accuracy_score(y_test, predictions),
+            'Precision': precision_score(y_test, predictions, average='weighted', zero_division=0),
+            'Recall': recall_score(y_test, predictions, average='weighted', zero_division=0),
+            'F1-Score': f1_score(y_test, predictions, average='weighted', zero_division=0)
+        }
+        if cv_scores[name]:
+            comparison_metrics[name]['CV Accuracy'] = float(np.mean(cv_scores[name]))
+            comparison_metrics[name]['CV Accuracy Std'] = float(np.std(cv_scores[name]))
+
+    return {
+        'models': models,
+        'scaler': scaler,
+        'results': results,
+        'comparison_metrics': comparison_metrics,
+        'split': {'X_train': X_train, 'X_test': X_test, 'y_train': y_train, 'y_test': y_test}
+    }
+
+def run_training(
+    data_path: str = DEFAULT_DATA_PATH,
+    package_path: str = DEFAULT_PACKAGE_PATH,
+    evaluation_path: str = DEFAULT_EVALUATION_PATH,
+    artifact_dir: Optional[str] = DEFAULT_ARTIFACT_DIR,
+    cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+    select_by: str = 'Accuracy',
+    cv_folds: int = 5,
+    seed: int = 42,
+    n_jobs: int = -1
+) -> Dict:
+    """Train, evaluate and write the model package, evaluation results and split artifacts"""
+    started = time.perf_counter()
+    features, target, label_encoders, cache_hit = load_training_data(data_path, cache_dir)
+    prepared = time.perf_counter()
+
+    trained = train_models(features, target, cv_folds=cv_folds, seed=seed, n_jobs=n_jobs)
+    comparison_metrics = trained['comparison_metrics']
+    best_model_name = max(comparison_metrics, key=lambda name: comparison_metrics[name].get(select_by, 0.0))
+    best_model = trained['models'][best_model_name]
+
+    model_package = {
+        'models': trained['models'],
+        'scaler': trained['scaler'],
+        'feature_columns': list(FEATURE_COLUMNS),
+        'label_encoders': label_encoders,
+        'class_names': list(STRESS_LEVELS),
+        'best_model': best_model_name,
+        'results': trained['results']
+    }
+    joblib.dump(model_package, package_path)
+
+    feature_importance = None
+    if hasattr(best_model, 'feature_importances_'):
+        feature_importance = pd.DataFrame({
+            'Feature': FEATURE_COLUMNS,
+            'Importance': best_model.feature_importances_
+        }).sort_values('Importance', ascending=False).reset_index(drop=True)
+    joblib.dump({
+        'comparison_metrics': comparison_metrics,
+        'best_model_name': best_model_name,
+        'feature_importance': feature_importance,
+        'evaluation_complete': True
+    }, evaluation_path)
+
+    if artifact_dir:
+        from model_artifacts import export_model_package
+        export_model_package(model_package, artifact_dir)
+
+    return {
+        'best_model': best_model_name,
+        'comparison_metrics': comparison_metrics,
+        'rows': len(features),
+        'cache_hit': cache_hit,
+        'prepare_seconds': prepared - started,
+        'train_seconds': time.perf_counter() - prepared
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the stress prediction models (the Stress.ipynb pipeline)')
+    parser.add_argument('--data', default=DEFAULT_DATA_PATH, help='survey CSV')
+    parser.add_argument('--package', default=DEFAULT_PACKAGE_PATH, help='where to write the model package')
+    parser.add_argument('--evaluation', default=DEFAULT_EVALUATION_PATH, help='where to write the evaluation results')
+    parser.add_argument('--artifacts', default=DEFAULT_ARTIFACT_DIR, help="split model artifact directory ('' to skip)")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="feature cache directory ('' to disable)")
+    parser.add_argument('--select-by', default='Accuracy', choices=['Accuracy', 'Balanced Accuracy', 'F1-Score', 'CV Accuracy'], help='metric that picks the served model')
+    parser.add_argument('--cv-folds', type=int, default=5, help='stratified CV folds on the training split (0 disables)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--jobs', type=int, default=-1, help='parallel fitting jobs (-1 uses every core)')
+    args = parser.parse_args()
+
+    summary = run_training(
+        data_path=args.data,
+        package_path=args.package,
+        evaluation_path=args.evaluation,
+        artifact_dir=args.artifacts or None,
+        cache_dir=args.cache_dir or None,
+        select_by=args.select_by,
+        cv_folds=args.cv_folds,
+        seed=args.seed,
+        n_jobs=args.jobs
+    )
+
+    print(f"{summary['rows']} rows, features {'from cache' if summary['cache_hit'] else 'rebuilt'} in {summary['prepare_seconds']:.2f}s, models trained in {summary['train_seconds']:.1f}s")
+    print(pd.DataFrame(summary['comparison_metrics']).T.round(3).to_string())
+    print(f"Best model: {summary['best_model']}")
+
+if __name__ == '__main__':
+    main()
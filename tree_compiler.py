@@ -0,0 +1,276 @@
+import json
+import math
+import os
+from array import array
+from typing import List, Optional
+
+import numpy as np
+
+COMPILED_FORMAT_VERSION = 1
+ARRAY_NAMES = ('roots', 'feature', 'threshold', 'left', 'right', 'leaf_values', 'node_cover', 'leaf_cover', 'init')
+
+# Rows per chunk in the vectorized traversal, so (rows, trees, classes) stays small
+BATCH_CHUNK_ROWS = 1024
+
+def _float32_thresholds(thresholds: np.ndarray) -> np.ndarray:
+    """Largest float32 <= each float64 threshold
+
+    sklearn compares float32 inputs against float64 thresholds; for a float32 x,
+    x <= t exactly when x <= this rounded-down value, so the comparison is unchanged.
+    """
+    rounded = thresholds.astype(np.float32)
+    too_high = rounded.astype(np.float64) > thresholds
+    rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+    return rounded
+
+class CompiledTrees:
+    """Tree ensemble flattened into NumPy arrays, evaluated without sklearn
+
+    Nodes of every tree share one set of arrays. A child index >= 0 is an internal
+    node; a negative index ``~leaf`` points at row ``leaf`` of ``leaf_values``.
+    Forests average per-tree class distributions. Gradient boosting adds the
+    (learning-rate scaled) leaf values of each stage's per-class trees to ``init``
+    and applies the softmax (or the sigmoid for two classes).
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        n_features: int,
+        n_classes: int,
+        roots: np.ndarray,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        leaf_values: np.ndarray,
+        node_cover: np.ndarray,
+        leaf_cover: np.ndarray,
+        init: np.ndarray,
+        max_depth: int
+    ):
+        self.kind = kind
+        self.n_features = n_features
+        self.n_classes = n_classes
+        self.roots = roots
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.leaf_values = leaf_values
+        # Training sample weight reaching each node, for path-dependent TreeSHAP
+        self.node_cover = node_cover
+        self.leaf_cover = leaf_cover
+        self.init = init
+        self.max_depth = max_depth
+        self._lists = None
+        self._children_flat = None
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def trees_per_stage(self) -> int:
+        """Trees per boosting stage (one per class, or one for binary); 1 for forests"""
+        if self.kind == 'gradient_boosting':
+            return 1 if self.n_classes == 2 else self.n_classes
+        return 1
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in ARRAY_NAMES)
+
+    @classmethod
+    def from_model(cls, model) -> Optional['CompiledTrees']:
+        """Compile a fitted DecisionTree, RandomForest/ExtraTrees or GradientBoosting classifier; None otherwise"""
+        model_type = type(model).__name__
+        if model_type == 'DecisionTreeClassifier':
+            kind, trees = 'forest', [model.tree_]
+        elif model_type in ('RandomForestClassifier', 'ExtraTreesClassifier'):
+            kind, trees = 'forest', [estimator.tree_ for estimator in model.estimators_]
+        elif model_type == 'GradientBoostingClassifier':
+            # Stage-major order: stage 0 class 0, stage 0 class 1, ...
+            kind, trees = 'gradient_boosting', [estimator.tree_ for estimator in model.estimators_.ravel()]
+        else:
+            return None
+
+        roots, features, thresholds, lefts, rights = [], [], [], [], []
+        leaf_values, node_cover, leaf_cover = [], [], []
+        n_nodes = n_leaves = 0
+        max_depth = 0
+        for tree in trees:
+            is_leaf = tree.children_left == -1
+            # Position of every node in the shared internal-node or leaf arrays
+            internal_ids = np.cumsum(~is_leaf) - 1 + n_nodes
+            leaf_ids = np.cumsum(is_leaf) - 1 + n_leaves
+            encoded = np.where(is_leaf, ~leaf_ids, internal_ids)
+
+            internal = ~is_leaf
+            roots.append(encoded[0])
+            features.append(tree.feature[internal])
+            thresholds.append(_float32_thresholds(tree.threshold[internal]))
+            lefts.append(encoded[tree.children_left[internal]])
+            rights.append(encoded[tree.children_right[internal]])
+            node_cover.append(tree.weighted_n_node_samples[internal])
+            leaf_cover.append(tree.weighted_n_node_samples[is_leaf])
+
+            values = tree.value[is_leaf, 0, :]
+            if kind == 'forest':
+                values = values / values.sum(axis=1, keepdims=True)
+            else:
+                # sklearn adds learning_rate * leaf value at predict time
+                values = model.learning_rate * values
+            leaf_values.append(values)
+
+            n_nodes += int(internal.sum())
+            n_leaves += int(is_leaf.sum())
+            max_depth = max(max_depth, int(tree.max_depth))
+
+        if kind == 'gradient_boosting':
+            init = np.asarray(model._raw_predict_init(np.zeros((1, model.n_features_in_)))[0], dtype=np.float64)
+        else:
+            init = np.zeros(model.n_classes_, dtype=np.float64)
+
+        return cls(
+            kind=kind,
+            n_features=int(model.n_features_in_),
+            n_classes=int(model.n_classes_),
+            roots=np.asarray(roots, dtype=np.int32),
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds).astype(np.float32),
+            left=np.concatenate(lefts).astype(np.int32),
+            right=np.concatenate(rights).astype(np.int32),
+            leaf_values=np.concatenate(leaf_values).astype(np.float64),
+            node_cover=np.concatenate(node_cover).astype(np.float64),
+            leaf_cover=np.concatenate(leaf_cover).astype(np.float64),
+            init=init,
+            max_depth=max_depth
+        )
+
+    def save(self, directory: str):
+        """One .npy file per array plus meta.json; np.load can memory-map them"""
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(directory, f'{name}.npy'), getattr(self, name))
+        meta = {
+            'format_version': COMPILED_FORMAT_VERSION,
+            'kind': self.kind,
+            'n_features': self.n_features,
+            'n_classes': self.n_classes,
+            'max_depth': self.max_depth
+        }
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Optional[str] = 'r') -> 'CompiledTrees':
+        with open(os.path.join(directory, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+        if meta.get('format_version') != COMPILED_FORMAT_VERSION:
+            raise ValueError(f"Unsupported compiled tree format: {meta.get('format_version')}")
+        arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode) for name in ARRAY_NAMES}
+        return cls(
+            kind=meta['kind'],
+            n_features=meta['n_features'],
+            n_classes=meta['n_classes'],
+            max_depth=meta['max_depth'],
+            **arrays
+        )
+
+    def _children(self) -> np.ndarray:
+        # Left and right child interleaved, so one gather picks the branch taken
+        if self._children_flat is None:
+            self._children_flat = np.column_stack([self.left, self.right]).ravel()
+        return self._children_flat
+
+    def _as_lists(self):
+        # Python lists index far faster than NumPy scalars in the single-row loop
+        if self._lists is None:
+            self._lists = (
+                self.roots.tolist(), self.feature.tolist(), self.threshold.tolist(),
+                self.left.tolist(), self.right.tolist(), self.leaf_values.tolist()
+            )
+        return self._lists
+
+    def leaf_indices_row(self, features: List[float]) -> List[int]:
+        """Leaf reached in every tree by one row"""
+        roots, feature, threshold, left, right, _ = self._as_lists()
+        # Inputs are compared as float32, like sklearn
+        row = array('f', features).tolist()
+        leaves = []
+        for node in roots:
+            while node >= 0:
+                node = left[node] if row[feature[node]] <= threshold[node] else right[node]
+            leaves.append(~node)
+        return leaves
+
+    def raw_row(self, features: List[float]) -> List[float]:
+        """Summed leaf values for one row: class-distribution totals or boosting scores"""
+        leaf_values = self._as_lists()[5]
+        totals = self.init.tolist()
+        if self.kind == 'forest':
+            for leaf in self.leaf_indices_row(features):
+                totals = [total + value for total, value in zip(totals, leaf_values[leaf])]
+        else:
+            per_stage = self.trees_per_stage
+            for tree, leaf in enumerate(self.leaf_indices_row(features)):
+                totals[tree % per_stage] += leaf_values[leaf][0]
+        return totals
+
+    def predict_proba_row(self, features: List[float]) -> List[float]:
+        """Class probabilities for one row, with no NumPy arrays allocated per call"""
+        totals = self.raw_row(features)
+        if self.kind == 'forest':
+            return [total / self.n_trees for total in totals]
+        if self.n_classes == 2:
+            positive = 1 / (1 + math.exp(-totals[0]))
+            return [1 - positive, positive]
+        top = max(totals)
+        exps = [math.exp(total - top) for total in totals]
+        norm = sum(exps)
+        return [value / norm for value in exps]
+
+    def leaf_indices(self, X: np.ndarray) -> np.ndarray:
+        """(rows, trees) leaf indices, advancing every unfinished (row, tree) path one level per step"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows = len(X)
+        flat_X = X.ravel()
+        # Offset of each path's row in flat_X, and its current node
+        row_offsets = np.repeat(np.arange(n_rows, dtype=np.int64) * X.shape[1], self.n_trees)
+        nodes = np.tile(np.asarray(self.roots), n_rows)
+
+        children = self._children()
+        active = np.flatnonzero(nodes >= 0)
+        while active.size:
+            current = nodes[active]
+            go_right = flat_X[row_offsets[active] + self.feature[current]] > self.threshold[current]
+            nodes[active] = children[2 * current + go_right]
+            # Paths that reached a leaf drop out, so later levels touch fewer elements
+            active = active[nodes[active] >= 0]
+        return ~nodes.reshape(n_rows, self.n_trees)
+
+    def raw(self, X: np.ndarray) -> np.ndarray:
+        """Vectorized raw_row(); rows are processed in chunks to bound memory"""
+        X = np.asarray(X)
+        out = np.empty((len(X), len(self.init)))
+        for start in range(0, len(X), BATCH_CHUNK_ROWS):
+            leaves = self.leaf_indices(X[start:start + BATCH_CHUNK_ROWS])
+            if self.kind == 'forest':
+                totals = self.leaf_values[leaves].sum(axis=1)
+            else:
+                stages = self.leaf_values[leaves, 0].reshape(len(leaves), -1, self.trees_per_stage)
+                totals = stages.sum(axis=1)
+            out[start:start + BATCH_CHUNK_ROWS] = self.init + totals
+        return out
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Class probabilities for a 2-D feature matrix"""
+        totals = self.raw(X)
+        if self.kind == 'forest':
+            return totals / self.n_trees
+        if self.n_classes == 2:
+            positive = 1 / (1 + np.exp(-totals[:, 0]))
+            return np.column_stack([1 - positive, positive])
+        exps = np.exp(totals - totals.max(axis=1, keepdims=True))
+        return exps / exps.sum(axis=1, keepdims=True)
@@ -0,0 +1,310 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import types
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from types import MappingProxyType
+from typing import Dict, List, Optional, Tuple
+
+from explanations import explain_prediction
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ARTIFACT_DIR = os.path.join(BASE_DIR, 'models')
+
+# Serializes worker launches, the only code here that touches sys.modules['__main__']
+_launch_lock = threading.Lock()
+
+# Set in each worker process by _init_worker
+_predictor = None
+_engine = None
+
+class WorkerPoolSaturated(RuntimeError):
+    """Every queue slot stayed taken for the whole queue timeout"""
+
+def _init_worker(artifact_dir: str, engine_cache_size: int):
+    """Load the model and recommendation engine once per worker process"""
+    global _predictor, _engine
+    from recommendation_engine import PersonalizedRecommendationEngine
+    from scoring_service import load_predictor
+
+    _predictor = load_predictor(artifact_dir)
+    _engine = PersonalizedRecommendationEngine(cache_size=engine_cache_size, cache_ttl_seconds=3600)
+    # Build the explainer and the shared course and location indexes now rather than inside the first job
+    _predictor.explainer
+    _engine.course_analyzer
+    _engine.location_recommendations
+
+def _ready() -> int:
+    # Holds its worker briefly, so the next warm-up call is handed to another process
+    time.sleep(0.05)
+    return os.getpid()
+
+@contextmanager
+def _hidden_main():
+    """Launch worker processes without importing the caller's __main__ in them
+
+    Streamlit runs the app script as a stand-in __main__ module with a __file__,
+    which spawn and forkserver children import, running the whole app on start.
+    The jobs live in this module, so workers do not need __main__ unless this
+    module is itself the script being run; then this yields None.
+
+    Otherwise it yields the empty placeholder installed for the launch. Streamlit
+    installs a new __main__ at the start of every script run, so the caller must
+    check the placeholder is still in place once its processes are launched, and
+    discard them if not. The original module is only put back if the placeholder
+    is still there, so a script run's own __main__ is never overwritten.
+    """
+    if __name__ == '__main__':
+        yield None
+        return
+    with _launch_lock:
+        main = sys.modules.get('__main__')
+        placeholder = types.ModuleType('__main__')
+        sys.modules['__main__'] = placeholder
+        try:
+            yield placeholder
+        finally:
+            if sys.modules.get('__main__') is placeholder:
+                sys.modules['__main__'] = main
+
+def _plain(value):
+    """Copy read-only mappings and tuples into dicts and lists, so a result can be pickled"""
+    if isinstance(value, (dict, MappingProxyType)):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    return value
+
+def run_assessment(
+    predictor,
+    engine,
+    form_inputs: Dict,
+    recommendation_inputs: Optional[Dict] = None,
+    explain: bool = False
+) -> Tuple[str, List[float], Optional[Dict], Optional[Dict]]:
+    """(predicted level, probabilities, recommendations, explanation)
+
+    ``form_inputs`` are StressPredictor.predict's keyword arguments;
+    ``recommendation_inputs`` are generate_comprehensive_recommendations' arguments
+    other than the prediction itself, and without them there are no recommendations.
+    With ``explain``, the prediction's feature attributions (explain_prediction) are
+    computed here too, so a pooled job keeps them off the caller's thread.
+    """
+    predicted_level, probabilities = predictor.predict(**form_inputs)
+    probabilities = [float(p) for p in probabilities]
+    results = None
+    if recommendation_inputs is not None and engine is not None:
+        results = engine.generate_comprehensive_recommendations(
+            ml_prediction=predicted_level, ml_probabilities=probabilities, **recommendation_inputs
+        )
+    explanation = explain_prediction(predictor, form_inputs, predicted_level) if explain else None
+    return predicted_level, probabilities, results, explanation
+
+def _worker_assessment(form_inputs: Dict, recommendation_inputs: Optional[Dict], explain: bool):
+    return _plain(run_assessment(_predictor, _engine, form_inputs, recommendation_inputs, explain))
+
+class AssessmentPool:
+    """Prediction and recommendation jobs on pre-warmed worker processes
+
+    Each worker loads the model and its own engine once, so CPU-bound inference
+    and text analysis run outside the caller's GIL. At most ``max_pending`` jobs
+    are queued or running; a caller waits up to ``queue_timeout_seconds`` for a
+    slot, and a job gets ``timeout_seconds`` to finish. A saturated queue, a
+    timeout or a crashed pool runs the job in-process with the fallback
+    predictor and engine, or raises when none were given. Errors raised by the
+    job itself are re-raised, since running it again in-process would fail the same way.
+
+    Every worker is started and warmed before its executor is published, so a job
+    never launches a process. A crashed pool is replaced by the caller that found
+    it; callers arriving meanwhile fall back rather than wait for the warm-up.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        artifact_dir: str = DEFAULT_ARTIFACT_DIR,
+        max_pending: Optional[int] = None,
+        timeout_seconds: float = 5.0,
+        queue_timeout_seconds: float = 0.5,
+        fallback_predictor=None,
+        fallback_engine=None,
+        engine_cache_size: int = 1024
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.artifact_dir = artifact_dir
+        self.max_pending = max_pending or 4 * self.workers
+        self.timeout_seconds = timeout_seconds
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.fallback_predictor = fallback_predictor
+        self.fallback_engine = fallback_engine
+        self.engine_cache_size = engine_cache_size
+        self.worker_pids = set()
+        self.completed = 0
+        self.fallbacks = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.restarts = 0
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        # Held while the executor is replaced; the counters have their own lock
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._executor = self._start_executor()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # Forking a threaded server (Streamlit, the HTTP service) can copy held locks into the child
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        return ProcessPoolExecutor(
+            self.workers,
+            mp_context=multiprocessing.get_context(method),
+            initializer=_init_worker,
+            initargs=(self.artifact_dir, self.engine_cache_size)
+        )
+
+    def _start_executor(self, attempts: int = 3) -> ProcessPoolExecutor:
+        """A new executor whose workers have all started and loaded the model and engine"""
+        for _ in range(attempts):
+            executor = self._new_executor()
+            # Processes are launched by these submits; the executor starts no others later
+            with _hidden_main() as placeholder:
+                futures = [executor.submit(_ready) for _ in range(2 * self.workers)]
+                hidden = placeholder is None or sys.modules.get('__main__') is placeholder
+            if hidden:
+                self.worker_pids = {future.result() for future in futures}
+                return executor
+            # A script run replaced __main__ mid-launch, so a worker may have imported the app
+            executor.shutdown(wait=False, cancel_futures=True)
+        raise RuntimeError(f'__main__ was replaced during {attempts} worker launches')
+
+    def _count(self, counter: str):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def assess(
+        self, form_inputs: Dict, recommendation_inputs: Optional[Dict] = None, explain: bool = False
+    ) -> Tuple[str, List[float], Optional[Dict], Optional[Dict]]:
+        """run_assessment on a worker; results come back as plain dicts and lists"""
+        # Backpressure: callers queue here, not in the executor's unbounded work queue
+        if not self._slots.acquire(timeout=self.queue_timeout_seconds):
+            self._count('rejected')
+            METRICS.increment('worker_pool_rejected')
+            return self._fallback(form_inputs, recommendation_inputs, explain, WorkerPoolSaturated(
+                f'{self.max_pending} jobs pending for over {self.queue_timeout_seconds}s'
+            ))
+
+        executor = self._executor
+        try:
+            future = executor.submit(_worker_assessment, form_inputs, recommendation_inputs, explain)
+        except (BrokenProcessPool, RuntimeError) as e:
+            self._slots.release()
+            self._restart(executor)
+            return self._fallback(form_inputs, recommendation_inputs, explain, e)
+        # Released when the job finishes, even after the caller gave up on it
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            result = future.result(timeout=self.timeout_seconds)
+        except FutureTimeoutError as e:
+            future.cancel()
+            self._count('timeouts')
+            METRICS.increment('worker_pool_timeouts')
+            return self._fallback(form_inputs, recommendation_inputs, explain, e)
+        except BrokenProcessPool as e:
+            self._restart(executor)
+            return self._fallback(form_inputs, recommendation_inputs, explain, e)
+        self._count('completed')
+        return tuple(result)
+
+    def _fallback(self, form_inputs: Dict, recommendation_inputs: Optional[Dict], explain: bool, error: Exception):
+        if self.fallback_predictor is None:
+            raise error
+        self._count('fallbacks')
+        METRICS.increment('worker_pool_fallbacks')
+        return run_assessment(self.fallback_predictor, self.fallback_engine, form_inputs, recommendation_inputs, explain)
+
+    def _restart(self, broken: ProcessPoolExecutor):
+        """Replace a pool whose worker died, warming the new workers before publishing them"""
+        # Another caller is already restarting: fall back now instead of waiting for it
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            if self._executor is not broken:
+                return
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._start_executor()
+            self._count('restarts')
+            METRICS.increment('worker_pool_restarts')
+        except Exception:
+            # The broken executor stays in place, so the next job tries again
+            logger.exception('Could not restart the worker pool')
+        finally:
+            self._lock.release()
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            return {
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'completed': self.completed,
+                'fallbacks': self.fallbacks,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'restarts': self.restarts
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+def _load_test(assess, jobs: List[Tuple[Dict, Dict]], sessions: int) -> float:
+    """Jobs per second with ``sessions`` concurrent callers"""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(sessions) as callers:
+        list(callers.map(lambda job: assess(*job), jobs))
+    return len(jobs) / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare in-process and worker-pool throughput for concurrent sessions')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes')
+    parser.add_argument('--sessions', type=int, default=16, help='concurrent callers')
+    parser.add_argument('--requests', type=int, default=2000, help='assessments per run')
+    parser.add_argument('--artifacts', default=DEFAULT_ARTIFACT_DIR, help='split model artifact directory')
+    args = parser.parse_args()
+
+    from benchmark import FORM_FIELDS, generate_profiles
+    from recommendation_engine import PersonalizedRecommendationEngine
+    from scoring_service import load_predictor
+
+    # Distinct context texts, so neither the app's memo nor the engine cache answers the jobs
+    jobs = []
+    for r in generate_profiles(args.requests, context_pool_size=args.requests).to_dict('records'):
+        jobs.append(({field: r[field] for field in FORM_FIELDS}, {
+            'course': r['course'], 'emotion': r['emotion'], 'trigger_events': list(r['trigger_events']),
+            'context_text': r['context_text'], 'state': r['state'], 'city': r['city'], 'user_profile': {}
+        }))
+
+    predictor = load_predictor(args.artifacts)
+    engine = PersonalizedRecommendationEngine()
+    in_process = _load_test(lambda form, rec: run_assessment(predictor, engine, form, rec), jobs, args.sessions)
+    print(f'in-process:          {in_process:8.0f} assessments/s')
+
+    started = time.perf_counter()
+    pool = AssessmentPool(args.workers, args.artifacts, fallback_predictor=predictor, fallback_engine=engine)
+    print(f'pool warm-up:        {time.perf_counter() - started:8.2f} s ({len(pool.worker_pids)} workers)')
+    try:
+        pooled = _load_test(pool.assess, jobs, args.sessions)
+        print(f'{args.workers} worker processes: {pooled:8.0f} assessments/s')
+        print(pool.stats())
+    finally:
+        pool.shutdown()
+
+if __name__ == '__main__':
+    main()